@@ -0,0 +1,201 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import numpy as np
+
+from engines import ENGINES, createEngine
+from patterns import readPattern, writeCells, writeRle
+from snapshot import saveSnapshot, loadSnapshot
+
+# Default grid sizes and densities of the alive cells
+DEFAULT_SIZES = (10, 64, 256, 1024, 4096)
+DEFAULT_DENSITIES = (0.1, 0.3, 0.5)
+
+# Seconds spent repeating every measure
+DEFAULT_BUDGET = 0.5
+
+# Largest grids (in cells) for the engines too slow to load random soups of any size
+ENGINE_MAX_CELLS = {"hashlife": 512 * 512}
+
+
+def randomGrid(size, density, seed=0):
+    """
+    Square age grid with random alive cells
+    """
+    return (np.random.default_rng(seed).random((size, size)) < density).astype(np.uint8)
+
+
+def measure(function, budget=DEFAULT_BUDGET):
+    """
+    Call the function until the budget of seconds is spent, after a warm up call.
+    Return the times of the calls
+    """
+    function()
+    times = []
+    start = time.perf_counter()
+    while not times or time.perf_counter() - start < budget:
+        before = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - before)
+    return times
+
+
+def _timing(times):
+    return {"repeats": len(times), "best_seconds": min(times), "median_seconds": float(np.median(times))}
+
+
+def benchmarkStep(engineName, size, density, budget=DEFAULT_BUDGET):
+    """
+    Generations per second of an engine on a random grid
+    """
+    engine = createEngine(engineName)
+    try:
+        engine.load(randomGrid(size, density))
+        times = measure(engine.step, budget)
+    finally:
+        if hasattr(engine, "close"):
+            engine.close()
+    timing = _timing(times)
+    return dict({"benchmark": "step", "engine": engineName, "size": size, "density": density,
+                 "rate": 1 / timing["median_seconds"], "unit": "generations/s",
+                 "cells_per_second": size * size / timing["median_seconds"]}, **timing)
+
+
+def benchmarkRender(size, density, budget=DEFAULT_BUDGET):
+    """
+    Frames per second of the grid widget, with the offscreen Qt platform.
+    A full frame recolors the whole grid, a step frame only the regions changed by a generation
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from engine import nextGeneration
+    from model import GolModel
+    from view import GolView
+
+    application = QApplication.instance() or QApplication([])
+    results = []
+    model = GolModel()
+    view = GolView(model)
+    view.resize(1000, 800)
+    grid = randomGrid(size, density)
+    model.setGrid(grid)
+    model.setGridSizeSelected((size, size))
+    widget = view.getGrid()
+
+    def fullFrame():
+        widget._updateGrid()
+        widget.grab()
+
+    generations = [grid, nextGeneration(grid)]
+
+    def stepFrame():
+        # Alternate between two generations so that every frame has changes
+        generations.reverse()
+        model.setEngineGrid(generations[0])
+        widget.grab()
+
+    for frame, function in (("full", fullFrame), ("step", stepFrame)):
+        timing = _timing(measure(function, budget))
+        results.append(dict({"benchmark": "render", "frame": frame, "size": size, "density": density,
+                             "rate": 1 / timing["median_seconds"], "unit": "frames/s"}, **timing))
+    view.close()
+    application.processEvents()
+    return results
+
+
+def benchmarkIo(size, density, budget=DEFAULT_BUDGET):
+    """
+    Throughput (MB/s of the file) of saving and loading patterns and snapshots
+    """
+    grid = randomGrid(size, density)
+    directory = tempfile.mkdtemp(prefix="gol-benchmark-")
+    paths = {fileFormat: os.path.join(directory, name) for fileFormat, name in
+             (("cells", "grid.cells"), ("rle", "grid.rle"), ("snapshot", "grid.gol"), ("packed", "packed.gol"))}
+
+    operations = [
+        ("cells", "save", lambda: writeCells(paths["cells"], grid)),
+        ("cells", "load", lambda: readPattern(paths["cells"])),
+        ("rle", "save", lambda: writeRle(paths["rle"], grid)),
+        ("rle", "load", lambda: readPattern(paths["rle"])),
+        ("snapshot", "save", lambda: saveSnapshot(paths["snapshot"], grid)),
+        ("snapshot", "load", lambda: np.asarray(loadSnapshot(paths["snapshot"]).grid).sum()),
+        ("packed", "save", lambda: saveSnapshot(paths["packed"], grid, packed=True, compressed=True)),
+        ("packed", "load", lambda: loadSnapshot(paths["packed"])),
+    ]
+    results = []
+    try:
+        for fileFormat, operation, function in operations:
+            timing = _timing(measure(function, budget))
+            megabytes = os.path.getsize(paths[fileFormat]) / 1e6
+            results.append(dict({"benchmark": "io", "format": fileFormat, "operation": operation, "size": size,
+                                 "density": density, "file_megabytes": megabytes,
+                                 "rate": megabytes / timing["median_seconds"], "unit": "MB/s"}, **timing))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def environment():
+    """
+    Description of the revision and of the machine of the results
+    """
+    try:
+        revision = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {"revision": revision, "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count()}
+
+
+def runBenchmarks(suites=("step", "render", "io"), engines=tuple(ENGINES), sizes=DEFAULT_SIZES,
+                  densities=DEFAULT_DENSITIES, budget=DEFAULT_BUDGET, limits=True):
+    """
+    Run the benchmark suites, yield every result as soon as it is measured
+    """
+    for size in sizes:
+        for density in densities:
+            if "step" in suites:
+                for engineName in engines:
+                    if limits and size * size > ENGINE_MAX_CELLS.get(engineName, size * size):
+                        continue
+                    yield benchmarkStep(engineName, size, density, budget)
+            if "render" in suites:
+                yield from benchmarkRender(size, density, budget)
+            if "io" in suites:
+                yield from benchmarkIo(size, density, budget)
+
+
+def resultKey(result):
+    """
+    Key that identifies the same measure in two runs
+    """
+    return tuple(result.get(field) for field in ("benchmark", "engine", "frame", "format", "operation", "size", "density"))
+
+
+def compareResults(baseline, current, tolerance=0.1):
+    """
+    Compare the rates of two runs, return the measures slower than the baseline beyond the tolerance
+    """
+    previous = {resultKey(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(resultKey(result))
+        if old is not None and result["rate"] < old["rate"] * (1 - tolerance):
+            regressions.append({"key": resultKey(result), "baseline": old["rate"], "current": result["rate"],
+                                "ratio": result["rate"] / old["rate"], "unit": result["unit"]})
+    return regressions
+
+
+def writeResults(path, results):
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def readResults(path):
+    with open(path) as file:
+        return json.load(file)
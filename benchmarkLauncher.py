@@ -0,0 +1,47 @@
+import argparse
+import json
+import sys
+
+from benchmark import DEFAULT_SIZES, DEFAULT_DENSITIES, DEFAULT_BUDGET, runBenchmarks, environment, \
+    compareResults, writeResults, readResults
+from engines import ENGINES
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Measure the speed of stepping, rendering and I/O of Game of Life")
+    parser.add_argument("--suite", choices=["step", "render", "io"], action="append",
+                        help="benchmark suite to run (repeatable), all if omitted")
+    parser.add_argument("-e", "--engine", choices=list(ENGINES), action="append", help="step engine (repeatable), all if omitted")
+    parser.add_argument("-s", "--size", type=int, action="append", help="side of the square grid (repeatable)")
+    parser.add_argument("-d", "--density", type=float, action="append", help="density of the alive cells (repeatable)")
+    parser.add_argument("-b", "--budget", type=float, default=DEFAULT_BUDGET, help="seconds spent repeating every measure")
+    parser.add_argument("--no-limits", action="store_true", help="run also the slow engines on the largest grids")
+    parser.add_argument("-o", "--output", help="file where write the results (JSON), stdout if omitted")
+    parser.add_argument("--compare", help="results of a previous revision, report the measures slower than them")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown tolerated by --compare")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+
+    args = parseArguments(sys.argv[1:])
+
+    results = {"environment": environment(), "results": []}
+    for result in runBenchmarks(args.suite or ("step", "render", "io"), args.engine or tuple(ENGINES),
+                                args.size or DEFAULT_SIZES, args.density or DEFAULT_DENSITIES,
+                                args.budget, not args.no_limits):
+        name = " ".join(str(result[field]) for field in ("benchmark", "engine", "frame", "format", "operation") if field in result)
+        print("{} {size}x{size} density {density}: {rate:.1f} {unit}".format(name, **result), file=sys.stderr)
+        results["results"].append(result)
+
+    if args.output:
+        writeResults(args.output, results)
+    else:
+        print(json.dumps(results, indent=2))
+
+    # Regressions with respect to the baseline
+    if args.compare:
+        regressions = compareResults(readResults(args.compare), results, args.tolerance)
+        for regression in regressions:
+            print("Slower: {key} {baseline:.1f} -> {current:.1f} {unit} ({ratio:.0%})".format(**regression), file=sys.stderr)
+        sys.exit(1 if regressions else 0)
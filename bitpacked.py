@@ -0,0 +1,233 @@
+import numpy as np
+
+from engine import DEAD, TORUS, checkBoundary, mergeAges
+from rules import CONWAY, COUNTS
+from cycle import arraysHash
+
+# Number of cells stored in a machine word
+WORD_BITS = 64
+
+# Number of bits set in every byte
+_POPCOUNT8 = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def packGrid(grid):
+    """
+    Pack the alive cells of the grid in rows of uint64 words, 64 cells per word.
+    The bit j of the word w of a row is the cell in column 64 * w + j
+    """
+    alive = np.asarray(grid) > 0
+    rows, cols = alive.shape
+    words = (cols + WORD_BITS - 1) // WORD_BITS
+    padded = np.zeros((rows, words * WORD_BITS), dtype=bool)
+    padded[:, :cols] = alive
+    return np.packbits(padded, axis=1, bitorder='little').view('<u8')
+
+
+def unpackGrid(bits, cols):
+    """
+    Unpack the rows of uint64 words in a boolean grid with the given number of columns
+    """
+    bytes = np.ascontiguousarray(bits, dtype='<u8').view(np.uint8)
+    return np.unpackbits(bytes, axis=1, bitorder='little')[:, :cols].astype(bool)
+
+
+def populationCount(bits):
+    """
+    Number of bits set in the words
+    """
+    return int(_POPCOUNT8[np.ascontiguousarray(bits, dtype='<u8').view(np.uint8)].sum(dtype=np.int64))
+
+
+def columnMask(cols):
+    """
+    Mask of the valid cells of the last word of a row
+    """
+    words = (cols + WORD_BITS - 1) // WORD_BITS
+    mask = np.full(words, np.uint64(0xFFFFFFFFFFFFFFFF), dtype='<u8')
+    if cols % WORD_BITS:
+        mask[-1] = np.uint64((1 << (cols % WORD_BITS)) - 1)
+    return mask
+
+
+def nextGenerationBits(bits, mask, rule=CONWAY, cols=None):
+    """
+    Compute the next generation of a bit-packed grid with bitwise adders on whole words.
+    The cells outside the grid are considered dead (dead border), if the number of
+    columns is given the grid is a torus and the edges wrap around
+    """
+    one, carry = np.uint64(1), np.uint64(WORD_BITS - 1)
+
+    # Cells at the west (col - 1) and at the east (col + 1) with the carry between words
+    west = bits << one
+    west[:, 1:] |= bits[:, :-1] >> carry
+    east = bits >> one
+    east[:, :-1] |= bits[:, 1:] << carry
+    if cols is not None:
+        # The first and the last column are neighbors, a single bit per row is moved
+        last = np.uint64((cols - 1) % WORD_BITS)
+        west[:, 0] |= (bits[:, -1] >> last) & one
+        east[:, -1] |= (bits[:, 0] & one) << last
+
+    # Horizontal sums: 3 cells for the rows above and below, 2 cells for the row itself
+    h0 = west ^ bits ^ east
+    h1 = (west & bits) | (east & (west ^ bits))
+    m0 = west ^ east
+    m1 = west & east
+
+    # Rows above and below with a dead border, or the opposite rows on a torus
+    up0, up1 = np.zeros_like(h0), np.zeros_like(h1)
+    up0[1:], up1[1:] = h0[:-1], h1[:-1]
+    down0, down1 = np.zeros_like(h0), np.zeros_like(h1)
+    down0[:-1], down1[:-1] = h0[1:], h1[1:]
+    if cols is not None:
+        up0[0], up1[0] = h0[-1], h1[-1]
+        down0[-1], down1[-1] = h0[0], h1[0]
+
+    # Sum of the rows above and below (0..6)
+    s0 = up0 ^ down0
+    c0 = up0 & down0
+    s1 = up1 ^ down1 ^ c0
+    s2 = (up1 & down1) | (c0 & (up1 ^ down1))
+
+    # Add the row itself, the count is modulo 8 (8 neighbors is like 0)
+    t0 = s0 ^ m0
+    k0 = s0 & m0
+    t1 = s1 ^ m1 ^ k0
+    k1 = (s1 & m1) | (k0 & (s1 ^ m1))
+    t2 = s2 ^ k1
+
+    if rule.isConway():
+        # Alive with 2 or 3 neighbors, born with 3 neighbors (the cell is dead with 0 and 8 neighbors)
+        return t1 & ~t2 & (t0 | bits) & mask
+
+    # 8 neighbors only if all the cells around are alive
+    eight = m1 & up0 & up1 & down0 & down1
+    planes = ((t0, ~t0), (t1, ~t1), (t2, ~t2))
+
+    def equals(count):
+        if count == 8:
+            return eight
+        result = planes[0][0 if count & 1 else 1] & planes[1][0 if count & 2 else 1] & planes[2][0 if count & 4 else 1]
+        return result & ~eight if count == 0 else result
+
+    # Born and survived cells from the counts of the rule
+    table = rule.table.reshape(2, COUNTS)
+    born, survive = np.zeros_like(bits), np.zeros_like(bits)
+    for count in range(COUNTS):
+        if table[0, count] or table[1, count]:
+            equal = equals(count)
+            if table[0, count]:
+                born |= equal
+            if table[1, count]:
+                survive |= equal
+    return ((born & ~bits) | (survive & bits)) & mask
+
+
+class BitPackedEngine:
+    """
+        Step engine over a bit-packed grid, 64 cells per uint64 word
+        Composed by:
+        - rows of words with the alive cells
+        - number of columns and mask of the valid cells of the last word
+        - alive cells and their ages at the last conversion, the ages only of the alive cells
+        - words of the generation before the last one, for the births counted only when asked
+        - rule of the evolution, Life-like
+        - boundary mode of the grid, dead or torus
+
+        The engine does not track the age of the cells, the ages returned
+        by toGrid are rebuilt with mergeAges. No age grid is kept between
+        the conversions, only the bits and the ages of the alive cells.
+    """
+
+    name = "bitpacked"
+    boundaries = (DEAD, TORUS)
+
+    def __init__(self, rule=CONWAY, boundary=DEAD):
+        self._cols = 0
+        self._bits = np.zeros((0, 0), dtype='<u8')
+        self._mask = columnMask(0)
+        self._agedBits = self._bits
+        self._agedValues = np.zeros(0, dtype=np.uint8)
+        self._generations = 0
+        self._previousBits = None
+        self.setRule(rule)
+        self.setBoundary(boundary)
+
+    def setRule(self, rule):
+        if not rule.isLifeLike():
+            raise ValueError("The {} engine supports only Life-like rules, not {}".format(self.name, rule))
+        self.rule = rule
+
+    def setBoundary(self, boundary):
+        checkBoundary(self, boundary, self.rule)
+        self.boundary = boundary
+
+    def load(self, grid):
+        """
+        Load the state of the engine from an age grid
+        """
+        grid = np.asarray(grid, dtype=np.uint8)
+        self._cols = grid.shape[1]
+        self._bits = packGrid(grid)
+        self._mask = columnMask(self._cols)
+        self._agedBits, self._agedValues = self._bits, grid[grid > 0]
+        self._generations = 0
+        self._previousBits = None
+
+    def step(self, generations=1):
+        """
+        Advance the given number of generations
+        """
+        cols = self._cols if self.boundary == TORUS else None
+        for _ in range(generations):
+            self._previousBits, self._bits = self._bits, nextGenerationBits(self._bits, self._mask, self.rule, cols)
+        self._generations += generations
+
+    def getBits(self):
+        return self._bits
+
+    def toGrid(self):
+        """
+        Return the age grid of the current generation
+        """
+        alive = unpackGrid(self._bits, self._cols)
+        previous = np.zeros(alive.shape, dtype=np.uint8)
+        previous[unpackGrid(self._agedBits, self._cols)] = self._agedValues
+        ages = mergeAges(previous, alive, self._generations)
+        # The bits are never changed in place, every generation is a new array
+        self._agedBits, self._agedValues = self._bits, ages[alive]
+        self._generations = 0
+        return ages
+
+    def getShape(self):
+        return self._bits.shape[0], self._cols
+
+    def getPopulation(self):
+        return populationCount(self._bits)
+
+    def getBirths(self):
+        """
+        Number of cells born in the last generation, None before the first one
+        """
+        if self._previousBits is None:
+            return None
+        return populationCount(self._bits & ~self._previousBits)
+
+    def getBoundingBox(self):
+        """
+        Box (top, left, bottom, right) of the alive cells, None if empty.
+        The columns come from the words of the rows in the box merged in a single row
+        """
+        rows = np.flatnonzero(self._bits.any(axis=1))
+        if rows.size == 0:
+            return None
+        words = np.bitwise_or.reduce(self._bits[rows[0]:rows[-1] + 1], axis=0)
+        cols = np.flatnonzero(unpackGrid(words[None, :], self._cols)[0])
+        return int(rows[0]), int(cols[0]), int(rows[-1]) + 1, int(cols[-1]) + 1
+
+    def getStateHash(self):
+        """
+        Hash of the packed alive cells, the grid is not unpacked
+        """
+        return arraysHash(self._bits, np.array([self._cols]))
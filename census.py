@@ -0,0 +1,282 @@
+import csv
+import json
+import threading
+from collections import deque
+import numpy as np
+
+from engine import DEAD, TORUS, countBirths, engineOrigin
+
+# Lower bounds of the bins of the age histogram: 1, 2-3, 4-7, ..., 128-255
+AGE_BINS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+# Generations between two age histograms, the histogram reads the whole grid
+DEFAULT_HISTOGRAM_EVERY = 64
+
+# Number of censuses kept in the history of a stream
+DEFAULT_CENSUS_HISTORY = 4096
+
+# Fewest and most rows (columns) of the grid read at once looking for the first cell not dead from a side
+_BOX_CHUNKS = (1, 256)
+
+# Fields of every census, the histogram follows as one field per bin
+CENSUS_FIELDS = ("generation", "population", "births", "deaths", "top", "left", "bottom", "right")
+
+
+class Census:
+    """
+        Statistics of a generation
+        Composed by:
+        - number of the generation
+        - population, births and deaths from the previous generation (None if the previous generation is unknown)
+        - bounding box (top, left, bottom, right) of the cells not dead, in the coordinates of the grid loaded,
+          None if the grid is empty
+        - histogram of the ages of the alive cells in the bins of AGE_BINS (of the states for Generations rules),
+          None in the generations not sampled
+    """
+
+    def __init__(self, generation, population, births=None, deaths=None, box=None, histogram=None):
+        self.generation = generation
+        self.population = population
+        self.births = births
+        self.deaths = deaths
+        self.box = box
+        self.histogram = histogram
+
+    def toRecord(self, labels=()):
+        """
+        Flat dictionary of the census, with a field for every bin of the histogram labelled
+        """
+        box = self.box if self.box is not None else (None,) * 4
+        record = dict(zip(CENSUS_FIELDS, (self.generation, self.population, self.births, self.deaths) + tuple(box)))
+        for index, label in enumerate(labels):
+            record[label] = self.histogram[index] if self.histogram is not None else None
+        return record
+
+    def __repr__(self):
+        return "Census(generation={}, population={}, births={}, deaths={}, box={})".format(
+            self.generation, self.population, self.births, self.deaths, self.box)
+
+
+def histogramLabels(rule):
+    """
+    Names of the bins of the histogram of the rule: ages for Life-like rules, states for Generations rules
+    """
+    if not rule.isLifeLike():
+        return ["state_{}".format(state) for state in range(1, rule.states)]
+    bounds = AGE_BINS + (256,)
+    return ["age_{}".format(low) if high - low == 1 else "age_{}_{}".format(low, high - 1)
+            for low, high in zip(bounds, bounds[1:])]
+
+
+def ageHistogram(grid, rule, population=None):
+    """
+    Number of alive cells in every bin of the ages (of the states for Generations rules).
+    The cells are counted over the thresholds of the bins, cheaper than a bincount of the whole grid,
+    the cells over the first one are the population if given
+    """
+    grid = np.asarray(grid)
+    if not rule.isLifeLike():
+        return [int(count) for count in np.bincount(grid.ravel(), minlength=rule.states)[1:rule.states]]
+    above = [population if population is not None else int(np.count_nonzero(grid))]
+    above += [int(np.count_nonzero(grid >= low)) for low in AGE_BINS[1:]] + [0]
+    return [above[index] - above[index + 1] for index in range(len(AGE_BINS))]
+
+
+def boundingBox(grid, within=None):
+    """
+    Box (top, left, bottom, right) of the cells not dead, None if the grid is empty.
+    Only the region within the given box (the whole grid if None) is searched: from every side
+    the rows and the columns are read only up to the first cell not dead, in chunks that double
+    """
+    grid = np.asarray(grid)
+    top, left, bottom, right = within if within is not None else (0, 0) + grid.shape
+    region = grid[top:bottom, left:right]
+    first = _firstLine(region)
+    if first is None:
+        return None
+    inside = region[first:region.shape[0] - _firstLine(region[::-1])]
+    return (top + first, left + _firstLine(inside.T),
+            top + first + inside.shape[0], left + inside.shape[1] - _firstLine(inside.T[::-1]))
+
+
+def _firstLine(lines):
+    """
+    Index of the first line (row of the array) with a cell not dead, None if all dead.
+    Every chunk is as long as the lines already read, the first one with a cell not dead
+    is halved until a line is left
+    """
+    start, chunk = 0, _BOX_CHUNKS[0]
+    while start < len(lines):
+        block = lines[start:start + chunk]
+        if np.count_nonzero(block):
+            while len(block) > 1:
+                half = len(block) // 2
+                if np.count_nonzero(block[:half]):
+                    block = block[:half]
+                else:
+                    start, block = start + half, block[half:]
+            return start
+        start += chunk
+        chunk = min(start, _BOX_CHUNKS[1])
+    return None
+
+
+class CensusStream:
+    """
+        Stream of the census of the generations of a step engine
+        Composed by:
+        - listeners called with every census
+        - generations between two age histograms
+        - last censuses, for the plots
+        - population and number of the last generation observed, for the deaths
+        - previous grid, kept only for the births of the Generations rules in the engines that do not count them
+
+        The counts come from the engine where they are byproducts of the step (getBirths,
+        getBoundingBox, getAgeHistogram), otherwise from its grid. The engines whose grid is only a window
+        of the universe give None for the counts they do not track, the counts of the window are never taken.
+        The stream can be observed by a worker thread and read by another one.
+    """
+
+    def __init__(self, histogramEvery=DEFAULT_HISTOGRAM_EVERY, history=DEFAULT_CENSUS_HISTORY):
+        self._listeners = []
+        self._histogramEvery = histogramEvery
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._last = None
+        self._previous = None
+
+    def addListener(self, listener):
+        self._listeners.append(listener)
+
+    def removeListener(self, listener):
+        self._listeners.remove(listener)
+
+    def reset(self):
+        """
+        Forget the last generation observed: the grid has been changed outside the engine
+        """
+        self._last = None
+        self._previous = None
+
+    def observe(self, engine, generation, population=None):
+        """
+        Take the census of the current generation of the engine and publish it.
+        The population can be given if already counted
+        """
+        if population is None:
+            population = engine.getPopulation()
+        births = deaths = None
+        # Births, deaths and search of the box from the generation before
+        consecutive = self._last is not None and generation == self._last.generation + 1
+        if consecutive:
+            births = engine.getBirths() if hasattr(engine, "getBirths") else self._birthsOfGrid(engine)
+            if births is not None:
+                deaths = self._last.population - (population - births)
+        if not hasattr(engine, "getBirths") and not engine.rule.isLifeLike():
+            self._previous = np.array(engine.toGrid())
+
+        if hasattr(engine, "getBoundingBox"):
+            box = engine.getBoundingBox()
+        else:
+            box = self._boundingBoxOfGrid(engine, self._last.box if consecutive else None, consecutive)
+
+        histogram = None
+        if self._histogramEvery and generation % self._histogramEvery == 0:
+            if hasattr(engine, "getAgeHistogram"):
+                histogram = engine.getAgeHistogram()
+            else:
+                histogram = ageHistogram(engine.toGrid(), engine.rule, population)
+
+        census = Census(generation, population, births, deaths, box, histogram)
+        with self._lock:
+            # Generations observed again after a restart replace the ones in the history
+            while self._history and self._history[-1].generation >= generation:
+                self._history.pop()
+            self._history.append(census)
+        self._last = census
+        for listener in self._listeners:
+            listener(census)
+        return census
+
+    def _birthsOfGrid(self, engine):
+        """
+        Births of the last generation of an engine that does not count them: the newborn cells have age 1,
+        for the Generations rules the cells in state 1 that were dead in the previous grid
+        """
+        grid = np.asarray(engine.toGrid())
+        if engine.rule.isLifeLike():
+            return int(np.count_nonzero(grid == 1))
+        if self._previous is None or self._previous.shape != grid.shape:
+            return None
+        return countBirths(self._previous, grid)
+
+    def _boundingBoxOfGrid(self, engine, previous, consecutive):
+        """
+        Box of the cells of an engine that does not track it. The cells move of a cell per generation
+        at most, after the previous generation only its box grown of a cell is searched. Not when the grid
+        is a window of a larger universe, the grown box wraps around the torus or the rule has births without neighbors
+        """
+        grid = engine.toGrid()
+        top, left = engineOrigin(engine)
+        within = None
+        if consecutive and engine.boundary in (DEAD, TORUS) and not engine.rule.hasBirthWithoutNeighbors():
+            if previous is None:
+                return None
+            within = (previous[0] + top - 1, previous[1] + left - 1, previous[2] + top + 1, previous[3] + left + 1)
+            if engine.boundary == DEAD:
+                within = (max(within[0], 0), max(within[1], 0), min(within[2], grid.shape[0]), min(within[3], grid.shape[1]))
+            elif within[0] < 0 or within[1] < 0 or within[2] > grid.shape[0] or within[3] > grid.shape[1]:
+                within = None
+        box = boundingBox(grid, within)
+        if box is None:
+            return None
+        return box[0] - top, box[1] - left, box[2] - top, box[3] - left
+
+    def getLatest(self):
+        """
+        Last census observed, None if no generation was observed
+        """
+        with self._lock:
+            return self._history[-1] if self._history else None
+
+    def getHistory(self):
+        """
+        Last censuses observed, from the oldest
+        """
+        with self._lock:
+            return list(self._history)
+
+    def clear(self):
+        with self._lock:
+            self._history.clear()
+        self.reset()
+
+
+class CensusWriter:
+    """
+        Writer of a stream of censuses on file, CSV if the path ends with .csv, otherwise
+        newline-delimited JSON (one generation per line)
+        Composed by:
+        - file opened and CSV writer
+        - labels of the bins of the histogram
+    """
+
+    def __init__(self, path, rule):
+        self._file = open(path, "w", newline="")
+        self._labels = histogramLabels(rule)
+        self._writer = None
+        if path.lower().endswith(".csv"):
+            self._writer = csv.DictWriter(self._file, fieldnames=list(CENSUS_FIELDS) + self._labels)
+            self._writer.writeheader()
+
+    def write(self, census):
+        if self._writer is not None:
+            self._writer.writerow(census.toRecord(self._labels))
+            return
+        record = census.toRecord()
+        if census.histogram is not None:
+            record["histogram"] = dict(zip(self._labels, census.histogram))
+        self._file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,148 @@
+import glob
+import os
+import queue
+import threading
+import time
+
+from snapshot import SNAPSHOT_EXTENSION, loadSnapshot, saveSnapshot
+from tracing import getTracer
+
+_trace = getTracer("checkpoint")
+
+# Prefix of the checkpoint files, followed by the step
+CHECKPOINT_PREFIX = "checkpoint-"
+
+# Seconds waited by close for the checkpoint in progress
+CLOSE_TIMEOUT = 30.0
+
+
+def checkpointPaths(directory):
+    """
+    Checkpoint files in the directory, from the oldest to the latest written.
+    The order of writing and not the step: a run restarted from a lower step writes the latest checkpoints
+    """
+    paths = glob.glob(os.path.join(directory, CHECKPOINT_PREFIX + "*" + SNAPSHOT_EXTENSION))
+    return sorted(paths, key=lambda path: (os.stat(path).st_mtime_ns, path))
+
+
+def latestCheckpoint(directory):
+    """
+    Path of the latest checkpoint in the directory, None if there are no checkpoints
+    """
+    paths = checkpointPaths(directory)
+    return paths[-1] if paths else None
+
+
+def resume(directory):
+    """
+    Snapshot of the latest checkpoint in the directory, None if there are no checkpoints
+    """
+    path = latestCheckpoint(directory)
+    return loadSnapshot(path) if path is not None else None
+
+
+class Checkpointer:
+    """
+        Periodic checkpoints of a simulation written by a background thread
+        Composed by:
+        - directory of the checkpoints and number of checkpoints kept
+        - period in generations and/or in seconds
+        - slot with the checkpoint waiting to be written
+
+        The step loop never waits the disk: if a checkpoint is still waiting
+        when a new one is requested, the older one is replaced. A checkpoint that
+        cannot be written is traced and the next ones are still written.
+    """
+
+    def __init__(self, directory, everyGenerations=None, everySeconds=None, keep=3, packed=False, compressed=False, startStep=0):
+        self._directory = directory
+        self._everyGenerations = everyGenerations
+        self._everySeconds = everySeconds
+        self._keep = max(keep, 1)
+        self._packed = packed
+        self._compressed = compressed
+
+        self._lastStep = startStep
+        self._lastTime = time.monotonic()
+        self._written = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._run, name="checkpointer", daemon=True)
+        self._thread.start()
+
+    def isDue(self, step):
+        """
+        True if a checkpoint of the given step has to be written
+        """
+        if step < self._lastStep:
+            # The simulation restarted from a previous step (cleared or loaded), the period starts again
+            self._lastStep = step
+        if self._everyGenerations and step - self._lastStep >= self._everyGenerations:
+            return True
+        return bool(self._everySeconds) and time.monotonic() - self._lastTime >= self._everySeconds
+
+    def save(self, step, grid, rule=None):
+        """
+        Request the checkpoint of the given step, the grid must not be modified afterwards
+        """
+        self._lastStep = step
+        self._lastTime = time.monotonic()
+        item = (step, grid, rule)
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                # Replace the checkpoint still waiting with the newer one
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                except queue.Empty:
+                    pass
+
+    def getWritten(self):
+        return self._written
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """
+        Wait the checkpoint in progress and stop the thread, at most timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            # The checkpoint waiting is written before the thread stops
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(max(deadline - time.monotonic(), 0))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception:
+                # A failed checkpoint (disk full, permissions, ...) does not stop the next ones
+                _trace.exception("checkpoint not written step=%d", item[0])
+            finally:
+                self._queue.task_done()
+
+    def _write(self, step, grid, rule):
+        path = os.path.join(self._directory, "{}{:012d}{}".format(CHECKPOINT_PREFIX, step, SNAPSHOT_EXTENSION))
+        temporary = path + ".tmp"
+        options = {"rule": rule} if rule is not None else {}
+        try:
+            saveSnapshot(temporary, grid, step, packed=self._packed, compressed=self._compressed, **options)
+        except Exception:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        # The checkpoint appears only when complete
+        os.replace(temporary, path)
+        self._written += 1
+
+        # Retention of the latest checkpoints
+        for old in checkpointPaths(self._directory)[:-self._keep]:
+            os.remove(old)
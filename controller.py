@@ -2,7 +2,14 @@ from PyQt5.QtWidgets import QApplication
 from PyQt5 import QtCore
 from model import GolModel
 from view import GolView
-import numpy as np
+from worker import SimulationWorker
+from cycle import CycleDetector
+from profiler import PROFILER
+from tracing import getTracer
+from simulation import parseSize
+from rules import parseRule
+
+_trace = getTracer("controller")
 
 class GolController:
     """
@@ -11,7 +18,7 @@ class GolController:
         - cells for evolution of the game
         - layout for the part where costruct the grid
 
-        RULES of the Game
+        RULES of the Game (Conway's rule B3/S23, any other rule can be selected)
 
          - If a cell is ON and has fewer than two neighbors that are ON, it turns OFF
          - If a cell is ON and has either two or three neighbors that are ON, it remains ON.
@@ -31,9 +38,16 @@ class GolController:
         self._model = model
         self._view = view
 
-        # set timer for simulation
+        # set timer for picking up the generations computed by the worker thread
         self._timer = QtCore.QTimer()
-        self._timer.timeout.connect(self.nextStep)
+        self._timer.timeout.connect(self._collect)
+        self._worker = None
+        self._checkpointer = None
+
+        # detector of still lifes and oscillators, valid for the grid version observed last
+        self._detector = CycleDetector(states=self._model.getRule().states)
+        self._detectorVersion = None
+        self._pauseOnCycle = True
 
         # connect all the elements on the view to the controller
         self._view.buttonPlay(self.play)
@@ -41,67 +55,184 @@ class GolController:
         self._view.buttonStep(self.nextStep)
         self._view.buttonClear(self.clear)
         self._view.sliderSpeed(self.modifyFps)
+        self._view.checkTurbo(self.modifyTurbo)
+        self._view.checkPauseOnCycle(self.modifyPauseOnCycle)
         self._view.comboSizeGridText(self.modifyGridSize)
+        self._view.comboRule(self.modifyRule)
+        self._view.comboBoundary(self.modifyBoundary)
+        self._model.register(self._ruleChanged, "rule_changed")
+        self._model.register(self._syncWindow, "viewport_changed")
+        self._model.register(self._syncWindow, "size_changed")
         self._view.grid.changeStateSignal.connect(self.modifyGrid)
+        self._view.grid.zoomSignal.connect(self.zoomGrid)
+        self._view.grid.panSignal.connect(self.panGrid)
 
 
     def play(self):
         """
         Start the game
         """
-        print("Play clicked")
+        _trace.info("play step=%d", self._model.getStep())
         self._model.setRunning(not self._model.isRunning())
         if self._model.isRunning():
+            # Resuming after a cycle, the detection starts again
+            if self._detector.getCycle() is not None:
+                self._detectorVersion = None
+            self._startWorker()
+
+    def _startWorker(self):
+        """
+        The generations are computed by the worker thread, the timer shows the latest one
+        """
+        self._syncDetector()
+        self._worker = SimulationWorker(self._model.loadEngine(), generation=self._model.getStep(), detector=self._detector,
+                                        census=self._model.getCensus(), checkpointer=self._checkpointer)
+        self._syncWindow()
+        self._setIntervals()
+        self._worker.start()
+        self._timer.start()
+
+    def _syncWindow(self, *args):
+        """
+        The worker reads only the part of the grid shown
+        """
+        if self._worker is not None:
+            self._worker.setWindow(*self._model.getEngineViewport())
+
+    def _setIntervals(self):
+        """
+        Set the interval between the generations and between the frames shown.
+        In turbo mode the generations are not throttled and the frames follow the display refresh rate
+        """
+        if self._model.isTurbo():
+            self._worker.setInterval(0.0)
+            refreshRate = self._application.primaryScreen().refreshRate() or 60
+            self._timer.setInterval(int(1000 / refreshRate))
+        else:
             interval = 1000 / self._model.getFps()
-            self._timer.setInterval(interval)
-            self._timer.start()
+            self._worker.setInterval(interval / 1000)
+            self._timer.setInterval(int(interval))
 
 
     def pause(self):
         """
         Stop the game
         """
-        print("Pause clicked")
+        _trace.info("pause step=%d", self._model.getStep())
+        self._stopWorker()
         self._model.setRunning(False)
+
+    def _stopWorker(self):
+        """
+        Stop the worker thread and show the last generation computed
+        """
         self._timer.stop()
+        if self._worker is not None:
+            self._worker.stop()
+            self._collect()
+            self._worker = None
+            self._model.setGenerationsPerSecond(0.0)
 
+    def setCheckpointer(self, checkpointer):
+        """
+        Write periodic checkpoints of the simulation with the given checkpointer
+        """
+        self._checkpointer = checkpointer
+
+    def _checkpoint(self):
+        step = self._model.getStep()
+        if self._checkpointer is not None and self._checkpointer.isDue(step):
+            self._checkpointer.save(step, self._model.getGrid(), self._model.getRule().toString())
+
+    @PROFILER.timed("collect")
+    def _collect(self):
+        """
+        Show the latest generation completed by the worker thread, the previous ones are dropped
+        """
+        latest = self._worker.takeLatest()
+        self._model.setGenerationsPerSecond(self._worker.getGenerationsPerSecond())
+        if latest is None:
+            return
+        cells, window, shape, origin, generation = latest
+        with self._model.batch():
+            self._model.setStep(generation)
+            self._model.setEngineWindow(cells, window, shape, origin)
+        PROFILER.tick("frame")
+        self._detectorVersion = self._model.getGridVersion()
+        # The viewport kept inside the grid grown
+        self._syncWindow()
+
+        cycle = self._worker.getCycle()
+        if cycle is not None and cycle is not self._model.getCycle():
+            self._cycleDetected(cycle)
+
+    def _syncDetector(self):
+        """
+        Forget the history of the cycle detector if the grid has been modified
+        since the last generation observed, then observe the current generation
+        """
+        if self._model.getGridVersion() != self._detectorVersion:
+            self._detector.reset()
+            if self._model.getCycle() is not None:
+                self._model.setCycle(None)
+            self._observeCycle()
+
+    def _observeCycle(self):
+        # The whole state of the engine, the cells outside the grid too, hashed like in the worker thread
+        cycle = self._detector.observeEngine(self._model.getStep(), self._model.loadEngine())
+        self._detectorVersion = self._model.getGridVersion()
+        return cycle
+
+    def _cycleDetected(self, cycle):
+        """
+        Show the cycle detected and pause the simulation if requested
+        """
+        _trace.info("cycle period=%d start=%d detected=%d", cycle.period, cycle.start, cycle.detected)
+        self._model.setCycle(cycle)
+        if self._pauseOnCycle and self._model.isRunning():
+            self.pause()
+
+    @PROFILER.timed("next_step")
     def nextStep(self):
         """
         Do next step of the game
         """
-        print("Next Step")
-        self._model.setStep(self._model.getStep()+1)
+        _trace.generation("next step step=%d", self._model.getStep())
+        self._syncDetector()
+        # A single notification for the step and the grid
+        with self._model.batch():
+            self._model.setStep(self._model.getStep()+1)
 
-        grid = self._model.getGrid()
-        newGrid = np.zeros((grid.shape[0],grid.shape[1]), dtype=np.uint8)
-        for i in range(grid.shape[0]):
-            for j in range(grid.shape[1]):
-                # If a cell is OFF and has exactly three neighbors that are ON, it turns ON
-                if grid[i, j] == 0 and self._neighbors(i, j) == 3:
-                    newGrid[i, j] = 1
+            # Step of the whole grid with the engine selected in the model
+            self._model.advance()
+        PROFILER.tick("frame")
+        self._checkpoint()
 
-                elif grid[i, j] >= 1:
-                    # If a cell is ON and has <2 or >3 neighbors that are ON, it turns OFF
-                    if self._neighbors(i, j) < 2 or self._neighbors(i, j) > 3:
-                        newGrid[i, j] = 0
-                    else:
-                    # If a cell is ON and has exactly 2 or 3 neighbors that are ON, it remains ON
-                    # The value assigned is based on the number of steps in which the cell is ON
-                        newGrid[i, j] = grid[i, j] + 1
-                        if grid[i, j] == 255:
-                            newGrid[i, j] = grid[i, j]
+        cycle = self._observeCycle()
+        if cycle is not None and cycle is not self._model.getCycle():
+            self._cycleDetected(cycle)
 
-        self._model.setGrid(newGrid)
 
+    def advance(self, generations):
+        """
+        Advance the game of the given number of generations with a single call to the engine
+        """
+        with self._model.batch():
+            self._model.setStep(self._model.getStep() + generations)
+            self._model.advance(generations)
+        self._checkpoint()
 
     def clear(self):
         """
         Clear the grid and stop the simulation
         """
-        self._model.setRunning(False)
-        self._timer.stop()
-        self._model.setStep(0)
-        self._model.clearGrid()
+        self._stopWorker()
+        with self._model.batch():
+            self._model.setRunning(False)
+            self._model.setStep(0)
+            self._model.clearGrid()
+            self._model.setCycle(None)
+        self._model.getCensus().clear()
 
     def modifyFps(self,fps):
         """
@@ -109,92 +240,111 @@ class GolController:
         """
         self._model.setFps(fps)
 
-    def _neighbors(self, i, j):
+    def modifyTurbo(self, turbo):
         """
-        Find the number of neighbors of cell i,j
+        Enable or disable the turbo mode, also while the simulation is running
         """
-        grid = self._model.getGrid()
-        # Filter for the conv 3x3
-        indexes = []
-        indexes.append([i - 1, j - 1])
-        indexes.append([i, j - 1])
-        indexes.append([i + 1, j - 1])
-
-        indexes.append([i - 1, j])
-        indexes.append([i + 1, j])
-
-        indexes.append([i - 1, j + 1])
-        indexes.append([i, j + 1])
-        indexes.append([i + 1, j + 1])
+        self._model.setTurbo(bool(turbo))
+        if self._worker is not None:
+            self._setIntervals()
 
-        indexes = self._checkPadding(indexes, grid.shape[0], grid.shape[1])
-        neighbours = 0
-        for cell in indexes:
-            if grid[cell[0], cell[1]] > 0:
-                neighbours += 1
-        return neighbours
+    def modifyPauseOnCycle(self, pauseOnCycle):
+        """
+        Enable or disable the pause of the simulation when a cycle is detected
+        """
+        self._pauseOnCycle = bool(pauseOnCycle)
 
-    def _checkPadding(self, indexes, maxRows, maxCols):
+    def modifyRule(self, rule_text):
+        """
+        Modify the rule of the game, a preset name or a rule written in B/S notation
         """
-        Control the paddings cell
+        _trace.info("rule changed rule=%s", rule_text)
+        if self._model.isRunning():
+            return
+        try:
+            self._model.setRule(parseRule(rule_text))
+        except ValueError as error:
+            _trace.warning("invalid rule rule=%s", rule_text)
+            self._view.showError("Rule Error", str(error))
+            # Show the rule still in use
+            self._view.showRule(self._model.getRule())
+
+    def modifyBoundary(self, boundary):
+        """
+        Modify the boundary mode of the grid
+        """
+        _trace.info("boundary changed boundary=%s", boundary)
+        if self._model.isRunning():
+            return
+        try:
+            self._model.setBoundary(boundary)
+        except ValueError as error:
+            _trace.warning("invalid boundary boundary=%s", boundary)
+            self._view.showError("Boundary Error", str(error))
+            self._view.showBoundary(self._model.getBoundary())
+
+    def _ruleChanged(self, rule):
         """
-        notPadding = []
-        for index in indexes:
-            if index[0] >= 0 and index[1] >= 0 and index [0] < maxRows and index[1] < maxCols:
-                notPadding.append(index)
-        return notPadding
+        The states of the cells depend on the rule, the cycle detection starts again
+        """
+        self._detector = CycleDetector(states=rule.states)
+        self._detectorVersion = None
+        if self._model.getCycle() is not None:
+            self._model.setCycle(None)
 
     def modifyGrid(self, coord_click):
         """
         Modify the cell of grid where the user clicked
         """
-        grid = self._model.getGrid()
         click_x = coord_click[0]
         click_y = coord_click[1]
-        print("cliccato in ", click_x, " - ", click_y)
-        right_click = (grid.shape[0] - self._model.getGridSizeSelected()[0])//2
-        grid[right_click + click_x][right_click + click_y] = 1 if grid[right_click + click_x][right_click + click_y] == 0 else 0
+        _trace.debug("click row=%d col=%d", click_x, click_y)
+        top, left, _, _ = self._model.getViewport()
+        running = self._worker is not None
+        # The whole grid is read from the engine, then the worker continues from the modified grid
+        self._stopWorker()
+        self._model.changeStateCell(top + click_x, left + click_y)
+        if running:
+            self._startWorker()
+
+    def zoomGrid(self, zoom):
+        """
+        Zoom the part of the grid shown by the factor, around the position (fraction of the height and width)
+        """
+        factor, anchor = zoom
+        _trace.debug("zoom factor=%.2f", factor)
+        self._model.zoomViewport(factor, anchor)
 
-        self._model.setGrid(grid)
+    def panGrid(self, cells):
+        """
+        Move the part of the grid shown by the cells (rows, cols) dragged
+        """
+        _trace.debug("pan rows=%d cols=%d", cells[0], cells[1])
+        self._model.panViewport(cells[0], cells[1])
 
     def modifyGridSize(self, size_text):
         """
-        Modify the size of the grid
+        Modify the size of the grid shown, any size written as ROWSxCOLS
         """
-        print("E' cambiata la size della griglia nella combobox ")
-        print("Nuova size : " , size_text)
-
-        #row, col = int(size_text[0:int(size_text.rfind("x"))]), int(size_text[int(size_text.rfind("x")) + 1:5])
-
-        self._model.setGridSizeSelected(size_text)
-
-
+        _trace.info("grid size changed size=%s", size_text)
+        try:
+            size = parseSize(size_text)
+        except ValueError:
+            _trace.warning("invalid grid size size=%s", size_text)
+            return
+
+        rows, cols = self._model.getGridSize()
+        if self._worker is None or (size[0] <= rows and size[1] <= cols):
+            self._model.setGridSizeSelected(size)
+            return
+        # The worker continues on the bigger grid
+        self._stopWorker()
+        self._model.setGridSizeSelected(size)
+        self._startWorker()
 
     def _populateGrid(self, row, col):
         """
         Create a new grid with new size and populate this with the elements of the previous grid
         """
-        print("Populate grid ", row, "x", col)
-        new_grid = np.zeros((row, col), dtype=np.uint8)
-        old_grid = self._model.getGrid()
-
-        if row >= old_grid.shape[0] and col >= old_grid.shape[1]:
-            zoom_out = True
-            row_min, col_min = old_grid.shape[0],old_grid.shape[1]
-        else:
-            zoom_out = False
-            row_min, col_min = row, col
-
-        diff_row = abs(old_grid.shape[0] - new_grid.shape[0])//2
-        diff_col = abs(old_grid.shape[1] - new_grid.shape[1])//2
-
-        for i in range(row_min):
-            for j in range(col_min):
-                if zoom_out:
-                    new_grid[i+diff_row][j+diff_col] = old_grid[i][j]
-                else:
-                    new_grid[i][j] = old_grid[i+diff_row][j+diff_col]
-
-        self._model.setGrid(new_grid)
-
-
+        _trace.debug("populate grid rows=%d cols=%d", row, col)
+        self._model.resizeGrid(row, col)
@@ -0,0 +1,145 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+from engine import MAX_AGE
+
+# Number of generations remembered by default
+DEFAULT_HISTORY = 1024
+
+
+class Cycle:
+    """
+        Cycle detected in the evolution of a grid
+        Composed by:
+        - period (1 for still lifes and extinct grids)
+        - first generation of the cycle seen in the history
+        - generation in which the cycle has been detected
+    """
+
+    def __init__(self, period, start, detected):
+        self.period = period
+        self.start = start
+        self.detected = detected
+
+    def __repr__(self):
+        return "Cycle(period={}, start={}, detected={})".format(self.period, self.start, self.detected)
+
+
+def stateHash(grid, states=2):
+    """
+    Hash of the alive cells of the grid, the ages are not part of the state.
+    For the Generations rules (more than 2 states) the states of the cells are hashed
+    """
+    if states > 2:
+        grid = np.ascontiguousarray(grid, dtype=np.uint8)
+        return _digest(grid, grid.shape)
+    alive = np.asarray(grid) > 0
+    return _digest(np.packbits(alive), alive.shape)
+
+
+def stateHashes(grids, states=2):
+    """
+    Hashes of a stack of grids (boards x rows x cols), the bits of all the boards are packed at once
+    """
+    if states > 2:
+        grids = np.ascontiguousarray(grids, dtype=np.uint8)
+        return [_digest(board, grids.shape[1:]) for board in grids]
+    alive = np.asarray(grids) > 0
+    bits = np.packbits(alive.reshape(alive.shape[0], -1), axis=1)
+    return [_digest(board, alive.shape[1:]) for board in bits]
+
+
+def engineStateHash(engine):
+    """
+    Hash of the whole state of the engine. The engines with getStateHash hash all their cells,
+    also the ones outside the grid, without building the grid
+    """
+    if hasattr(engine, "getStateHash"):
+        return engine.getStateHash()
+    return stateHash(engine.toGrid(), engine.rule.states)
+
+
+def arraysHash(*arrays):
+    """
+    Hash of the contents and of the shapes of the arrays, for the engines that hash their own cells
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(array.tobytes())
+        digest.update(np.array(array.shape, dtype=np.int64).tobytes())
+    return digest.digest()
+
+
+def _digest(bits, shape):
+    digest = hashlib.blake2b(bits.tobytes(), digest_size=16)
+    digest.update(np.array(shape, dtype=np.int64).tobytes())
+    return digest.digest()
+
+
+def skipAhead(grid, period, generations, states=2):
+    """
+    Age grid after the given number of generations (a multiple of the period) of a cycle.
+    The alive cells are the same, the cells alive for a whole period are alive in every
+    phase and get older, the ages of the other cells repeat with the cycle.
+    The states of the Generations rules repeat with the cycle
+    """
+    if states > 2:
+        return np.asarray(grid, dtype=np.uint8)
+    grid = np.asarray(grid, dtype=np.uint8)
+    aged = np.minimum(grid.astype(np.int64) + generations, MAX_AGE).astype(np.uint8)
+    return np.where(grid >= period, aged, grid)
+
+
+class CycleDetector:
+    """
+        Detector of still lifes and oscillators with a rolling history of state hashes
+        Composed by:
+        - bounded history of the hashes of the generations observed
+        - cycle detected, None until a cycle is found
+        - number of states of the rule, the dying states of the Generations rules are part of the state
+    """
+
+    def __init__(self, history=DEFAULT_HISTORY, states=2):
+        self._history = history
+        self.states = states
+        self._seen = OrderedDict()
+        self._cycle = None
+
+    def reset(self):
+        """
+        Forget the generations observed, for grids changed outside the evolution
+        """
+        self._seen.clear()
+        self._cycle = None
+
+    def getCycle(self):
+        return self._cycle
+
+    def observe(self, generation, grid):
+        """
+        Observe the grid of the given generation, return the cycle if the state has already been seen
+        """
+        return self.observeHash(generation, stateHash(grid, self.states))
+
+    def observeEngine(self, generation, engine):
+        """
+        Observe the whole state of the engine at the given generation
+        """
+        return self.observeHash(generation, engineStateHash(engine))
+
+    def observeHash(self, generation, key):
+        """
+        Observe the state hash of the given generation
+        """
+        previous = self._seen.get(key)
+        if previous is not None and previous < generation:
+            if self._cycle is None:
+                self._cycle = Cycle(generation - previous, previous, generation)
+            return self._cycle
+
+        self._seen[key] = generation
+        if len(self._seen) > self._history:
+            self._seen.popitem(last=False)
+        return None
@@ -0,0 +1,345 @@
+import numpy as np
+
+from rules import CONWAY, COUNTS
+
+# Maximum value of the age channel of a cell
+MAX_AGE = 255
+
+# Size of the square blocks of cells used to report the changed regions
+DIRTY_BLOCK = 16
+
+# Boundary modes of the grid: cells outside are dead, the edges wrap around (torus),
+# the grid grows when the alive cells reach an edge
+DEAD = "dead"
+TORUS = "torus"
+EXPAND = "expand"
+BOUNDARIES = (DEAD, TORUS, EXPAND)
+
+# Number of rows or columns added on a side when an expanding grid grows
+EXPAND_CHUNK = 64
+
+
+def neighborCount(grid, alive=None, wrap=False):
+    """
+    Count the alive neighbors of every cell of the grid at once.
+    The cells counted are the alive ones (the cells > 0 if None),
+    the cells outside the grid are considered dead (dead border),
+    or the opposite edges are neighbors if wrap (torus).
+    """
+    alive = (grid > 0 if alive is None else alive).view(np.uint8)
+    rows, cols = alive.shape[-2], alive.shape[-1]
+
+    # Pad with a border and sum the 3x3 box in two separable passes
+    padded = np.zeros(alive.shape[:-2] + (rows + 2, cols + 2), dtype=np.uint8)
+    padded[..., 1:-1, 1:-1] = alive
+    if wrap:
+        # Only the border is copied from the opposite edges, the corners come with the rows
+        padded[..., 1:-1, 0] = alive[..., :, -1]
+        padded[..., 1:-1, -1] = alive[..., :, 0]
+        padded[..., 0, :] = padded[..., -2, :]
+        padded[..., -1, :] = padded[..., 1, :]
+
+    rowSum = padded[..., :, :-2] + padded[..., :, 1:-1]
+    rowSum += padded[..., :, 2:]
+    count = rowSum[..., :-2, :] + rowSum[..., 1:-1, :]
+    count += rowSum[..., 2:, :]
+
+    # Remove the cell itself from the box sum
+    count -= alive
+    return count
+
+
+def nextGeneration(grid, rule=CONWAY, wrap=False):
+    """
+    Compute the next generation of the grid with the lookup table of the rule.
+    For Life-like rules the value of a cell is its age: 0 for dead cells, otherwise
+    the number of steps in which the cell is ON (saturated at MAX_AGE).
+    For Generations rules the value of a cell is its state.
+    If wrap the grid is a torus
+    """
+    return stepGeneration(grid, rule, wrap)[0]
+
+
+def stepGeneration(grid, rule=CONWAY, wrap=False):
+    """
+    Same as nextGeneration, return also the mask (uint8) of the cells born, a byproduct
+    of the lookup for Life-like rules. None for Generations rules, where it is not computed
+    """
+    if not rule.isLifeLike():
+        # Only the cells in state 1 are counted as neighbors
+        alive = grid == 1
+        count = neighborCount(grid, alive, wrap)
+        return rule.table.take(grid.astype(np.uint16) * COUNTS + count), None
+
+    alive = grid > 0
+    index = neighborCount(grid, alive, wrap)
+    index += alive.view(np.uint8) * np.uint8(COUNTS)
+    # 0 dead, 1 born, 2 survived
+    code = rule.table.take(index)
+
+    # The age of the survivors is incremented until the saturation, the newborn have age 1
+    aged = grid + (grid < MAX_AGE).view(np.uint8)
+    aged *= code >> 1
+    born = code & 1
+    aged += born
+    return aged, born
+
+
+def resizeGrid(grid, rows, cols):
+    """
+    Grid of the given size with the cells of the grid at the center: the grid is
+    cut if the new size is smaller, surrounded by dead cells if bigger.
+    The common part is copied with a single slice assignment
+    """
+    resized = np.zeros((rows, cols), dtype=np.uint8)
+    copyRows, copyCols = min(rows, grid.shape[0]), min(cols, grid.shape[1])
+    top, left = (grid.shape[0] - copyRows) // 2, (grid.shape[1] - copyCols) // 2
+    newTop, newLeft = (rows - copyRows) // 2, (cols - copyCols) // 2
+    resized[newTop:newTop + copyRows, newLeft:newLeft + copyCols] = grid[top:top + copyRows, left:left + copyCols]
+    return resized
+
+
+def resizeOffset(shape, rows, cols):
+    """
+    Rows and columns the cells move when a grid of the given shape is resized with resizeGrid
+    """
+    copyRows, copyCols = min(rows, shape[0]), min(cols, shape[1])
+    return (rows - copyRows) // 2 - (shape[0] - copyRows) // 2, (cols - copyCols) // 2 - (shape[1] - copyCols) // 2
+
+
+def edgesReached(grid):
+    """
+    Sides (top, left, bottom, right) of the grid with alive cells on the outermost row or column,
+    only the edges are read
+    """
+    return (bool(grid[0].any()), bool(grid[:, 0].any()), bool(grid[-1].any()), bool(grid[:, -1].any()))
+
+
+def expandGrid(grid, sides, chunk=EXPAND_CHUNK):
+    """
+    Grow the grid of a chunk of dead cells on the given sides (top, left, bottom, right).
+    Return the grid and the rows and columns added at the top and at the left
+    """
+    top, left, bottom, right = (chunk if side else 0 for side in sides)
+    expanded = np.zeros((grid.shape[0] + top + bottom, grid.shape[1] + left + right), dtype=grid.dtype)
+    expanded[top:top + grid.shape[0], left:left + grid.shape[1]] = grid
+    return expanded, top, left
+
+
+def checkBoundary(engine, boundary, rule):
+    """
+    Raise ValueError if the boundary mode is not supported by the engine or by the rule
+    """
+    if boundary not in engine.boundaries:
+        raise ValueError("The {} engine supports only the boundaries {}, not {}".format(
+            engine.name, ", ".join(engine.boundaries), boundary))
+    if boundary == EXPAND and rule.hasBirthWithoutNeighbors():
+        raise ValueError("The rule {} fills the whole plane, the grid cannot expand".format(rule))
+
+
+def engineOrigin(engine):
+    """
+    Position of the grid loaded in the grid of the engine, it moves only in the engines that expand
+    """
+    return engine.getOrigin() if hasattr(engine, "getOrigin") else (0, 0)
+
+
+def engineShape(engine):
+    """
+    Shape of the grid of the engine, without building the grid in the engines that know it
+    """
+    return engine.getShape() if hasattr(engine, "getShape") else engine.toGrid().shape
+
+
+def engineWindow(engine, top, left, bottom, right):
+    """
+    Age grid of the rows [top, bottom) and the columns [left, right) of the grid of the engine.
+    The engines with getWindow read only the cells of the window (in the coordinates of the grid loaded)
+    """
+    if not hasattr(engine, "getWindow"):
+        return engine.toGrid()[top:bottom, left:right]
+    row, col = engineOrigin(engine)
+    return engine.getWindow(top - row, left - col, bottom - row, right - col)
+
+
+def isUniverseWindow(engine):
+    """
+    True if the grid of the engine is only a window of an unbounded universe: the engine keeps
+    the live cells outside it, that are not in the grid read from the engine
+    """
+    return engine.boundary == EXPAND and hasattr(engine, "setCells")
+
+
+def gridCells(grid):
+    """
+    Rows, cols and ages of the live cells of an age grid
+    """
+    rows, cols = np.nonzero(grid)
+    return rows, cols, grid[rows, cols]
+
+
+def splitCells(cells, shape):
+    """
+    Age grid of the given shape with the live cells (rows, cols, ages) inside it, and the cells outside it
+    """
+    rows, cols, ages = cells
+    inside = (rows >= 0) & (rows < shape[0]) & (cols >= 0) & (cols < shape[1])
+    grid = np.zeros(shape, dtype=np.uint8)
+    grid[rows[inside], cols[inside]] = ages[inside]
+    return grid, (rows[~inside], cols[~inside], ages[~inside])
+
+
+def cellsOutside(engine):
+    """
+    Rows, cols and ages of the live cells of the engine outside its grid, None if the grid is the whole universe.
+    The engines that do not keep the ages give age 1
+    """
+    if not isUniverseWindow(engine):
+        return None
+    cells = engine.getCells()
+    rows, cols = np.asarray(cells[0], dtype=np.int64), np.asarray(cells[1], dtype=np.int64)
+    ages = np.asarray(cells[2], dtype=np.uint8) if len(cells) > 2 else np.ones(rows.size, dtype=np.uint8)
+    return splitCells((rows, cols, ages), engineShape(engine))[1]
+
+
+def loadEngineCells(engine, grid, outside=None):
+    """
+    Load the grid in the engine, with the live cells outside it (from cellsOutside) if its grid is a window of the universe
+    """
+    if outside is None or not isUniverseWindow(engine):
+        engine.load(grid)
+        return
+    rows, cols, ages = (np.concatenate(parts) for parts in zip(gridCells(np.asarray(grid)), outside))
+    engine.setCells(rows, cols, ages, shape=grid.shape)
+
+
+def countBirths(previous, grid, born=None):
+    """
+    Number of cells born from the previous grid to the grid, counted on the mask of the cells born
+    if given, otherwise on the cells in state 1 that were dead
+    """
+    if born is not None:
+        return int(np.count_nonzero(born))
+    return int(np.count_nonzero((grid == 1) & (previous == 0)))
+
+
+def dirtyRegions(previous, grid, block=DIRTY_BLOCK):
+    """
+    Regions (top, left, bottom, right) of the grid with cells that changed state or age.
+    The changed cells are grouped in blocks and the adjacent blocks of a block row are merged
+    """
+    changed = previous != grid
+    rows, cols = changed.shape
+    blockRows, blockCols = -(-rows // block), -(-cols // block)
+    padded = np.zeros((blockRows * block, blockCols * block), dtype=bool)
+    padded[:rows, :cols] = changed
+    blocks = padded.reshape(blockRows, block, blockCols, block).any(axis=(1, 3))
+
+    regions = []
+    for blockRow in np.flatnonzero(blocks.any(axis=1)):
+        # Start and end of the runs of changed blocks in the block row
+        edges = np.diff(np.concatenate(([0], blocks[blockRow].astype(np.int8), [0])))
+        for start, stop in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            regions.append((int(blockRow) * block, int(start) * block,
+                            min((int(blockRow) + 1) * block, rows), min(int(stop) * block, cols)))
+    return regions
+
+
+class DenseEngine:
+    """
+        Step engine over a dense uint8 age grid
+        Composed by:
+        - grid with the age of every cell
+        - rule of the evolution
+        - boundary mode of the grid
+        - position in the grid of the first cell of the grid loaded, it moves when the grid expands
+        - mask of the cells born in the last generation (the previous grid for Generations rules),
+          the births are counted on request
+    """
+
+    name = "dense"
+    boundaries = BOUNDARIES
+
+    def __init__(self, rule=CONWAY, boundary=DEAD):
+        self._grid = np.zeros((0, 0), dtype=np.uint8)
+        self._origin = (0, 0)
+        self._previous = None
+        self._born = None
+        self.rule = rule
+        self.setBoundary(boundary)
+
+    def setRule(self, rule):
+        checkBoundary(self, self.boundary, rule)
+        self.rule = rule
+
+    def setBoundary(self, boundary):
+        checkBoundary(self, boundary, self.rule)
+        self.boundary = boundary
+
+    def load(self, grid):
+        """
+        Load the state of the engine from an age grid
+        """
+        self._grid = np.array(grid, dtype=np.uint8)
+        self._origin = (0, 0)
+        self._previous = None
+        self._born = None
+
+    def step(self, generations=1):
+        """
+        Advance the given number of generations
+        """
+        wrap = self.boundary == TORUS
+        for _ in range(generations):
+            if self.boundary == EXPAND and self._grid.size:
+                self._expand()
+            previous = self._grid
+            self._grid, self._born = stepGeneration(previous, self.rule, wrap)
+            # The previous grid is kept only to count the births of the Generations rules
+            self._previous = previous if self._born is None else None
+
+    def _expand(self):
+        """
+        Grow the grid before a generation if alive cells are on the edges,
+        so that no cell is born outside the grid
+        """
+        sides = edgesReached(self._grid)
+        if any(sides):
+            self._grid, top, left = expandGrid(self._grid, sides)
+            self._origin = (self._origin[0] + top, self._origin[1] + left)
+
+    def getOrigin(self):
+        """
+        Row and column in the current grid of the first cell of the grid loaded
+        """
+        return self._origin
+
+    def toGrid(self):
+        """
+        Return the age grid of the current generation
+        """
+        return self._grid
+
+    def getPopulation(self):
+        return int(np.count_nonzero(self._grid))
+
+    def getBirths(self):
+        """
+        Number of cells born in the last generation, None before the first one
+        """
+        if self._born is None and self._previous is None:
+            return None
+        return countBirths(self._previous, self._grid, self._born)
+
+
+def mergeAges(previous, alive, generations):
+    """
+    Rebuild the age grid for engines that do not track the age of the cells.
+    The cells alive both in the previous grid and now are considered alive for all
+    the given generations, the other alive cells are newborn.
+    """
+    previous = np.asarray(previous, dtype=np.uint8)
+    if previous.shape != alive.shape:
+        return alive.astype(np.uint8)
+    aged = np.minimum(previous.astype(np.int64) + generations, MAX_AGE).astype(np.uint8)
+    return np.where(alive, np.where(previous > 0, aged, 1), 0).astype(np.uint8)
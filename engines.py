@@ -0,0 +1,25 @@
+from engine import DenseEngine
+from sparse import SparseEngine
+from hashlife import HashLifeEngine
+from bitpacked import BitPackedEngine
+from parallel import ParallelEngine
+from tiled import TiledEngine
+
+# Available step engines, selectable by name
+ENGINES = {
+    DenseEngine.name: DenseEngine,
+    SparseEngine.name: SparseEngine,
+    HashLifeEngine.name: HashLifeEngine,
+    BitPackedEngine.name: BitPackedEngine,
+    ParallelEngine.name: ParallelEngine,
+    TiledEngine.name: TiledEngine,
+}
+
+
+def createEngine(name, **options):
+    """
+    Create the step engine with the given name
+    """
+    if name not in ENGINES:
+        raise ValueError("Unknown engine '{}', available: {}".format(name, ", ".join(ENGINES)))
+    return ENGINES[name](**options)
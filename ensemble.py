@@ -0,0 +1,238 @@
+import json
+import multiprocessing
+import os
+import numpy as np
+
+from engine import DEAD, TORUS, checkBoundary, nextGeneration
+from rules import CONWAY, parseRule
+from cycle import CycleDetector, DEFAULT_HISTORY, stateHashes
+from patterns import readPattern, gridFromPattern
+
+# Default number of boards stepped together by a worker process
+DEFAULT_BATCH = 256
+
+# Queue of the summaries in a worker process, set by the initializer of the pool
+_summaries = None
+
+# Reasons of the end of a board
+EXTINCT = "extinct"
+CYCLE = "cycle"
+CAP = "cap"
+
+
+class BatchEngine:
+    """
+        Step engine over a stack of independent boards of the same size
+        Composed by:
+        - age grids of the boards, stacked in a single array (boards x rows x cols)
+        - rule of the evolution
+        - boundary mode of the boards, dead or torus
+
+        All the boards are stepped with a single vectorized call, the boards
+        finished are removed from the stack.
+    """
+
+    name = "batch"
+    boundaries = (DEAD, TORUS)
+
+    def __init__(self, rule=CONWAY, boundary=DEAD):
+        self._grids = np.zeros((0, 0, 0), dtype=np.uint8)
+        self.rule = rule
+        self.setBoundary(boundary)
+
+    def setRule(self, rule):
+        self.rule = rule
+
+    def setBoundary(self, boundary):
+        checkBoundary(self, boundary, self.rule)
+        self.boundary = boundary
+
+    def load(self, grids):
+        """
+        Load the boards from a sequence of age grids of the same size
+        """
+        self._grids = np.array(grids, dtype=np.uint8)
+
+    def step(self, generations=1):
+        """
+        Advance all the boards of the given number of generations
+        """
+        wrap = self.boundary == TORUS
+        for _ in range(generations):
+            self._grids = nextGeneration(self._grids, self.rule, wrap)
+
+    def select(self, keep):
+        """
+        Keep only the boards selected by the boolean mask
+        """
+        self._grids = self._grids[keep]
+
+    def toGrids(self):
+        return self._grids
+
+    def getBoards(self):
+        return self._grids.shape[0]
+
+    def getPopulations(self):
+        return np.count_nonzero(self._grids.reshape(self._grids.shape[0], -1), axis=1)
+
+
+def randomSoup(rng, gridSize, density=0.5, soupSize=None):
+    """
+    Grid with random alive cells in the central square of soupSize (the whole grid if None)
+    """
+    grid = np.zeros((gridSize[0], gridSize[1]), dtype=np.uint8)
+    height, width = soupSize if soupSize is not None else gridSize
+    top, left = (gridSize[0] - height) // 2, (gridSize[1] - width) // 2
+    grid[top:top + height, left:left + width] = rng.random((height, width)) < density
+    return grid
+
+
+def runBatch(names, grids, maxGenerations, history=DEFAULT_HISTORY, rule=CONWAY, boundary=DEAD):
+    """
+    Run a batch of boards until every board is extinct, in a cycle or at the generation cap.
+    Yield the summary of every board as soon as it finishes
+    """
+    engine = BatchEngine(rule, boundary)
+    engine.load(grids)
+    names = list(names)
+    detectors = [CycleDetector(history, rule.states) for _ in names]
+    initial = engine.getPopulations()
+    maximum = initial.copy()
+    generation = 0
+
+    while names:
+        populations = engine.getPopulations()
+        maximum = np.maximum(maximum, populations)
+        cycles = [detector.observeHash(generation, key) for detector, key in zip(detectors, stateHashes(engine.toGrids(), rule.states))]
+
+        # An extinct board is also a still life, extinction is checked first
+        extinct = populations == 0
+        inCycle = np.array([cycle is not None for cycle in cycles], dtype=bool)
+        finished = extinct | inCycle | (generation >= maxGenerations)
+
+        for index in np.flatnonzero(finished):
+            summary = {
+                "name": names[index],
+                "reason": EXTINCT if extinct[index] else CYCLE if inCycle[index] else CAP,
+                "generations": generation,
+                "initial_population": int(initial[index]),
+                "final_population": int(populations[index]),
+                "max_population": int(maximum[index]),
+            }
+            if inCycle[index] and not extinct[index]:
+                summary["period"] = cycles[index].period
+                summary["cycle_start"] = cycles[index].start
+            yield summary
+
+        if finished.any():
+            keep = ~finished
+            engine.select(keep)
+            names = [name for name, kept in zip(names, keep) if kept]
+            detectors = [detector for detector, kept in zip(detectors, keep) if kept]
+            initial, maximum = initial[keep], maximum[keep]
+            if not names:
+                break
+
+        engine.step()
+        generation += 1
+
+
+def _initWorker(summaries):
+    """
+    Initializer of a worker process: queue where the summaries are sent
+    """
+    global _summaries
+    _summaries = summaries
+
+
+def _runBatchTask(task):
+    """
+    Task of a worker process: build the boards of the batch and send the summary of every board
+    as soon as it finishes, then None when the batch is done
+    """
+    boards, maxGenerations, history, rulestring, boundary = task
+    try:
+        names = [name for name, _ in boards]
+        grids = [_buildBoard(source) for _, source in boards]
+        for summary in runBatch(names, grids, maxGenerations, history, parseRule(rulestring), boundary):
+            _summaries.put(summary)
+    finally:
+        _summaries.put(None)
+
+
+def _buildBoard(source):
+    """
+    Build a board from its source: a grid or the arguments of a random soup.
+    The soups are generated by the workers so that only their seeds are sent
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    seed, gridSize, density, soupSize = source
+    return randomSoup(np.random.default_rng(seed), gridSize, density, soupSize)
+
+
+def readPatterns(paths):
+    """
+    Patterns (path, pattern) of the files
+    """
+    return [(path, readPattern(path)) for path in paths]
+
+
+def patternBoards(patterns, gridSize):
+    """
+    Boards (name, grid) with every pattern (name, pattern) at the center
+    """
+    return [(name, gridFromPattern(pattern, gridSize)) for name, pattern in patterns]
+
+
+def soupBoards(count, gridSize, density=0.5, soupSize=None, seed=0):
+    """
+    Boards (name, soup arguments) of random soups, reproducible from the seed
+    """
+    seeds = np.random.SeedSequence(seed).spawn(count)
+    return [("soup-{}".format(index), (seeds[index], tuple(gridSize), density, soupSize)) for index in range(count)]
+
+
+def runEnsemble(boards, maxGenerations, workers=None, batchSize=DEFAULT_BATCH, history=DEFAULT_HISTORY, rule=CONWAY,
+                boundary=DEAD):
+    """
+    Run all the boards in batches stepped together, on a pool of worker processes if workers > 1.
+    Yield the summaries of the boards as they finish
+    """
+    batches = [(boards[start:start + batchSize], maxGenerations, history, rule.toString(), boundary)
+               for start in range(0, len(boards), batchSize)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(batches) == 1:
+        for batch, _, _, _, _ in batches:
+            names = [name for name, _ in batch]
+            yield from runBatch(names, [_buildBoard(source) for _, source in batch], maxGenerations, history, rule, boundary)
+        return
+
+    summaries = multiprocessing.Queue()
+    with multiprocessing.Pool(min(workers, len(batches)), _initWorker, (summaries,)) as pool:
+        result = pool.map_async(_runBatchTask, batches)
+        done = 0
+        while done < len(batches):
+            summary = summaries.get()
+            if summary is None:
+                done += 1
+            else:
+                yield summary
+        # Raise the error of a failed batch
+        result.get()
+
+
+def writeSummaries(path, summaries):
+    """
+    Stream the summaries on file as newline-delimited JSON, one board per line.
+    Return the number of boards written
+    """
+    written = 0
+    with open(path, 'w') as file:
+        for summary in summaries:
+            file.write(json.dumps(summary) + "\n")
+            file.flush()
+            written += 1
+    return written
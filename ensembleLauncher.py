@@ -0,0 +1,45 @@
+import argparse
+import sys
+import time
+
+from cycle import DEFAULT_HISTORY
+from ensemble import DEFAULT_BATCH, readPatterns, patternBoards, soupBoards, runEnsemble, writeSummaries
+from engine import DEAD, TORUS
+from patterns import fittingSize
+from rules import parseRule
+from simulation import DEFAULT_GRID_SIZE, parseSize
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Run many independent Game of Life boards and summarize every board")
+    parser.add_argument("patterns", nargs="*", help="configurations (.cells or .rle files), one board each")
+    parser.add_argument("--soups", type=int, default=0, help="number of random soups")
+    parser.add_argument("--density", type=float, default=0.5, help="density of the alive cells of the soups")
+    parser.add_argument("--soup-size", type=parseSize, help="size of the soups as ROWSxCOLS, the whole board if omitted")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random soups")
+    parser.add_argument("-n", "--generations", type=int, default=1000, help="maximum number of generations of every board")
+    parser.add_argument("-s", "--size", type=parseSize, default=DEFAULT_GRID_SIZE, help="board size as ROWSxCOLS")
+    parser.add_argument("-w", "--workers", type=int, help="number of worker processes")
+    parser.add_argument("-b", "--batch", type=int, default=DEFAULT_BATCH, help="number of boards stepped together")
+    parser.add_argument("-r", "--rule", type=parseRule, default="B3/S23", help="rule of the boards, B/S notation or preset name")
+    parser.add_argument("--boundary", choices=[DEAD, TORUS], default=DEAD, help="boundary of the boards: dead border or torus")
+    parser.add_argument("--cycle-history", type=int, default=DEFAULT_HISTORY, help="generations remembered for the cycle detection")
+    parser.add_argument("-o", "--output", required=True, help="file where stream the summaries of the boards (NDJSON)")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+
+    args = parseArguments(sys.argv[1:])
+
+    # All the boards have the same size, enlarged if a pattern does not fit
+    patterns = readPatterns(args.patterns)
+    size = fittingSize(args.size, [pattern for _, pattern in patterns])
+    boards = patternBoards(patterns, size)
+    boards += soupBoards(args.soups, size, args.density, args.soup_size, args.seed)
+
+    start = time.perf_counter()
+    summaries = runEnsemble(boards, args.generations, args.workers, args.batch, args.cycle_history, args.rule, args.boundary)
+    written = writeSummaries(args.output, summaries)
+    elapsed = time.perf_counter() - start
+    print("{} boards in {:.2f} s ({:.0f} boards/s)".format(written, elapsed, written / elapsed if elapsed > 0 else 0))
@@ -1,11 +1,39 @@
+import argparse
 import sys
 from PyQt5.QtWidgets import QApplication
+from checkpoint import Checkpointer, resume
 from controller import GolController
 from model import GolModel
 from view import GolView
+from profiler import PROFILER
+from rules import parseRule
+from engine import BOUNDARIES
+from engines import ENGINES, createEngine
+from tracing import configure, parseLevel, DEFAULT_LEVEL, DEFAULT_SAMPLING
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Game of Life")
+    parser.add_argument("-e", "--engine", choices=list(ENGINES), help="step engine, dense if omitted")
+    parser.add_argument("-r", "--rule", type=parseRule, help="rule in B/S notation (B36/S23, B2/S/C3) or preset name")
+    parser.add_argument("-b", "--boundary", choices=BOUNDARIES, help="boundary of the grid: dead border, torus or expanding grid")
+    parser.add_argument("--checkpoint-dir", help="directory of the periodic checkpoints")
+    parser.add_argument("--checkpoint-every", type=int, help="generations between two checkpoints")
+    parser.add_argument("--checkpoint-seconds", type=float, help="seconds between two checkpoints")
+    parser.add_argument("--keep", type=int, default=3, help="number of checkpoints kept")
+    parser.add_argument("--resume", action="store_true", help="resume from the latest checkpoint of --checkpoint-dir")
+    parser.add_argument("--trace", type=parseLevel, help="trace level: CELL, GENERATION, DEBUG, INFO, WARNING or ERROR")
+    parser.add_argument("--trace-sampling", type=int, default=DEFAULT_SAMPLING, help="write one generation event every N")
+    parser.add_argument("--trace-file", help="file where write the trace, standard error if omitted")
+    parser.add_argument("--profile", action="store_true", help="show the performance readout in the status bar")
+    parser.add_argument("--profile-output", help="file where write the timing statistics (JSON) at the exit")
+    return parser.parse_known_args(argv)[0]
+
 
 if __name__ == '__main__':
 
+    args = parseArguments(sys.argv[1:])
+    configure(args.trace or DEFAULT_LEVEL, args.trace_sampling, args.trace_file)
     app = QApplication(sys.argv)
 
     # Create the model view controller objects
@@ -13,6 +41,36 @@ if __name__ == '__main__':
     view = GolView(model)
     controller = GolController(app, model, view)
 
+    if args.engine:
+        model.setEngine(createEngine(args.engine))
+
+    # Periodic checkpoints and resume from the latest one
+    if args.checkpoint_dir:
+        if args.resume:
+            snapshot = resume(args.checkpoint_dir)
+            if snapshot is not None:
+                with model.batch():
+                    model.setRule(parseRule(snapshot.rule))
+                    model.setGrid(snapshot.grid)
+                    model.setStep(snapshot.step)
+        controller.setCheckpointer(Checkpointer(args.checkpoint_dir, args.checkpoint_every, args.checkpoint_seconds,
+                                                args.keep, startStep=model.getStep()))
+
+    # The rule requested replaces the rule of the checkpoint
+    if args.rule is not None:
+        model.setRule(args.rule)
+    if args.boundary:
+        model.setBoundary(args.boundary)
+
+    if args.profile:
+        view.showPerformance(True)
+    if args.trace:
+        view.setTraceLevel(args.trace)
+        view.action_Trace.setChecked(args.trace < DEFAULT_LEVEL)
+
     # Launch the application
     view.show()
-    sys.exit(app.exec())
+    status = app.exec()
+    if args.profile_output:
+        PROFILER.dump(args.profile_output)
+    sys.exit(status)
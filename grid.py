@@ -1,128 +1,331 @@
+import numpy as np
 from PyQt5 import QtWidgets
-from PyQt5.QtCore import pyqtSignal, Qt
-from PyQt5.QtWidgets import QFrame, QWidget
+from PyQt5.QtCore import pyqtSignal, QPoint, QRect, QRectF
+from PyQt5.QtGui import QImage, QPainter, QColor, QPen
+from PyQt5.QtWidgets import QWidget, QApplication
 from model import GolModel
-from functools import partial
+from profiler import PROFILER
+from tracing import getTracer
+
+_trace = getTracer("grid")
+
+# Minimum size in pixel of a cell for drawing the lines between the cells
+GRID_LINES_MIN_CELL = 6
+
+# Zoom factor of a step of the mouse wheel
+ZOOM_STEP = 1.25
+
+
+def _colorTable():
+    """
+    Color of the cells for every age (0xAARRGGBB): white for dead cells,
+    from light blue (newborn) to bright red (ancient) for the alive cells
+    """
+    age = np.arange(256, dtype=np.uint32)
+    red = np.where(age > 150, age, 0)
+    blue = np.where((age > 0) & (age <= 150), 255 - age, 0)
+    table = 0xFF000000 | (red << 16) | blue
+    table[0] = 0xFFFFFFFF
+    return table.astype(np.uint32)
+
+
+def _generationsColorTable(states):
+    """
+    Color of the cells for every state of a Generations rule: white for dead cells,
+    black for the alive cells, from red to light yellow for the dying cells
+    """
+    table = np.full(256, 0xFFFFFFFF, dtype=np.uint32)
+    table[1] = 0xFF000000
+    fade = np.linspace(0, 200, max(states - 2, 1)).astype(np.uint32)[:states - 2]
+    table[2:states] = 0xFFFF0000 | (fade << 8) | (fade // 2)
+    return table
+
+
+def _densityColorTable():
+    """
+    Color of the density of the alive cells (0..255): from white (empty) to black (full)
+    """
+    level = 255 - np.arange(256, dtype=np.uint32)
+    return (0xFF000000 | (level << 16) | (level << 8) | level).astype(np.uint32)
+
+
+# Precomputed age to color lookup table
+COLOR_TABLE = _colorTable()
+
+# Precomputed density to color lookup table
+DENSITY_COLOR_TABLE = _densityColorTable()
+
+
+def colorTable(rule):
+    """
+    Cell value to color lookup table of the rule
+    """
+    return COLOR_TABLE if rule.isLifeLike() else _generationsColorTable(rule.states)
+
+
+def blockFactors(cells, pixels):
+    """
+    Cells (rows, cols) reduced in a pixel of the image, so that the image is not bigger than the widget
+    """
+    return max(-(-cells[0] // max(pixels[0], 1)), 1), max(-(-cells[1] // max(pixels[1], 1)), 1)
+
+
+def reduceBlocks(cells, factors, rule, density=False):
+    """
+    Value of every block of the given factors of cells: the oldest cell (for Generations rules the alive
+    state before the dying ones) or, with density, the fraction of the alive cells from 0 to 255.
+    The blocks at the bottom and at the right are filled with dead cells
+    """
+    rowsFactor, colsFactor = factors
+    if factors == (1, 1) and not density:
+        return cells
+    rows, cols = -(-cells.shape[0] // rowsFactor), -(-cells.shape[1] // colsFactor)
+    if cells.shape != (rows * rowsFactor, cols * colsFactor):
+        padded = np.zeros((rows * rowsFactor, cols * colsFactor), dtype=np.uint8)
+        padded[:cells.shape[0], :cells.shape[1]] = cells
+        cells = padded
+    blocks = cells.reshape(rows, rowsFactor, cols, colsFactor)
+    if density:
+        alive = blocks > 0 if rule.isLifeLike() else blocks == 1
+        counts = _blockReduce(alive, np.add, np.int32)
+        return (counts * 255 // (rowsFactor * colsFactor)).astype(np.uint8)
+    oldest = _blockReduce(blocks, np.maximum)
+    if rule.isLifeLike():
+        return oldest
+    return np.where(_blockReduce(blocks == 1, np.maximum), 1, oldest).astype(np.uint8)
+
+
+def _blockReduce(blocks, ufunc, dtype=None):
+    """
+    Reduce the blocks (rows x rowsFactor x cols x colsFactor) with the ufunc: the rows of a block first,
+    along the contiguous memory, then the few columns one at a time (a reduction of a short axis is slow)
+    """
+    values = ufunc.reduce(blocks, axis=1, dtype=dtype)
+    if values.shape[2] > 16:
+        return ufunc.reduce(values, axis=2)
+    reduced = values[:, :, 0].copy()
+    for col in range(1, values.shape[2]):
+        ufunc(reduced, values[:, :, col], out=reduced)
+    return reduced
+
 
 class GolGrid(QWidget):
     """
         Grid class for Game of life
         Composed by:
-        - cells for evolution of the game
+        - image with a pixel for every block of cells of the viewport, painted scaled on the widget
+        - size of the blocks: a cell when the cells are bigger than a pixel of the widget
+        - color lookup table of the cells, for the ages or for the states of the rule, or of the density
+        - position of the mouse pressed, to tell a click on a cell from a drag that pans the viewport
         - layout for the part where costruct the grid
+
+        Only the cells of the viewport are read, and when zoomed out they are reduced to a pixel
+        of the widget per block, so the cost of a frame depends on the size of the widget.
     """
 
     # Signal definition
     changeStateSignal = pyqtSignal(object)
+    zoomSignal = pyqtSignal(object)
+    panSignal = pyqtSignal(object)
 
     def __init__(self, parent: QtWidgets, model: GolModel, layout):
-        QtWidgets.QGraphicsScene.__init__(self)
+        super().__init__(parent)
 
         # Connect to the model and show the initial grid
         self._model = model
-        self._model.register(self._updateGrid)
+        self._model.register(self._updateGrid, "grid_changed")
+        self._model.register(self._updateRule, "rule_changed")
+        self._model.register(self._updateViewport, "viewport_changed")
+        self._colors = colorTable(self._model.getRule())
+        self._density = False
 
         # Connect to the part of view where costruct the grid
         self._layout = layout
 
-        # Create the grid with QFrame cells
-        self._cells = []
+        # Image of the cells, the buffer must live as long as the image
+        self._pixels = np.zeros((0, 0), dtype=np.uint32)
+        self._image = QImage()
+        # Viewport of the model grid shown by the image and cells of a pixel of the image
+        self._viewport = None
+        self._factors = (1, 1)
+        # Position of the mouse pressed and of the last pan, None when the mouse is released
+        self._pressPosition = None
+        self._panPosition = None
+        self._dragging = False
         self._setupUi()
         self._updateGrid()
 
-
-
     def _setupUi(self):
         """
         Initializes ui that contains the cells
         """
         self.setMinimumSize(400, 200)
-        self.setAttribute(Qt.WA_StyledBackground, True)
-        self.setStyleSheet("background-color: rgb(255, 255, 255);")
+        self.setSizePolicy(QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding))
         self._layout.setContentsMargins(0, 0, 0, 0)
         self._layout.setSpacing(0)
-        self._initGrid(int(self._model.getGridSizeSelected()[0]),self._model.getGridSizeSelected()[1])
+        self._layout.addWidget(self, 0, 0)
+
+    def _getRows(self):
+        return self._pixels.shape[0]
 
-    def _initGrid(self, rows, cols):
+    def _getCols(self):
+        return self._pixels.shape[1]
+
+    def _pixelSize(self):
         """
-        Initializes grid with given rows and cols
+        Width and height in pixel of the widget of a pixel of the image
         """
-        print("Init grid")
-        for i in range(rows):
-            self._cells.append([])
-            for j in range(cols):
-                cell = QFrame(self)
-                self._setupFrame(cell)
-                #cell.setSizePolicy(QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding))
-                cell.mousePressEvent = partial(self._cellClick, (i, j))
-                self._cells[-1].append(cell)
-                self._layout.addWidget(cell, i, j)
+        return self.width() / max(self._getCols(), 1), self.height() / max(self._getRows(), 1)
 
+    def _cellsShown(self):
+        top, left, bottom, right = self._viewport
+        return bottom - top, right - left
 
-    def _setupFrame(self, frame):
+    def cellAt(self, x, y):
         """
-        Initialize cell frame
+        Row and column in the viewport of the cell at the given position of the widget, None outside the grid
         """
-        frame.setContentsMargins(0, 0, 0, 0)
-        frame.setFrameShape(QFrame.StyledPanel)
-        frame.setLineWidth(0.9)
-        frame.setSizePolicy(QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding))
-        frame.setAttribute(Qt.WA_StyledBackground, True)
+        rows, cols = self._cellsShown()
+        row, col = int(y * rows / max(self.height(), 1)), int(x * cols / max(self.width(), 1))
+        if 0 <= row < rows and 0 <= col < cols:
+            return row, col
+        return None
 
+    def mousePressEvent(self, event):
+        self._pressPosition = self._panPosition = event.pos()
+        self._dragging = False
 
-    def _cellClick(self, _coords, _event):
+    def mouseMoveEvent(self, event):
         """
-        Slot connected to QFrame cell clicked with given coordinates.
+        Emit the cells (rows, cols) the viewport is panned by a drag
         """
-        self.changeStateSignal.emit([_coords[0], _coords[1]])
+        if self._pressPosition is None:
+            return
+        if not self._dragging:
+            if (event.pos() - self._pressPosition).manhattanLength() < QApplication.startDragDistance():
+                return
+            # Past the drag distance the release is not a click
+            self._dragging = True
+        rows, cols = self._cellsShown()
+        delta = self._panPosition - event.pos()
+        pan = [int(delta.y() * rows / max(self.height(), 1)), int(delta.x() * cols / max(self.width(), 1))]
+        if pan[0] or pan[1]:
+            # The rest of a cell is panned with the next moves
+            self._panPosition -= QPoint(round(pan[1] * self.width() / cols), round(pan[0] * self.height() / rows))
+            self.panSignal.emit(pan)
 
-    def _clearLayout(self):
+    def mouseReleaseEvent(self, event):
         """
-        Clear all cells
+        Emit the coordinates of the cell clicked, unless the mouse was dragged
         """
-        self._cells.clear()
-        self._cells = []
-        for i in reversed(range(self._layout.count())):
-            self._layout.itemAt(i).widget().setParent(None)
+        clicked = self._pressPosition is not None and not self._dragging
+        self._pressPosition = self._panPosition = None
+        cell = self.cellAt(event.x(), event.y()) if clicked else None
+        if cell is not None:
+            self.changeStateSignal.emit([cell[0], cell[1]])
 
-    def _updateGrid(self):
+    def wheelEvent(self, event):
         """
-        Update the grid when the size of grid changes or update the color of cells during simulation
+        Emit the zoom factor of the wheel steps and the position of the mouse (fraction of the height and width)
         """
-        print("Update Grid")
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.zoomSignal.emit([ZOOM_STEP ** steps, (event.y() / max(self.height(), 1), event.x() / max(self.width(), 1))])
 
-        grid = self._model.getGrid()
+    def resizeEvent(self, event):
+        # The image is computed again if the blocks of cells of a pixel change
+        self._updateGrid([])
 
-        # A different grid dimension has been selected with the combo box
-        if self._model.getGridSizeSelected()[0] != self._getRows() and self._model.getGridSizeSelected()[1] != self._getCols():
-            print("Size griglia cambiata: ",self._model.getGridSizeSelected()[0] , " - ", self._model.getGridSizeSelected()[1])
-            self._clearLayout()
-            self._initGrid(self._model.getGridSizeSelected()[0],self._model.getGridSizeSelected()[1])
+    @PROFILER.timed("update_grid")
+    def _updateGrid(self, regions=None):
+        """
+        Update the image of the grid when the size of grid changes or the cells change during simulation.
+        Only the pixels of the given regions are computed again, the whole image if None
+        """
+        _trace.generation("update grid regions=%s", "all" if regions is None else len(regions))
 
-        # Change cells color
-        right_click = (grid.shape[0] - self._model.getGridSizeSelected()[0]) // 2
-        for row in range(self._model.getGridSizeSelected()[0]):
-            for col in range(self._model.getGridSizeSelected()[1]):
+        viewport = self._model.getViewport()
+        factors = blockFactors((viewport[2] - viewport[0], viewport[3] - viewport[1]), (self.height(), self.width()))
 
-                if grid[right_click + row][right_click + col] == 0:
-                    self._cells[row][col].setStyleSheet("background-color: rgb(255, 255, 255);" )
-                else:
-                    blue = 0
-                    if grid[right_click + row][right_click + col] > 0 and grid[right_click + row][right_click + col] <= 150 :
-                        blue = 255 - grid[right_click + row][right_click + col]
-                        red = 0
-                    elif grid[right_click + row][right_click + col] > 150 and grid[right_click + row][right_click + col] <= 255:
-                        red = grid[right_click + row][right_click + col]
-                    else:
-                        red = 255
-                    self._cells[row][col].setStyleSheet("background-color: rgb(" + str(red) + ",0," + str(blue) + ");")
+        if regions is None or viewport != self._viewport or factors != self._factors:
+            self._viewport, self._factors = viewport, factors
+            # Colors of the visible cells, or of their blocks, through the lookup table
+            self._pixels = np.ascontiguousarray(self._blockColors(viewport))
+            self._image = QImage(self._pixels.data, self._pixels.shape[1], self._pixels.shape[0],
+                                 self._pixels.strides[0], QImage.Format_RGB32)
+            self.update()
+            return
 
-    def _getRows(self):
-        return self._cells.__len__()
+        rowsFactor, colsFactor = factors
+        for top, left, bottom, right in regions:
+            # Intersection of the changed region with the viewport
+            top, left = max(top, viewport[0]), max(left, viewport[1])
+            bottom, right = min(bottom, viewport[2]), min(right, viewport[3])
+            if top >= bottom or left >= right:
+                continue
+            # Pixels of the blocks that contain the region
+            rowStart, colStart = (top - viewport[0]) // rowsFactor, (left - viewport[1]) // colsFactor
+            rowStop, colStop = -(-(bottom - viewport[0]) // rowsFactor), -(-(right - viewport[1]) // colsFactor)
+            cells = (viewport[0] + rowStart * rowsFactor, viewport[1] + colStart * colsFactor,
+                     min(viewport[0] + rowStop * rowsFactor, viewport[2]), min(viewport[1] + colStop * colsFactor, viewport[3]))
+            self._pixels[rowStart:rowStop, colStart:colStop] = self._blockColors(cells)
+            self.update(self._pixelsRect(rowStart, colStart, rowStop, colStop))
 
-    def _getCols(self):
-        row = self._cells[0]
-        return row[1]
+    def _blockColors(self, cells):
+        """
+        Colors of the pixels of the cells (top, left, bottom, right), aligned to the blocks of the image
+        """
+        values = reduceBlocks(self._model.getCells(*cells), self._factors, self._model.getRule(), self._density)
+        return (DENSITY_COLOR_TABLE if self._density else self._colors)[values]
 
+    def _updateRule(self, rule):
+        """
+        Recolor the whole grid with the colors of the rule
+        """
+        self._colors = colorTable(rule)
+        self._updateGrid()
+
+    def _updateViewport(self, viewport):
+        self._updateGrid()
+
+    def setDensity(self, density):
+        """
+        Show the blocks of cells reduced in a pixel with the density of the alive cells,
+        otherwise with the color of the oldest cell
+        """
+        self._density = density
+        self._updateGrid()
+
+    def _pixelsRect(self, top, left, bottom, right):
+        """
+        Rectangle of the widget that contains the given pixels of the image
+        """
+        pixelWidth, pixelHeight = self._pixelSize()
+        x, y = int(left * pixelWidth), int(top * pixelHeight)
+        return QRect(x, y, int(right * pixelWidth + 1) - x + 1, int(bottom * pixelHeight + 1) - y + 1)
+
+    @PROFILER.timed("paint")
+    def paintEvent(self, event):
+        """
+        Paint the image of the cells scaled on the whole widget
+        """
+        painter = QPainter(self)
 
+        # Only the pixels in the area to repaint are drawn
+        cellWidth, cellHeight = self._pixelSize()
+        area = event.rect()
+        top, left = int(area.top() // cellHeight), int(area.left() // cellWidth)
+        bottom = min(int(area.bottom() // cellHeight) + 1, self._getRows())
+        right = min(int(area.right() // cellWidth) + 1, self._getCols())
+        if bottom > top and right > left:
+            painter.drawImage(QRectF(left * cellWidth, top * cellHeight, (right - left) * cellWidth, (bottom - top) * cellHeight),
+                              self._image, QRectF(left, top, right - left, bottom - top))
 
+        # Lines between the cells when they are big enough
+        if self._factors == (1, 1) and min(cellWidth, cellHeight) >= GRID_LINES_MIN_CELL:
+            painter.setPen(QPen(QColor(200, 200, 200), 0))
+            for row in range(self._getRows() + 1):
+                painter.drawLine(0, round(row * cellHeight), self.width(), round(row * cellHeight))
+            for col in range(self._getCols() + 1):
+                painter.drawLine(round(col * cellWidth), 0, round(col * cellWidth), self.height())
+        painter.end()
@@ -0,0 +1,465 @@
+from collections import OrderedDict
+import numpy as np
+
+from engine import EXPAND, checkBoundary, mergeAges, neighborCount
+from rules import CONWAY, COUNTS
+
+# Prime modulus and bases (of the rows and of the columns) of the hash of the cells, two pairs for fewer collisions
+_HASH_PRIME = (1 << 61) - 1
+_HASH_BASES = ((0x1B873593A5F1C3D, 0x0CC9E2D51B5C2A7), (0x1E3779B97F4A7C1, 0x085EBCA6B3C5F17))
+
+
+class Node:
+    """
+        Canonical node of the quadtree, a square of 2^level x 2^level cells
+        Composed by:
+        - the four quadrants nw, ne, sw, se (None for the leaves)
+        - level of the node
+        - number of alive cells
+    """
+
+    __slots__ = ("nw", "ne", "sw", "se", "level", "population")
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+
+
+def _life4x4Table(rule=CONWAY):
+    """
+    Result of one generation of every 4x4 square (16 bits, row major)
+    encoded as the 4 bits of its central 2x2 square
+    """
+    squares = np.arange(1 << 16, dtype=np.uint32)
+    bits = ((squares[:, None] >> np.arange(16, dtype=np.uint32)) & 1).astype(np.uint8).reshape(-1, 4, 4)
+    count = neighborCount(bits)[:, 1:3, 1:3]
+    alive = bits[:, 1:3, 1:3]
+    center = rule.table.take(alive * COUNTS + count) > 0
+    return (center.reshape(-1, 4) * np.array([1, 2, 4, 8])).sum(axis=1).tolist()
+
+
+class HashLifeEngine:
+    """
+        HashLife step engine with a hash-consed quadtree
+        Composed by:
+        - table of the canonical nodes
+        - bounded cache of the results of the nodes
+        - root of the universe and coordinates of its top left corner
+        - hash and bounding box of the cells of every node visited, for the state hash and the census of the whole universe
+        - window (rows, cols) returned by toGrid
+        - rule of the evolution, Life-like without B0 (the universe is empty around the cells)
+
+        The universe is unbounded (expand boundary). The engine does not track the age of the cells,
+        the ages returned by toGrid are rebuilt with mergeAges.
+    """
+
+    name = "hashlife"
+    boundaries = (EXPAND,)
+    boundary = EXPAND
+
+    def __init__(self, maxCache=1000000, maxNodes=4000000, rule=CONWAY):
+        self._maxCache = maxCache
+        self._maxNodes = maxNodes
+        self._nodes = {}
+        self._cache = OrderedDict()
+        self._hashes = {}
+        self._boxes = {}
+        self._hits = 0
+        self._misses = 0
+        self._collections = 0
+
+        self._off = Node(None, None, None, None, 0, 0)
+        self._on = Node(None, None, None, None, 0, 1)
+        self._empty = [self._off]
+        self._table = None
+
+        self._generation = 0
+        self._shape = (0, 0)
+        self._ages = np.zeros(self._shape, dtype=np.uint8)
+        self._agesGeneration = 0
+        # Last window read, with its ages and generation
+        self._window = (None, None, 0)
+        self._root = self._emptyNode(2)
+        self._origin = (0, 0)
+        self.setRule(rule)
+
+    def setRule(self, rule):
+        """
+        Set the rule, the results memoized for the previous rule are dropped
+        """
+        if not rule.isLifeLike() or rule.hasBirthWithoutNeighbors():
+            raise ValueError("The {} engine supports only Life-like rules without B0, not {}".format(self.name, rule))
+        self.rule = rule
+        self._table = None
+        self._cache.clear()
+
+    def setBoundary(self, boundary):
+        checkBoundary(self, boundary, self.rule)
+
+    # Quadtree construction
+
+    def _join(self, nw, ne, sw, se):
+        """
+        Return the canonical node with the given quadrants
+        """
+        key = (nw, ne, sw, se)
+        node = self._nodes.get(key)
+        if node is None:
+            node = Node(nw, ne, sw, se, nw.level + 1, nw.population + ne.population + sw.population + se.population)
+            self._nodes[key] = node
+        return node
+
+    def _emptyNode(self, level):
+        while len(self._empty) <= level:
+            empty = self._empty[-1]
+            self._empty.append(self._join(empty, empty, empty, empty))
+        return self._empty[level]
+
+    def _build(self, level, rows, cols):
+        """
+        Build the node of the given level with the live cells at rows, cols (relative to the node)
+        """
+        if rows.size == 0:
+            return self._emptyNode(level)
+        if level == 0:
+            return self._on
+        half = 1 << (level - 1)
+        top, left = rows < half, cols < half
+        quadrants = []
+        for rowMask, colMask, dr, dc in ((top, left, 0, 0), (top, ~left, 0, half), (~top, left, half, 0), (~top, ~left, half, half)):
+            mask = rowMask & colMask
+            quadrants.append(self._build(level - 1, rows[mask] - dr, cols[mask] - dc))
+        return self._join(*quadrants)
+
+    def _pad(self, node):
+        """
+        Return the node of the next level with the given node at the center
+        """
+        empty = self._emptyNode(node.level - 1)
+        return self._join(self._join(empty, empty, empty, node.nw), self._join(empty, empty, node.ne, empty),
+                          self._join(empty, node.sw, empty, empty), self._join(node.se, empty, empty, empty))
+
+    def _isCentered(self, node):
+        """
+        True if all the alive cells of the node are in its central half
+        """
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        border = (nw.nw.population + nw.ne.population + nw.sw.population + ne.nw.population + ne.ne.population
+                  + ne.se.population + sw.nw.population + sw.sw.population + sw.se.population
+                  + se.ne.population + se.sw.population + se.se.population)
+        return border == 0
+
+    # Evolution
+
+    def _life4x4(self, node):
+        """
+        Center 2x2 square of a level 2 node after one generation
+        """
+        if self._table is None:
+            self._table = _life4x4Table(self.rule)
+        bits = 0
+        for index, leaf in enumerate((node.nw.nw, node.nw.ne, node.ne.nw, node.ne.ne,
+                                      node.nw.sw, node.nw.se, node.ne.sw, node.ne.se,
+                                      node.sw.nw, node.sw.ne, node.se.nw, node.se.ne,
+                                      node.sw.sw, node.sw.se, node.se.sw, node.se.se)):
+            bits |= leaf.population << index
+        result = self._table[bits]
+        on, off = self._on, self._off
+        return self._join(on if result & 1 else off, on if result & 2 else off,
+                          on if result & 4 else off, on if result & 8 else off)
+
+    def _successor(self, node, j):
+        """
+        Center node (one level down) of the given node advanced of 2^j generations, j <= level - 2
+        """
+        if node.population == 0:
+            return self._emptyNode(node.level - 1)
+
+        key = (node, j)
+        result = self._cache.get(key)
+        if result is not None:
+            self._hits += 1
+            self._cache.move_to_end(key)
+            return result
+        self._misses += 1
+
+        if node.level == 2:
+            result = self._life4x4(node)
+        else:
+            join = self._join
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            half = min(j, node.level - 3)
+            c1 = self._successor(nw, half)
+            c2 = self._successor(join(nw.ne, ne.nw, nw.se, ne.sw), half)
+            c3 = self._successor(ne, half)
+            c4 = self._successor(join(nw.sw, nw.se, sw.nw, sw.ne), half)
+            c5 = self._successor(join(nw.se, ne.sw, sw.ne, se.nw), half)
+            c6 = self._successor(join(ne.sw, ne.se, se.nw, se.ne), half)
+            c7 = self._successor(sw, half)
+            c8 = self._successor(join(sw.ne, se.nw, sw.se, se.sw), half)
+            c9 = self._successor(se, half)
+            if j < node.level - 2:
+                # The sub-squares are already advanced of 2^j generations, take their centers
+                result = join(join(c1.se, c2.sw, c4.ne, c5.nw), join(c2.se, c3.sw, c5.ne, c6.nw),
+                              join(c4.se, c5.sw, c7.ne, c8.nw), join(c5.se, c6.sw, c8.ne, c9.nw))
+            else:
+                result = join(self._successor(join(c1, c2, c4, c5), half), self._successor(join(c2, c3, c5, c6), half),
+                              self._successor(join(c4, c5, c7, c8), half), self._successor(join(c5, c6, c8, c9), half))
+
+        self._cache[key] = result
+        if len(self._cache) > self._maxCache:
+            self._cache.popitem(last=False)
+        return result
+
+    def advancePow2(self, k):
+        """
+        Advance the universe of 2^k generations
+        """
+        root = self._root
+        row, col = self._origin
+        # Pad until the root is big enough and the pattern cannot escape during the jump
+        while root.level < k + 2 or not self._isCentered(root):
+            row, col = row - (1 << (root.level - 1)), col - (1 << (root.level - 1))
+            root = self._pad(root)
+        row, col = row - (1 << (root.level - 1)), col - (1 << (root.level - 1))
+        root = self._pad(root)
+
+        self._root = self._successor(root, k)
+        self._origin = (row + (1 << (root.level - 2)), col + (1 << (root.level - 2)))
+        self._generation += 1 << k
+
+        if len(self._nodes) > self._maxNodes:
+            self._collect()
+
+    def jumpTo(self, generation):
+        """
+        Advance the universe until the given generation
+        """
+        if generation < self._generation:
+            raise ValueError("Cannot jump back to generation {} from {}".format(generation, self._generation))
+        self.step(generation - self._generation)
+
+    def step(self, generations=1):
+        """
+        Advance the given number of generations, decomposed in powers of two
+        """
+        k = 0
+        while generations:
+            if generations & 1:
+                self.advancePow2(k)
+            generations >>= 1
+            k += 1
+
+    def _collect(self):
+        """
+        Drop the nodes not reachable from the root and the cached results
+        """
+        self._collections += 1
+        self._cache.clear()
+        self._hashes.clear()
+        self._boxes.clear()
+        self._nodes = {}
+        self._empty = [self._off]
+        self._root = self._intern(self._root, {})
+
+    def _intern(self, node, seen):
+        if node.level == 0:
+            return node
+        interned = seen.get(id(node))
+        if interned is None:
+            interned = self._join(self._intern(node.nw, seen), self._intern(node.ne, seen),
+                                  self._intern(node.sw, seen), self._intern(node.se, seen))
+            seen[id(node)] = interned
+        return interned
+
+    # Engine interface
+
+    def load(self, grid):
+        """
+        Load the live cells from an age grid, the grid shape becomes the window
+        """
+        grid = np.asarray(grid)
+        rows, cols = np.nonzero(grid)
+        self.setCells(rows, cols, grid[rows, cols], shape=grid.shape)
+
+    def setCells(self, rows, cols, ages=None, shape=None):
+        """
+        Load the live cells from their coordinates, the ages are kept only inside the window
+        """
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        if shape is not None:
+            self._shape = tuple(shape)
+        top = int(rows.min()) if rows.size else 0
+        left = int(cols.min()) if cols.size else 0
+        size = max(int(rows.max()) - top + 1 if rows.size else 1, int(cols.max()) - left + 1 if cols.size else 1)
+        level = max(2, (size - 1).bit_length())
+
+        self._cache.clear()
+        self._hashes.clear()
+        self._boxes.clear()
+        self._nodes = {}
+        self._empty = [self._off]
+        self._generation = 0
+        self._agesGeneration = 0
+        self._ages = np.zeros(self._shape, dtype=np.uint8)
+        if ages is not None:
+            ages = np.asarray(ages, dtype=np.uint8)
+            inside = (rows >= 0) & (rows < self._shape[0]) & (cols >= 0) & (cols < self._shape[1])
+            self._ages[rows[inside], cols[inside]] = ages[inside]
+        self._window = (None, None, 0)
+        self._root = self._build(level, rows - top, cols - left)
+        self._origin = (top, left)
+
+    def getCells(self, window=None):
+        """
+        Return rows and cols of the live cells, only inside window (top, left, bottom, right) if given
+        """
+        rows, cols = [], []
+        self._collectCells(self._root, self._origin[0], self._origin[1], window, rows, cols)
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+    def _collectCells(self, node, row, col, window, rows, cols):
+        if node.population == 0:
+            return
+        size = 1 << node.level
+        if window is not None and (row >= window[2] or col >= window[3] or row + size <= window[0] or col + size <= window[1]):
+            return
+        if node.level == 0:
+            rows.append(row)
+            cols.append(col)
+            return
+        half = size >> 1
+        self._collectCells(node.nw, row, col, window, rows, cols)
+        self._collectCells(node.ne, row, col + half, window, rows, cols)
+        self._collectCells(node.sw, row + half, col, window, rows, cols)
+        self._collectCells(node.se, row + half, col + half, window, rows, cols)
+
+    def toGrid(self):
+        """
+        Return the age grid of the window
+        """
+        alive = np.zeros(self._shape, dtype=bool)
+        rows, cols = self.getCells((0, 0, self._shape[0], self._shape[1]))
+        alive[rows, cols] = True
+        self._ages = mergeAges(self._ages, alive, self._generation - self._agesGeneration)
+        self._agesGeneration = self._generation
+        return self._ages
+
+    def getWindow(self, top, left, bottom, right):
+        """
+        Return the age grid of the cells in the rows [top, bottom) and the columns [left, right),
+        only the nodes inside the window are visited. The ages follow the previous read of the same window
+        """
+        alive = np.zeros((bottom - top, right - left), dtype=bool)
+        rows, cols = self.getCells((top, left, bottom, right))
+        alive[rows - top, cols - left] = True
+        window, ages, generation = self._window
+        if window != (top, left, bottom, right):
+            # Another window starts from the ages of the last grid
+            ages = self._ages[top:bottom, left:right] if top >= 0 and left >= 0 else self._ages[:0, :0]
+            generation = self._agesGeneration
+        ages = mergeAges(ages, alive, self._generation - generation)
+        self._window = ((top, left, bottom, right), ages, self._generation)
+        return ages
+
+    def getShape(self):
+        return self._shape
+
+    def getPopulation(self):
+        return self._root.population
+
+    def getBirths(self):
+        """
+        The births are not tracked in the quadtree: None rather than the births of the window only
+        """
+        return None
+
+    def getBoundingBox(self):
+        """
+        Box (top, left, bottom, right) of the live cells of the whole universe, None if empty.
+        The boxes of the canonical nodes are memoized
+        """
+        box = self._nodeBox(self._root)
+        if box is None:
+            return None
+        row, col = self._origin
+        return box[0] + row, box[1] + col, box[2] + row, box[3] + col
+
+    def _nodeBox(self, node):
+        """
+        Box of the live cells of the node relative to its top left corner, None if empty
+        """
+        if node.population == 0:
+            return None
+        if node.level == 0:
+            return (0, 0, 1, 1)
+        box = self._boxes.get(node)
+        if box is None:
+            half = 1 << (node.level - 1)
+            boxes = []
+            for quadrant, row, col in ((node.nw, 0, 0), (node.ne, 0, half), (node.sw, half, 0), (node.se, half, half)):
+                quadrantBox = self._nodeBox(quadrant)
+                if quadrantBox is not None:
+                    boxes.append((quadrantBox[0] + row, quadrantBox[1] + col, quadrantBox[2] + row, quadrantBox[3] + col))
+            tops, lefts, bottoms, rights = zip(*boxes)
+            box = (min(tops), min(lefts), max(bottoms), max(rights))
+            self._boxes[node] = box
+        return box
+
+    def getAgeHistogram(self):
+        """
+        The ages are kept only in the window: None rather than the histogram of the window only
+        """
+        return None
+
+    def getStateHash(self):
+        """
+        Hash of the live cells of the whole universe, the same for the same cells at any level and origin of the root:
+        the sums of rowBase^row * colBase^col over the cells, memoized in the canonical nodes
+        """
+        row, col = self._origin
+        values = [value * pow(rowBase, row, _HASH_PRIME) * pow(colBase, col, _HASH_PRIME) % _HASH_PRIME
+                  for (rowBase, colBase), value in zip(_HASH_BASES, self._nodeHash(self._root))]
+        return np.array(values, dtype=np.uint64).tobytes()
+
+    def _nodeHash(self, node):
+        """
+        Sums of the hash of the cells of the node, relative to its top left corner
+        """
+        if node.population == 0:
+            return (0, 0)
+        if node.level == 0:
+            return (1, 1)
+        value = self._hashes.get(node)
+        if value is None:
+            # The quadrants on the right and at the bottom are shifted of half the side
+            half = 1 << (node.level - 1)
+            nw, ne, sw, se = (self._nodeHash(quadrant) for quadrant in (node.nw, node.ne, node.sw, node.se))
+            value = []
+            for index, (rowBase, colBase) in enumerate(_HASH_BASES):
+                rowShift, colShift = pow(rowBase, half, _HASH_PRIME), pow(colBase, half, _HASH_PRIME)
+                value.append((nw[index] + colShift * ne[index] + rowShift * (sw[index] + colShift * se[index])) % _HASH_PRIME)
+            value = tuple(value)
+            self._hashes[node] = value
+        return value
+
+    def getGeneration(self):
+        return self._generation
+
+    def getStatistics(self):
+        """
+        Statistics of the memoization, to size the cache
+        """
+        lookups = self._hits + self._misses
+        return {
+            "nodes": len(self._nodes),
+            "cache_entries": len(self._cache),
+            "cache_hits": self._hits,
+            "cache_misses": self._misses,
+            "cache_hit_rate": self._hits / lookups if lookups else 0.0,
+            "collections": self._collections,
+        }
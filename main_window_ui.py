@@ -65,14 +65,37 @@ class Ui_MainWindow(object):
         self.gridLabel.setObjectName("gridLabel")
         self.horizontalLayout.addWidget(self.gridLabel)
         self.gridComboBox = QtWidgets.QComboBox(self.optionWidget)
+        self.gridComboBox.setEditable(True)
         self.gridComboBox.setObjectName("gridComboBox")
         self.gridComboBox.addItem("")
         self.gridComboBox.addItem("")
         self.gridComboBox.addItem("")
         self.gridComboBox.addItem("")
         self.gridComboBox.addItem("")
+        self.gridComboBox.addItem("")
+        self.gridComboBox.addItem("")
+        self.gridComboBox.addItem("")
         self.horizontalLayout.addWidget(self.gridComboBox)
         self.verticalLayout_3.addLayout(self.horizontalLayout)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.ruleLabel = QtWidgets.QLabel(self.optionWidget)
+        self.ruleLabel.setObjectName("ruleLabel")
+        self.horizontalLayout_2.addWidget(self.ruleLabel)
+        self.ruleComboBox = QtWidgets.QComboBox(self.optionWidget)
+        self.ruleComboBox.setEditable(True)
+        self.ruleComboBox.setObjectName("ruleComboBox")
+        self.horizontalLayout_2.addWidget(self.ruleComboBox)
+        self.verticalLayout_3.addLayout(self.horizontalLayout_2)
+        self.horizontalLayout_3 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.boundaryLabel = QtWidgets.QLabel(self.optionWidget)
+        self.boundaryLabel.setObjectName("boundaryLabel")
+        self.horizontalLayout_3.addWidget(self.boundaryLabel)
+        self.boundaryComboBox = QtWidgets.QComboBox(self.optionWidget)
+        self.boundaryComboBox.setObjectName("boundaryComboBox")
+        self.horizontalLayout_3.addWidget(self.boundaryComboBox)
+        self.verticalLayout_3.addLayout(self.horizontalLayout_3)
         self.stepLabel = QtWidgets.QLabel(self.optionWidget)
         self.stepLabel.setObjectName("stepLabel")
         self.verticalLayout_3.addWidget(self.stepLabel)
@@ -85,6 +108,13 @@ class Ui_MainWindow(object):
         self.speedLabel = QtWidgets.QLabel(self.optionWidget)
         self.speedLabel.setObjectName("speedLabel")
         self.verticalLayout_3.addWidget(self.speedLabel)
+        self.turboCheckBox = QtWidgets.QCheckBox(self.optionWidget)
+        self.turboCheckBox.setObjectName("turboCheckBox")
+        self.verticalLayout_3.addWidget(self.turboCheckBox)
+        self.cycleCheckBox = QtWidgets.QCheckBox(self.optionWidget)
+        self.cycleCheckBox.setChecked(True)
+        self.cycleCheckBox.setObjectName("cycleCheckBox")
+        self.verticalLayout_3.addWidget(self.cycleCheckBox)
         self.gridLayout_2.addWidget(self.optionWidget, 1, 0, 1, 1)
         self.gridLayout_3.addWidget(self.panelWidget, 1, 0, 1, 1)
         self.gridWidget = QtWidgets.QWidget(self.centralwidget)
@@ -98,6 +128,8 @@ class Ui_MainWindow(object):
         self.menubar.setObjectName("menubar")
         self.menuFile = QtWidgets.QMenu(self.menubar)
         self.menuFile.setObjectName("menuFile")
+        self.menuView = QtWidgets.QMenu(self.menubar)
+        self.menuView.setObjectName("menuView")
         self.menuHelp = QtWidgets.QMenu(self.menubar)
         self.menuHelp.setObjectName("menuHelp")
         MainWindow.setMenuBar(self.menubar)
@@ -127,15 +159,32 @@ class Ui_MainWindow(object):
         self.action_How_to_play = QtWidgets.QAction(MainWindow)
         self.action_How_to_play.setIcon(icon3)
         self.action_How_to_play.setObjectName("action_How_to_play")
+        self.action_Performance = QtWidgets.QAction(MainWindow)
+        self.action_Performance.setCheckable(True)
+        self.action_Performance.setObjectName("action_Performance")
+        self.action_Trace = QtWidgets.QAction(MainWindow)
+        self.action_Trace.setCheckable(True)
+        self.action_Trace.setObjectName("action_Trace")
+        self.action_Density = QtWidgets.QAction(MainWindow)
+        self.action_Density.setCheckable(True)
+        self.action_Density.setObjectName("action_Density")
+        self.action_Statistics = QtWidgets.QAction(MainWindow)
+        self.action_Statistics.setCheckable(True)
+        self.action_Statistics.setObjectName("action_Statistics")
         self.menuFile.addAction(self.action_Open)
         self.menuFile.addSeparator()
         self.menuFile.addAction(self.action_Save)
         self.menuFile.addSeparator()
         self.menuFile.addAction(self.action_Exit)
+        self.menuView.addAction(self.action_Performance)
+        self.menuView.addAction(self.action_Trace)
+        self.menuView.addAction(self.action_Density)
+        self.menuView.addAction(self.action_Statistics)
         self.menuHelp.addAction(self.action_Rules)
         self.menuHelp.addSeparator()
         self.menuHelp.addAction(self.action_How_to_play)
         self.menubar.addAction(self.menuFile.menuAction())
+        self.menubar.addAction(self.menuView.menuAction())
         self.menubar.addAction(self.menuHelp.menuAction())
 
         self.retranslateUi(MainWindow)
@@ -155,10 +204,23 @@ class Ui_MainWindow(object):
         self.gridComboBox.setItemText(1, _translate("MainWindow", "20x20"))
         self.gridComboBox.setItemText(2, _translate("MainWindow", "30x20"))
         self.gridComboBox.setItemText(3, _translate("MainWindow", "40x40"))
+        self.gridComboBox.setToolTip(_translate("MainWindow", "Size of the grid shown, write any size as ROWSxCOLS and press enter"))
         self.gridComboBox.setItemText(4, _translate("MainWindow", "50x50"))
+        self.gridComboBox.setItemText(5, _translate("MainWindow", "100x100"))
+        self.gridComboBox.setItemText(6, _translate("MainWindow", "500x500"))
+        self.gridComboBox.setItemText(7, _translate("MainWindow", "1000x1000"))
+        self.ruleLabel.setText(_translate("MainWindow", "Rule:"))
+        self.boundaryLabel.setText(_translate("MainWindow", "Boundary:"))
+        self.boundaryComboBox.setToolTip(_translate("MainWindow", "Cells outside the grid: dead, wrapped around (torus) or added when the cells reach an edge (expand)"))
+        self.ruleComboBox.setToolTip(_translate("MainWindow", "Rule of the game, select a preset or write a rule as B3/S23 (B2/S/C3 for Generations) and press enter"))
         self.stepLabel.setText(_translate("MainWindow", "Step: 0"))
         self.speedLabel.setText(_translate("MainWindow", "Fps: 1"))
+        self.turboCheckBox.setToolTip(_translate("MainWindow", "Run the generations as fast as possible, the grid is shown at the display refresh rate"))
+        self.turboCheckBox.setText(_translate("MainWindow", "Turbo"))
+        self.cycleCheckBox.setToolTip(_translate("MainWindow", "Pause the simulation when a still life or an oscillator is detected"))
+        self.cycleCheckBox.setText(_translate("MainWindow", "Pause on cycle"))
         self.menuFile.setTitle(_translate("MainWindow", "&File"))
+        self.menuView.setTitle(_translate("MainWindow", "&View"))
         self.menuHelp.setTitle(_translate("MainWindow", "&Help"))
         self.action_Open.setText(_translate("MainWindow", "&Open"))
         self.action_Open.setToolTip(_translate("MainWindow", "Open existing configuration"))
@@ -171,4 +233,13 @@ class Ui_MainWindow(object):
         self.action_Rules.setText(_translate("MainWindow", "Rules"))
         self.action_Rules.setToolTip(_translate("MainWindow", "Rules of the game"))
         self.action_How_to_play.setText(_translate("MainWindow", "How to play"))
+        self.action_Performance.setText(_translate("MainWindow", "&Performance"))
+        self.action_Performance.setToolTip(_translate("MainWindow", "Show the timing of the phases, the population and the speed in the status bar"))
+        self.action_Performance.setShortcut(_translate("MainWindow", "Ctrl+P"))
+        self.action_Trace.setText(_translate("MainWindow", "&Trace"))
+        self.action_Trace.setToolTip(_translate("MainWindow", "Write the trace of the game on the standard error"))
+        self.action_Density.setText(_translate("MainWindow", "&Density"))
+        self.action_Density.setToolTip(_translate("MainWindow", "When zoomed out, show the density of the alive cells of every pixel"))
+        self.action_Statistics.setText(_translate("MainWindow", "&Statistics"))
+        self.action_Statistics.setToolTip(_translate("MainWindow", "Plot the population, the births, the deaths and the ages of the cells"))
 
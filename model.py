@@ -1,5 +1,15 @@
+from contextlib import contextmanager
 import numpy as np
 from PyQt5.QtCore import QObject, pyqtSignal
+from engine import (DEAD, DenseEngine, cellsOutside, dirtyRegions, engineOrigin, engineShape, engineWindow,
+                    gridCells, loadEngineCells, resizeGrid, resizeOffset, splitCells)
+from rules import CONWAY, convertGrid
+from census import CensusStream
+from simulation import DEFAULT_GRID_SIZE, parseSize
+from profiler import PROFILER
+from tracing import getTracer
+
+_trace = getTracer("model")
 
 # Observable class for observe value changed in model
 class Observable(QObject):
@@ -7,15 +17,49 @@ class Observable(QObject):
 
     def __init__(self):
         super().__init__()
+        # Notifications delayed until the end of the batch
+        self._batchDepth = 0
+        self._pending = {}
 
-    # Register observers
-    def register(self, slot):
-        self.value_changed.connect(slot)
+    # Register observers, of every change or of the given event only
+    def register(self, slot, event=None):
+        signal = self.value_changed if event is None else getattr(self, event)
+        signal.connect(slot)
 
-    # Notify the change
-    def notify(self):
+    # Notify the change, with the event signal and its payload
+    @PROFILER.timed("notify")
+    def notify(self, event=None, payload=None):
+        if self._batchDepth:
+            if event in self._pending:
+                payload = self._coalesce(event, self._pending[event], payload)
+            self._pending[event] = payload
+            return
+        if event is not None:
+            getattr(self, event).emit(payload)
         self.value_changed.emit(self)
 
+    @contextmanager
+    def batch(self):
+        """
+        Coalesce the notifications of the block: every event is emitted once at the end
+        """
+        self._batchDepth += 1
+        try:
+            yield self
+        finally:
+            self._batchDepth -= 1
+            if not self._batchDepth and self._pending:
+                pending, self._pending = self._pending, {}
+                with PROFILER.measure("notify"):
+                    for event, payload in pending.items():
+                        if event is not None:
+                            getattr(self, event).emit(payload)
+                    self.value_changed.emit(self)
+
+    # Merge the payloads of an event notified more times in a batch
+    def _coalesce(self, event, previous, payload):
+        return payload
+
 class GolModel(Observable):
     """
     Model class for Game of life
@@ -24,17 +68,67 @@ class GolModel(Observable):
     - flag relative to the run action
     - number of step of simulation
     - speed (fps) of simulation
+    - flag relative to the turbo mode (generations as fast as possible)
+    - cycle (still life or oscillator) detected in the evolution
+    - rule of the evolution (B/S notation or Generations)
+    - boundary mode of the grid: dead border, torus or expanding
+    - step engine that computes the generations, and the position of the grid loaded in its grid
+    - top left cell and size (zoomed) of the part of the grid shown
+    - version of the grid and regions changed from the previous version
+    - part of the grid of the engine read last: while the engine runs only the cells shown are read
+    - stream of the census of the generations computed by the engine
+
+    Every setter notifies a typed event:
+    - grid_changed with the regions changed (None if the whole grid changed)
+    - step_changed, fps_changed, running_changed, turbo_changed, rate_changed, cycle_changed, rule_changed, boundary_changed with the new value
+    - size_changed with the grid size selected
+    - viewport_changed with the part of the grid shown, when it is zoomed or panned
     """
 
+    grid_changed = pyqtSignal(object)
+    step_changed = pyqtSignal(int)
+    fps_changed = pyqtSignal(int)
+    running_changed = pyqtSignal(bool)
+    turbo_changed = pyqtSignal(bool)
+    rate_changed = pyqtSignal(float)
+    cycle_changed = pyqtSignal(object)
+    rule_changed = pyqtSignal(object)
+    boundary_changed = pyqtSignal(str)
+    size_changed = pyqtSignal(object)
+    viewport_changed = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
 
         self._running = False
         self._step = 0
         self._fps = 1
-        self._gridSize = [50,50]
+        self._turbo = False
+        self._generationsPerSecond = 0.0
+        self._cycle = None
+        self._rule = CONWAY
+        self._boundary = DEAD
         self._gridSizeSelected = [10,10]
-        self._grid = np.zeros((self._gridSize[0],self._gridSize[1]), dtype=np.uint8)
+        # Cells shown, the size selected until the viewport is zoomed
+        self._viewportSize = [10, 10]
+        self._grid = np.zeros(DEFAULT_GRID_SIZE, dtype=np.uint8)
+        # True when the engine is ahead of the grid, then the grid is read again only when needed
+        self._gridStale = False
+        self._gridShape = self._grid.shape
+        # Part (top, left, bottom, right) and cells read last from the engine
+        self._window = None
+        self._engine = DenseEngine()
+        # False when the grid has been changed outside the engine
+        self._engineLoaded = False
+        # Live cells (rows, cols, ages) of the engine outside the grid, loaded again with the grid
+        self._outside = None
+        # Position in the engine grid of the first cell of the grid loaded, it moves when the grid expands
+        self._engineOrigin = (0, 0)
+        self._viewportOrigin = self._centeredViewport()
+        # None when the whole grid has to be repainted
+        self._gridVersion = 0
+        self._dirtyRegions = None
+        self._census = CensusStream()
 
     # Getter and setter method
 
@@ -43,46 +137,381 @@ class GolModel(Observable):
 
     def setStep(self, step):
         self._step = step
-        self.notify()
+        self.notify("step_changed", step)
 
     def getFps(self):
         return self._fps
 
     def setFps(self, speed):
         self._fps = speed
-        self.notify()
+        self.notify("fps_changed", speed)
+
+    def isTurbo(self):
+        return self._turbo
+
+    def setTurbo(self, turbo):
+        self._turbo = turbo
+        self.notify("turbo_changed", turbo)
+
+    def getGenerationsPerSecond(self):
+        return self._generationsPerSecond
+
+    def setGenerationsPerSecond(self, rate):
+        self._generationsPerSecond = rate
+        self.notify("rate_changed", rate)
+
+    def getCycle(self):
+        return self._cycle
+
+    def setCycle(self, cycle):
+        self._cycle = cycle
+        self.notify("cycle_changed", cycle)
+
+    def getRule(self):
+        return self._rule
+
+    def setRule(self, rule):
+        """
+        Set the rule of the evolution, in the step engine and in the cells of the grid:
+        the cells are converted when the grid holds states of another kind of rule
+        """
+        _trace.debug("set rule rule=%s", rule)
+        # The cells computed by the engine, before it changes
+        self.getGrid()
+        self._engine.setRule(rule)
+        previous, self._rule = self._rule, rule
+        with self.batch():
+            grid = convertGrid(self.getGrid(), previous, rule)
+            if grid is not self._grid:
+                self.setGrid(grid)
+            self._unloadEngine()
+            self.notify("rule_changed", rule)
+
+    def getBoundary(self):
+        return self._boundary
+
+    def setBoundary(self, boundary):
+        """
+        Set the boundary mode of the grid in the step engine
+        """
+        _trace.debug("set boundary boundary=%s", boundary)
+        self.getGrid()
+        self._engine.setBoundary(boundary)
+        self._boundary = boundary
+        self._unloadEngine()
+        self.notify("boundary_changed", boundary)
 
     def isRunning(self):
         return self._running
 
     def setRunning(self, bool):
         self._running = bool
-        self.notify()
+        self.notify("running_changed", bool)
 
     def getGrid(self):
+        """
+        The whole grid, read again from the engine if it is ahead: not while the engine runs in the worker thread
+        """
+        if self._gridStale:
+            self._grid = self._engine.toGrid()
+            self._gridStale = False
         return self._grid
 
+    def getCells(self, top, left, bottom, right):
+        """
+        Cells (top, left, bottom, right) of the grid. While the engine is ahead of the grid they come from
+        the part read last, from the engine if it does not contain them and the simulation is not running.
+        While running the cells not read yet are dead, until the worker reads them
+        """
+        if not self._gridStale:
+            return self._grid[top:bottom, left:right]
+        if not self._windowContains(top, left, bottom, right) and not self._running:
+            viewport = self.getViewport()
+            self._window = (viewport, engineWindow(self._engine, *viewport))
+            if not self._windowContains(top, left, bottom, right):
+                return engineWindow(self._engine, top, left, bottom, right)
+        cells = np.zeros((bottom - top, right - left), dtype=np.uint8)
+        if self._window is not None:
+            (windowTop, windowLeft, windowBottom, windowRight), window = self._window
+            rows = slice(max(top, windowTop), min(bottom, windowBottom))
+            cols = slice(max(left, windowLeft), min(right, windowRight))
+            if rows.start < rows.stop and cols.start < cols.stop:
+                cells[rows.start - top:rows.stop - top, cols.start - left:cols.stop - left] = \
+                    window[rows.start - windowTop:rows.stop - windowTop, cols.start - windowLeft:cols.stop - windowLeft]
+        return cells
+
+    def _windowContains(self, top, left, bottom, right):
+        if self._window is None:
+            return False
+        windowTop, windowLeft, windowBottom, windowRight = self._window[0]
+        return windowTop <= top and windowLeft <= left and bottom <= windowBottom and right <= windowRight
+
+    def getPopulation(self):
+        """
+        Alive cells of the grid, from the census of the engine while it is ahead of the grid
+        """
+        latest = self._census.getLatest() if self._gridStale else None
+        if latest is None:
+            return int(np.count_nonzero(self.getGrid()))
+        return latest.population
+
     def setGrid(self, grid):
+        shape = self._gridShape
+        self._grid = grid
+        self._gridStale = False
+        self._gridShape = grid.shape
+        self._window = None
+        self._unloadEngine()
+        # A new grid replaces the whole universe
+        self._outside = None
+        if grid.shape != shape:
+            self._viewportOrigin = self._centeredViewport()
+        self._gridChanged(None)
+
+    def getGridVersion(self):
+        return self._gridVersion
+
+    def getDirtyRegions(self):
+        """
+        Regions (top, left, bottom, right) changed from the previous version of the grid,
+        None if the whole grid changed
+        """
+        return self._dirtyRegions
+
+    def _gridChanged(self, regions):
+        self._gridVersion += 1
+        self._dirtyRegions = regions
+        self.notify("grid_changed", regions)
+
+    def _coalesce(self, event, previous, payload):
+        if event == "grid_changed":
+            # The regions changed in the batch, the whole grid if any change is unknown
+            return None if previous is None or payload is None else previous + payload
+        return payload
+
+    def getEngine(self):
+        return self._engine
+
+    def setEngine(self, engine):
+        """
+        Set the step engine with the rule of the game. The boundary of the grid is kept
+        if the engine supports it, otherwise the grid takes the boundary of the engine
+        """
+        engine.setRule(self._rule)
+        # The cells computed by the previous engine
+        self._unloadEngine()
+        if self._boundary in engine.boundaries:
+            engine.setBoundary(self._boundary)
+        self._engine = engine
+        if engine.boundary != self._boundary:
+            self._boundary = engine.boundary
+            self.notify("boundary_changed", self._boundary)
+
+    def _unloadEngine(self):
+        """
+        The grid has been changed outside the engine, it is loaded again before the next generation
+        """
+        # The cells computed by the engine are kept in the grid, the ones outside it aside
+        self.getGrid()
+        if self._engineLoaded:
+            self._outside = cellsOutside(self._engine)
+        self._window = None
+        self._engineLoaded = False
+        self._engineOrigin = (0, 0)
+        self._census.reset()
+
+    def loadEngine(self, generation=None):
+        """
+        Load the grid in the step engine if it has been changed outside the engine.
+        The generation of the grid is the step if None
+        """
+        if not self._engineLoaded:
+            loadEngineCells(self._engine, self._grid, self._outside)
+            self._outside = None
+            self._engineLoaded = True
+            # The census of the grid loaded, for the births and deaths of the next generation
+            self._census.observe(self._engine, self._step if generation is None else generation)
+        return self._engine
+
+    def advance(self, generations=1):
+        """
+        Advance the grid of the given number of generations with the step engine
+        """
+        with PROFILER.measure("step"):
+            # The step is already the one of the generation computed
+            self.loadEngine(self._step - generations).step(generations)
+        with PROFILER.measure("census"):
+            self._census.observe(self._engine, self._step)
+        shape, origin = engineShape(self._engine), engineOrigin(self._engine)
+        # Only the cells shown are read, the viewport follows the cells first
+        self._followEngine(shape, origin)
+        viewport = self.getViewport()
+        self.setEngineWindow(engineWindow(self._engine, *viewport), viewport, shape, origin)
+
+    def setEngineGrid(self, grid, origin=(0, 0)):
+        """
+        Set a whole grid computed by the step engine, the engine is not reloaded
+        """
+        self.setEngineWindow(grid, (0, 0) + grid.shape, grid.shape, origin)
         self._grid = grid
-        self.notify()
+        self._gridStale = False
+
+    def setEngineWindow(self, cells, window, shape, origin=(0, 0)):
+        """
+        Set the cells of the window (top, left, bottom, right) of the grid (of the given shape) computed
+        by the step engine, the engine is not reloaded and the rest of the grid is read only when needed.
+        The origin is the position of the grid loaded in the grid of the engine:
+        when the grid expands at the top or at the left the part shown follows the cells.
+        The regions changed are searched only in the window, if the previous one is the same part of the same grid
+        """
+        self._engineLoaded = True
+        self._gridStale = True
+        self._followEngine(shape, origin)
+        previous, self._window = self._window, (tuple(window), cells)
+        regions = None
+        if previous is not None and previous[0] == self._window[0]:
+            top, left = window[:2]
+            regions = [(regionTop + top, regionLeft + left, regionBottom + top, regionRight + left)
+                       for regionTop, regionLeft, regionBottom, regionRight in dirtyRegions(previous[1], cells)]
+        self._gridChanged(regions)
+
+    def _followEngine(self, shape, origin):
+        """
+        Take the shape of the grid of the engine and move the viewport with the cells if the origin moved,
+        the part read last is in the previous coordinates
+        """
+        self._gridShape = tuple(shape)
+        if origin != self._engineOrigin:
+            self._viewportOrigin = (self._viewportOrigin[0] + origin[0] - self._engineOrigin[0],
+                                    self._viewportOrigin[1] + origin[1] - self._engineOrigin[1])
+            self._engineOrigin = origin
+            self._window = None
+
+    def getEngineViewport(self):
+        """
+        Part of the grid shown in the coordinates of the grid loaded in the engine, that do not move when the grid expands
+        """
+        top, left, bottom, right = self.getViewport()
+        row, col = self._engineOrigin
+        return top - row, left - col, bottom - row, right - col
+
+    def getCensus(self):
+        """
+        Stream of the census of the generations, observed also by the worker thread
+        """
+        return self._census
 
     def getGridSizeSelected(self):
         return self._gridSizeSelected
 
-    def setGridSizeSelected(self, size_text):
-        self._gridSizeSelected[0] = int(size_text[0:2])
-        self._gridSizeSelected[1] = int(size_text[3:5])
-        self.notify()
+    def setGridSizeSelected(self, size):
+        """
+        Set the size of the part of the grid shown, as ROWSxCOLS text or (rows, cols).
+        The grid grows around the cells if it is smaller than the size selected
+        """
+        rows, cols = parseSize(size) if isinstance(size, str) else size
+        self._gridSizeSelected = [rows, cols]
+        self._viewportSize = [rows, cols]
+        with self.batch():
+            if rows > self._gridShape[0] or cols > self._gridShape[1]:
+                self.resizeGrid(max(rows, self._gridShape[0]), max(cols, self._gridShape[1]))
+            self._viewportOrigin = self._centeredViewport()
+            self.notify("size_changed", self._gridSizeSelected)
+            self._gridChanged(None)
+
+    def _centeredViewport(self):
+        """
+        Top left cell of the cells shown at the center of the grid
+        """
+        rows = min(self._viewportSize[0], self._gridShape[0])
+        cols = min(self._viewportSize[1], self._gridShape[1])
+        return (self._gridShape[0] - rows) // 2, (self._gridShape[1] - cols) // 2
+
+    def getViewport(self):
+        """
+        Part (top, left, bottom, right) of the grid shown: the size selected (or zoomed) from the top left cell
+        of the viewport (at the center of the grid unless the grid expanded or the viewport panned), inside the grid
+        """
+        rows = min(self._viewportSize[0], self._gridShape[0])
+        cols = min(self._viewportSize[1], self._gridShape[1])
+        top = min(max(self._viewportOrigin[0], 0), self._gridShape[0] - rows)
+        left = min(max(self._viewportOrigin[1], 0), self._gridShape[1] - cols)
+        return top, left, top + rows, left + cols
+
+    def zoomViewport(self, factor, anchor=(0.5, 0.5)):
+        """
+        Zoom the viewport in (factor > 1) or out (factor < 1), from one cell to the whole grid.
+        The anchor is the position (fraction of the height and of the width) of the viewport that stays still
+        """
+        previous = self.getViewport()
+        top, left, bottom, right = previous
+        rows = min(max(self._zoomedSize(bottom - top, factor), 1), self._gridShape[0])
+        cols = min(max(self._zoomedSize(right - left, factor), 1), self._gridShape[1])
+        if [rows, cols] == [bottom - top, right - left]:
+            return
+        _trace.debug("zoom viewport rows=%d cols=%d", rows, cols)
+        self._viewportSize = [rows, cols]
+        row, col = top + anchor[0] * (bottom - top), left + anchor[1] * (right - left)
+        self._moveViewport(round(row - anchor[0] * rows), round(col - anchor[1] * cols), previous)
+
+    @staticmethod
+    def _zoomedSize(size, factor):
+        # At least a cell more or less, so that few cells can be zoomed
+        zoomed = round(size / factor)
+        if zoomed == size and factor != 1:
+            zoomed += 1 if factor < 1 else -1
+        return zoomed
+
+    def panViewport(self, rows, cols):
+        """
+        Move the viewport of the given number of cells, inside the grid
+        """
+        previous = self.getViewport()
+        self._moveViewport(previous[0] + rows, previous[1] + cols, previous)
+
+    def _moveViewport(self, top, left, previous):
+        # The origin is kept inside the grid, so the viewport follows the first move back
+        self._viewportOrigin = (top, left)
+        self._viewportOrigin = self.getViewport()[:2]
+        viewport = self.getViewport()
+        if viewport != previous:
+            self.notify("viewport_changed", viewport)
 
     def getGridSize(self):
-        return self._gridSize
+        return [self._gridShape[0], self._gridShape[1]]
+
+    def resizeGrid(self, rows, cols):
+        """
+        Change the size of the grid keeping the cells at the center, with a single bulk copy
+        """
+        _trace.debug("resize grid rows=%d cols=%d", rows, cols)
+        grid = self.getGrid()
+        self._unloadEngine()
+        outside = self._outside
+        if outside is None:
+            self.setGrid(resizeGrid(grid, rows, cols))
+            return
+        # The grid is a window of the universe: the cells cut stay outside it, the ones outside can enter it
+        top, left = resizeOffset(grid.shape, rows, cols)
+        cells = [np.concatenate(parts) for parts in zip(gridCells(grid), outside)]
+        grid, outside = splitCells((cells[0] + top, cells[1] + left, cells[2]), (rows, cols))
+        self.setGrid(grid)
+        self._outside = outside
 
     def clearGrid(self):
-        print("Clear Grid")
-        self._grid = np.zeros((self._gridSize[0], self._gridSize[1]), dtype=np.uint8)
-        self.notify()
+        _trace.debug("clear grid")
+        self._grid = np.zeros(self._gridShape, dtype=np.uint8)
+        self._gridStale = False
+        self._unloadEngine()
+        self._outside = None
+        self._gridChanged(None)
 
     def changeStateCell(self, row , col):
-        print("changeStateCell")
+        _trace.cell("change cell row=%d col=%d", row, col)
+        self.getGrid()
+        if self._engineLoaded:
+            # The grid can be shared with the engine
+            self._grid = self._grid.copy()
         self._grid[row][col] = 1 if self._grid[row][col] == 0 else 0
-        self.notify()
\ No newline at end of file
+        self._unloadEngine()
+        self._gridChanged([(row, col, row + 1, col + 1)])
\ No newline at end of file
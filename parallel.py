@@ -0,0 +1,205 @@
+import multiprocessing
+import os
+import weakref
+from functools import lru_cache
+from multiprocessing import shared_memory
+import numpy as np
+
+from engine import DEAD, TORUS, checkBoundary, countBirths, nextGeneration
+from rules import CONWAY, parseRule
+from cycle import stateHash
+from census import ageHistogram, boundingBox
+
+# Shared buffers attached by every worker process
+_buffers = {}
+
+
+def _attach(names, shape):
+    """
+    Initializer of the worker processes: attach to the two shared grids
+    """
+    _buffers["memory"] = [shared_memory.SharedMemory(name=name) for name in names]
+    _buffers["grids"] = [np.ndarray(shape, dtype=np.uint8, buffer=memory.buf) for memory in _buffers["memory"]]
+
+
+def _stepTile(task):
+    """
+    Compute the next generation of the rows [start, stop) reading one halo row on each side.
+    On a torus the halo rows of the first and of the last tile wrap around the grid.
+    If the census is requested return the births and the box (None if empty) of the tile
+    """
+    source, start, stop, rulestring, boundary, census = task
+    src = _buffers["grids"][source]
+    dst = _buffers["grids"][1 - source]
+    if boundary == TORUS:
+        # The halo rows of the tile wrap, the results of the halo rows are discarded
+        tile = nextGeneration(src.take(range(start - 1, stop + 1), axis=0, mode='wrap'), _parseRule(rulestring), wrap=True)
+        dst[start:stop] = tile[1:-1]
+    else:
+        top = max(start - 1, 0)
+        bottom = min(stop + 1, src.shape[0])
+        tile = nextGeneration(src[top:bottom], _parseRule(rulestring))
+        dst[start:stop] = tile[start - top:start - top + stop - start]
+    if not census:
+        return None
+    # The tile is still in the cache of the worker
+    cells = dst[start:stop]
+    rows, cols = np.flatnonzero(cells.any(axis=1)), np.flatnonzero(cells.any(axis=0))
+    box = (start + int(rows[0]), int(cols[0]), start + int(rows[-1]) + 1, int(cols[-1]) + 1) if rows.size else None
+    return countBirths(src[start:stop], cells), box
+
+
+@lru_cache(maxsize=None)
+def _parseRule(rulestring):
+    # The rule is sent as text and compiled once by every worker
+    return parseRule(rulestring)
+
+
+def _release(pool, memories):
+    pool.terminate()
+    for memory in memories:
+        memory.close()
+        memory.unlink()
+
+
+class ParallelEngine:
+    """
+        Step engine that splits the grid in row tiles stepped by a pool of worker processes
+        Composed by:
+        - two grids in shared memory, the current generation and the next one
+        - pool of worker processes attached to the shared grids
+        - tiles of rows assigned to the workers
+        - births and bounding box of the last generation, returned by the workers with their tiles
+        - rule of the evolution
+        - boundary mode of the grid, dead or torus
+
+        Every worker reads its tile plus one halo row on each side from the current grid
+        and writes the next generation of the tile, so the grid is never pickled and the
+        result is identical to the serial step.
+    """
+
+    name = "parallel"
+    boundaries = (DEAD, TORUS)
+
+    def __init__(self, workers=None, tiles=None, rule=CONWAY, boundary=DEAD):
+        self._workers = workers or os.cpu_count() or 1
+        self._tiles = tiles or self._workers
+        self._shape = None
+        self._pool = None
+        self._memories = []
+        self._grids = []
+        self._current = 0
+        self._finalizer = None
+        self._census = None
+        self.rule = rule
+        self.setBoundary(boundary)
+
+    def _allocate(self, shape):
+        """
+        Allocate the shared grids and start the pool of workers
+        """
+        self.close()
+        size = max(shape[0] * shape[1], 1)
+        self._memories = [shared_memory.SharedMemory(create=True, size=size) for _ in range(2)]
+        self._grids = [np.ndarray(shape, dtype=np.uint8, buffer=memory.buf) for memory in self._memories]
+        self._pool = multiprocessing.Pool(self._workers, initializer=_attach,
+                                          initargs=([memory.name for memory in self._memories], shape))
+        self._finalizer = weakref.finalize(self, _release, self._pool, self._memories)
+        self._shape = shape
+
+    def setRule(self, rule):
+        self.rule = rule
+
+    def setBoundary(self, boundary):
+        checkBoundary(self, boundary, self.rule)
+        self.boundary = boundary
+
+    def close(self):
+        """
+        Stop the workers and release the shared memory
+        """
+        if self._finalizer is not None:
+            self._grids = []
+            self._finalizer()
+            self._finalizer = None
+            self._pool = None
+            self._memories = []
+            self._shape = None
+
+    def load(self, grid):
+        """
+        Load the state of the engine from an age grid
+        """
+        grid = np.asarray(grid, dtype=np.uint8)
+        if self._shape != grid.shape:
+            self._allocate(grid.shape)
+        self._current = 0
+        self._grids[0][...] = grid
+        self._census = None
+
+    def step(self, generations=1):
+        """
+        Advance the given number of generations
+        """
+        rows = self._shape[0]
+        bounds = np.linspace(0, rows, min(self._tiles, max(rows, 1)) + 1).astype(int)
+        for generation in range(generations):
+            # The census of the tiles only in the last generation
+            census = generation == generations - 1
+            tasks = [(self._current, int(start), int(stop), self.rule.toString(), self.boundary, census)
+                     for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+            results = self._pool.map(_stepTile, tasks)
+            self._current = 1 - self._current
+        if generations > 0:
+            self._census = results
+
+    def toGrid(self):
+        """
+        Return the age grid of the current generation
+        """
+        return self._grids[self._current].copy()
+
+    def getWindow(self, top, left, bottom, right):
+        """
+        Return the age grid of the cells in the rows [top, bottom) and the columns [left, right)
+        """
+        return self._grids[self._current][top:bottom, left:right].copy()
+
+    def getShape(self):
+        return self._shape if self._shape is not None else (0, 0)
+
+    def getPopulation(self):
+        return int(np.count_nonzero(self._grids[self._current]))
+
+    def getBirths(self):
+        """
+        Number of cells born in the last generation, the sum of the births of the tiles. None before the first one
+        """
+        if self._census is None:
+            return None
+        return sum(births for births, _ in self._census)
+
+    def getBoundingBox(self):
+        """
+        Box (top, left, bottom, right) of the cells not dead, merged from the boxes of the tiles. None if empty,
+        read from the grid before the first generation
+        """
+        if self._census is None:
+            return boundingBox(self._grids[self._current])
+        boxes = [box for _, box in self._census if box is not None]
+        if not boxes:
+            return None
+        tops, lefts, bottoms, rights = zip(*boxes)
+        return min(tops), min(lefts), max(bottoms), max(rights)
+
+    def getAgeHistogram(self):
+        """
+        Histogram of the ages (of the states) of the current grid, read in the shared memory without a copy
+        """
+        return ageHistogram(self._grids[self._current], self.rule)
+
+    def getStateHash(self):
+        """
+        Hash of the current grid, read in the shared memory without a copy
+        """
+        return stateHash(self._grids[self._current], self.rule.states)
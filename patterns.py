@@ -0,0 +1,266 @@
+import re
+import numpy as np
+
+# Size of the chunks of the RLE files parsed at once
+CHUNK_SIZE = 1 << 22
+
+_NEWLINE, _DOLLAR, _END, _DEAD = ord('\n'), ord('$'), ord('!'), ord('b')
+_WHITESPACE = np.array([ord(' '), ord('\t'), ord('\r'), ord('\n')], dtype=np.uint8)
+_POWERS = 10 ** np.arange(19, dtype=np.int64)
+_HEADER = re.compile(r"x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*(\S+))?", re.IGNORECASE)
+
+
+class Pattern:
+    """
+        Pattern loaded from a file
+        Composed by:
+        - rows and cols of the alive cells, relative to the top left corner
+        - height and width of the bounding box
+        - name and rule written in the file, if any
+    """
+
+    def __init__(self, rows, cols, height, width, name=None, rule=None):
+        self.rows = rows
+        self.cols = cols
+        self.height = height
+        self.width = width
+        self.name = name
+        self.rule = rule
+
+    def getPopulation(self):
+        return int(self.rows.size)
+
+
+def readPattern(path):
+    """
+    Read a pattern from a plaintext (.cells) or Run Length Encoded (.rle) file
+    """
+    with open(path, 'rb') as file:
+        start = file.read(4096)
+        file.seek(0)
+        if str(path).lower().endswith('.rle') or _isRle(start):
+            return _readRle(file)
+        return _readCells(file.read())
+
+
+def _isRle(start):
+    for line in start.splitlines():
+        line = line.strip()
+        if line and not line.startswith(b'#'):
+            return _HEADER.match(line.decode('ascii', 'replace')) is not None
+    return False
+
+
+def _readCells(data):
+    """
+    Parse a plaintext pattern: '!' starts a comment line, 'O' is an alive cell
+    """
+    name = None
+    body = []
+    for line in data.splitlines():
+        if line.startswith(b'!'):
+            if name is None and line[1:].lower().startswith(b'name:'):
+                name = line[6:].strip().decode('utf-8', 'replace')
+            continue
+        body.append(line.rstrip(b'\r'))
+
+    text = np.frombuffer(b'\n'.join(body) + b'\n', dtype=np.uint8)
+    newlines = np.flatnonzero(text == _NEWLINE)
+    lineStart = np.concatenate(([0], newlines[:-1] + 1))
+
+    # Row of every alive cell from the number of newlines before it, column from the start of its line
+    alive = np.flatnonzero((text == ord('O')) | (text == ord('*')))
+    rows = np.searchsorted(newlines, alive)
+    cols = alive - lineStart[rows]
+    width = int((newlines - lineStart).max()) if newlines.size else 0
+    return Pattern(rows.astype(np.int64), cols.astype(np.int64), len(body), width, name)
+
+
+def _readRle(file):
+    """
+    Parse a Run Length Encoded pattern in chunks, every chunk is decoded with array operations
+    """
+    name, rule, height, width = None, None, 0, 0
+
+    # Header: comment lines and the line with the size and the rule
+    for line in file:
+        line = line.strip()
+        if line.startswith(b'#'):
+            if line[1:2] == b'N':
+                name = line[2:].strip().decode('utf-8', 'replace')
+            continue
+        if not line:
+            continue
+        header = _HEADER.match(line.decode('ascii', 'replace'))
+        if header is None:
+            raise ValueError("Invalid RLE header: {}".format(line))
+        width, height, rule = int(header.group(1)), int(header.group(2)), header.group(3)
+        break
+
+    decoder = _RleDecoder()
+    while not decoder.finished:
+        chunk = file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        decoder.feed(chunk)
+    rows, cols = decoder.cells()
+    if rows.size:
+        height = max(height, int(rows.max()) + 1)
+        width = max(width, int(cols.max()) + 1)
+    return Pattern(rows, cols, height, width, name, rule)
+
+
+class _RleDecoder:
+    """
+        Decoder of the body of a RLE pattern fed in chunks
+        Composed by:
+        - digits of a run count split between two chunks
+        - position (row, col) at the end of the previous chunk
+        - coordinates of the alive cells decoded
+    """
+
+    def __init__(self):
+        self._carry = b''
+        self._row = 0
+        self._col = 0
+        self._rows = []
+        self._cols = []
+        self.finished = False
+
+    def feed(self, chunk):
+        data = np.frombuffer(self._carry + chunk, dtype=np.uint8)
+        data = data[~np.isin(data, _WHITESPACE)]
+
+        # The digits after the last tag belong to the next chunk
+        isDigit = (data >= ord('0')) & (data <= ord('9'))
+        tags = np.flatnonzero(~isDigit)
+        end = tags[-1] + 1 if tags.size else 0
+        self._carry = data[end:].tobytes()
+        data, isDigit, = data[:end], isDigit[:end]
+        if not tags.size:
+            return
+
+        # Stop at the end of the pattern
+        stops = np.flatnonzero(data[tags] == _END)
+        if stops.size:
+            tags = tags[:stops[0] + 1]
+            data, isDigit = data[:tags[-1] + 1], isDigit[:tags[-1] + 1]
+            self.finished = True
+
+        # Run count of every tag from the digits before it (1 if there are no digits)
+        tagIndex = np.cumsum(~isDigit) - (~isDigit)
+        digits = np.flatnonzero(isDigit)
+        exponent = tags[tagIndex[digits]] - digits - 1
+        values = (data[digits] - ord('0')) * _POWERS[exponent]
+        counts = np.ones(tags.size, dtype=np.int64)
+        if digits.size:
+            counts[tagIndex[digits[exponent == 0]]] = 0
+            np.add.at(counts, tagIndex[digits], values)
+
+        symbols = data[tags]
+        isNewline = symbols == _DOLLAR
+        isCell = ~isNewline & (symbols != _END)
+
+        # Row of every tag and column where its run starts, restarting from 0 after a '$'
+        rowOfTag = self._row + np.cumsum(np.where(isNewline, counts, 0)) - np.where(isNewline, counts, 0)
+        advance = np.where(isCell, counts, 0)
+        colEnd = np.cumsum(advance)
+        lineStart = np.maximum.accumulate(np.where(isNewline, colEnd, 0))
+        colStart = colEnd - advance - lineStart + np.where(np.cumsum(isNewline) == 0, self._col, 0)
+
+        # Expand the runs of alive cells (every state different from 'b' and '.')
+        alive = isCell & (symbols != _DEAD) & (symbols != ord('.'))
+        runCount = counts[alive]
+        total = int(runCount.sum())
+        if total:
+            runOffset = np.repeat(np.cumsum(runCount) - runCount, runCount)
+            self._rows.append(np.repeat(rowOfTag[alive], runCount))
+            self._cols.append(np.repeat(colStart[alive], runCount) + np.arange(total) - runOffset)
+
+        # Position at the end of the chunk
+        newlines = int(np.where(isNewline, counts, 0).sum())
+        self._col = int(colStart[-1] + advance[-1])
+        self._row += newlines
+
+    def cells(self):
+        if not self._rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(self._rows).astype(np.int64), np.concatenate(self._cols).astype(np.int64)
+
+
+def patternOrigin(pattern, gridSize):
+    """
+    Top left corner of the pattern placed at the center of a grid of the given size
+    """
+    return (gridSize[0] - pattern.height) // 2, (gridSize[1] - pattern.width) // 2
+
+
+def placePattern(grid, pattern):
+    """
+    Write the alive cells of the pattern at the center of the grid
+    """
+    if pattern.height > grid.shape[0] or pattern.width > grid.shape[1]:
+        raise ValueError("Pattern {}x{} does not fit in grid {}x{}".format(pattern.height, pattern.width, grid.shape[0], grid.shape[1]))
+    top, left = patternOrigin(pattern, grid.shape)
+    grid[pattern.rows + top, pattern.cols + left] = 1
+    return grid
+
+
+def fittingSize(gridSize, patterns):
+    """
+    Grid size enlarged, if needed, so that every pattern fits at the center
+    """
+    rows, cols = gridSize
+    for pattern in patterns:
+        rows, cols = max(rows, pattern.height), max(cols, pattern.width)
+    return rows, cols
+
+
+def gridFromPattern(pattern, gridSize):
+    """
+    Create a new grid with the pattern at the center
+    """
+    return placePattern(np.zeros((gridSize[0], gridSize[1]), dtype=np.uint8), pattern)
+
+
+def loadPattern(engine, pattern, gridSize):
+    """
+    Load the pattern at the center of the window of the engine, the engines that store
+    the live cells receive the coordinates directly (the pattern can be bigger than the window)
+    """
+    if hasattr(engine, "setCells"):
+        top, left = patternOrigin(pattern, gridSize)
+        engine.setCells(pattern.rows + top, pattern.cols + left, shape=tuple(gridSize))
+    else:
+        engine.load(gridFromPattern(pattern, gridSize))
+
+
+def writeCells(path, grid, name=None):
+    """
+    Write the grid as a plaintext .cells configuration
+    """
+    symbols = np.where(np.asarray(grid) > 0, ord('O'), ord('.')).astype(np.uint8)
+    with open(path, 'w') as file:
+        file.write("!Name: " + (name if name is not None else str(path)) + "\n")
+        file.write("\n".join(row.tobytes().decode('ascii') for row in symbols) + "\n")
+
+
+def writeRle(path, grid, name=None, rule="B3/S23"):
+    """
+    Write the alive cells of the grid as a Run Length Encoded pattern
+    """
+    alive = np.asarray(grid) > 0
+    lines = []
+    for row in alive:
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], row, [False])).astype(np.int8)))
+        runs, position = [], 0
+        for start, stop in zip(edges[::2], edges[1::2]):
+            if start > position:
+                runs.append("{}b".format(start - position))
+            runs.append("{}o".format(stop - start))
+            position = stop
+        lines.append("".join(runs))
+    with open(path, 'w') as file:
+        if name is not None:
+            file.write("#N " + name + "\n")
+        file.write("x = {}, y = {}, rule = {}\n{}!\n".format(alive.shape[1], alive.shape[0], rule, "$".join(lines)))
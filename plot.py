@@ -0,0 +1,97 @@
+from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import QPainter, QColor, QPen, QPolygonF
+from PyQt5.QtWidgets import QWidget
+
+# Colors of the series of the plot
+POPULATION_COLOR = QColor(30, 90, 200)
+BIRTHS_COLOR = QColor(40, 160, 60)
+DEATHS_COLOR = QColor(210, 50, 40)
+HISTOGRAM_COLOR = QColor(150, 150, 150)
+
+# Part of the width of the plot taken by the histogram of the ages
+HISTOGRAM_WIDTH = 0.25
+
+# Height in pixel of the line of text with the last census
+TEXT_HEIGHT = 16
+
+
+class CensusPlot(QWidget):
+    """
+        Plot of the census of the last generations
+        Composed by:
+        - stream of the census observed, read when the plot is painted
+        - population (on its own scale), births and deaths of the last generations, a generation per pixel
+        - bars of the last histogram of the ages (of the states)
+        - text with the last census
+    """
+
+    def __init__(self, parent, census):
+        super().__init__(parent)
+        self._census = census
+        self.setMinimumHeight(120)
+
+    def paintEvent(self, event):
+        history = self._census.getHistory()
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        if not history:
+            painter.end()
+            return
+
+        last = history[-1]
+        painter.setPen(Qt.black)
+        painter.drawText(QRectF(4, 0, self.width() - 8, TEXT_HEIGHT), Qt.AlignLeft | Qt.AlignVCenter, self._describe(last))
+
+        histogramWidth = int(self.width() * HISTOGRAM_WIDTH)
+        area = QRectF(0, TEXT_HEIGHT, self.width() - histogramWidth, self.height() - TEXT_HEIGHT)
+        censuses = history[-max(int(area.width()), 1):]
+        self._drawSeries(painter, area, [census.population for census in censuses], POPULATION_COLOR)
+        # Births and deaths on the same scale, so they can be compared
+        changes = [census.births for census in censuses] + [census.deaths for census in censuses]
+        top = max([change for change in changes if change is not None] or [0])
+        self._drawSeries(painter, area, [census.births for census in censuses], BIRTHS_COLOR, top)
+        self._drawSeries(painter, area, [census.deaths for census in censuses], DEATHS_COLOR, top)
+
+        sampled = next((census for census in reversed(history) if census.histogram is not None), None)
+        if sampled is not None:
+            self._drawHistogram(painter, QRectF(area.right(), TEXT_HEIGHT, histogramWidth, area.height()), sampled.histogram)
+        painter.end()
+
+    @staticmethod
+    def _describe(census):
+        text = "generation {}  population {}".format(census.generation, census.population)
+        if census.births is not None:
+            text += "  births {}  deaths {}".format(census.births, census.deaths)
+        if census.box is not None:
+            text += "  box {}x{}".format(census.box[2] - census.box[0], census.box[3] - census.box[1])
+        return text
+
+    @staticmethod
+    def _drawSeries(painter, area, values, color, top=None):
+        """
+        Line of the values from the left of the area, scaled to the top value (the maximum if None).
+        The unknown values (None) break the line
+        """
+        known = [value for value in values if value is not None]
+        top = max(known or [0]) if top is None else top
+        painter.setPen(QPen(color, 0))
+        line = QPolygonF()
+        for x, value in enumerate(values):
+            if value is None:
+                painter.drawPolyline(line)
+                line = QPolygonF()
+                continue
+            line.append(QPointF(area.left() + x, area.bottom() - (value / top * (area.height() - 1) if top else 0)))
+        painter.drawPolyline(line)
+
+    @staticmethod
+    def _drawHistogram(painter, area, histogram):
+        """
+        Bars of the histogram, the height of the bars is relative to the highest one
+        """
+        top = max(histogram) or 1
+        width = area.width() / max(len(histogram), 1)
+        for index, count in enumerate(histogram):
+            height = count / top * (area.height() - 1)
+            painter.fillRect(QRectF(area.left() + index * width + 1, area.bottom() - height, max(width - 2, 1), height),
+                             HISTOGRAM_COLOR)
@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Number of buckets of the timing histograms, bucket i counts the times in [2^(i-1), 2^i) microseconds
+HISTOGRAM_BUCKETS = 24
+
+# Number of events remembered for the rates
+RATE_WINDOW = 64
+
+
+class PhaseStatistics:
+    """
+        Timing statistics of a phase
+        Composed by:
+        - number of calls, total and maximum time
+        - histogram of the times in power of two buckets of microseconds
+    """
+
+    __slots__ = ("count", "total", "maximum", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+        self.histogram[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """
+        Upper bound in seconds of the given fraction of the times, from the histogram
+        """
+        threshold = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= threshold:
+                return min((1 << bucket) / 1e6, self.maximum)
+        return self.maximum
+
+    def toDict(self):
+        return {
+            "count": self.count,
+            "mean_ms": 1e3 * self.total / self.count if self.count else 0.0,
+            "p50_ms": 1e3 * self.percentile(0.5),
+            "p95_ms": 1e3 * self.percentile(0.95),
+            "max_ms": 1e3 * self.maximum,
+            "histogram_us": {str(1 << bucket): count for bucket, count in enumerate(self.histogram) if count},
+        }
+
+
+class Profiler:
+    """
+        Lightweight instrumentation of the phases of the game
+        Composed by:
+        - flag of the profiler, when disabled nothing is recorded
+        - timing statistics of every phase
+        - timestamps of the latest events counted, for their rates
+
+        The phases can be nested (the notifications include the slots they call),
+        every phase reports the time spent inside it.
+    """
+
+    def __init__(self, enabled=True):
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._phases = {}
+        self._events = {}
+
+    def isEnabled(self):
+        return self._enabled
+
+    def setEnabled(self, enabled):
+        self._enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self._phases = {}
+            self._events = {}
+
+    def record(self, phase, seconds):
+        """
+        Record the time of a phase, also from the worker threads
+        """
+        with self._lock:
+            statistics = self._phases.get(phase)
+            if statistics is None:
+                statistics = self._phases[phase] = PhaseStatistics()
+            statistics.add(seconds)
+
+    @contextmanager
+    def measure(self, phase):
+        """
+        Record the time spent in the block
+        """
+        if not self._enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def timed(self, phase):
+        """
+        Decorator that records the time of every call of the function
+        """
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self._enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(phase, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def tick(self, event):
+        """
+        Count an occurrence of the event (a frame shown, a generation computed)
+        """
+        if self._enabled:
+            with self._lock:
+                times = self._events.get(event)
+                if times is None:
+                    times = self._events[event] = deque(maxlen=RATE_WINDOW)
+                times.append(time.perf_counter())
+
+    def getRate(self, event):
+        """
+        Occurrences per second of the event over the latest occurrences, 0 if stopped
+        """
+        with self._lock:
+            times = self._events.get(event)
+            if not times or len(times) < 2:
+                return 0.0
+            first, count = times[0], len(times)
+        # Measured until now, so the rate drops when the event is no longer counted
+        interval = time.perf_counter() - first
+        return (count - 1) / interval if interval > 0 else 0.0
+
+    def getPhase(self, phase):
+        """
+        Statistics of the phase as a dictionary, None if never recorded
+        """
+        with self._lock:
+            statistics = self._phases.get(phase)
+            return statistics.toDict() if statistics is not None else None
+
+    def getStatistics(self):
+        """
+        Statistics of all the phases and rates of all the events
+        """
+        with self._lock:
+            phases = {phase: statistics.toDict() for phase, statistics in self._phases.items()}
+            events = list(self._events)
+        return {"phases": phases, "rates": {event: self.getRate(event) for event in events}}
+
+    def dump(self, path):
+        """
+        Write the statistics on file as JSON
+        """
+        with open(path, "w") as file:
+            json.dump(self.getStatistics(), file, indent=2)
+
+
+# Profiler of the application, enabled by default
+PROFILER = Profiler()
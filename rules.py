@@ -0,0 +1,166 @@
+import re
+import numpy as np
+
+# Number of neighbor counts of a cell (0..8)
+COUNTS = 9
+
+# Maximum number of states of a Generations rule, the states are stored in uint8 cells
+MAX_STATES = 256
+
+# Rules known by name
+PRESETS = {
+    "Life": "B3/S23",
+    "HighLife": "B36/S23",
+    "Day & Night": "B3678/S34678",
+    "Seeds": "B2/S",
+    "Life without Death": "B3/S012345678",
+    "Replicator": "B1357/S1357",
+    "Maze": "B3/S12345",
+    "Morley": "B368/S245",
+    "Brian's Brain": "B2/S/C3",
+    "Star Wars": "B2/S345/C4",
+}
+
+_BS = re.compile(r"^B([0-8]*)/S([0-8]*)(?:/C?(\d+))?$", re.IGNORECASE)
+_SB = re.compile(r"^S([0-8]*)/B([0-8]*)(?:/C?(\d+))?$", re.IGNORECASE)
+# Classic notation survival/birth, with the number of states for the Generations rules
+_CLASSIC = re.compile(r"^([0-8]*)/([0-8]*)(?:/(\d+))?$")
+
+
+class Rule:
+    """
+        Life-like rule (B/S notation) or Generations rule
+        Composed by:
+        - neighbor counts for the birth and for the survival of a cell
+        - number of states: 2 for Life-like rules, more for Generations rules
+        - transition table compiled from the counts
+
+        The table is indexed by state * 9 + count (count of the neighbors in state 1),
+        so a generation is a single lookup for every cell, without branches.
+        For Life-like rules the cells hold their age and the table gives 0 (dead),
+        1 (born) or 2 (survived, the age is incremented).
+        For Generations rules the cells hold their state (0 dead, 1 alive, 2.. dying)
+        and the table gives the next state.
+    """
+
+    def __init__(self, birth, survival, states=2, name=None):
+        if not 2 <= states <= MAX_STATES:
+            raise ValueError("Invalid number of states {}, from 2 to {}".format(states, MAX_STATES))
+        self.birth = frozenset(birth)
+        self.survival = frozenset(survival)
+        self.states = states
+        self.name = name
+        self.table = self._compile()
+
+    def _compile(self):
+        counts = np.arange(COUNTS)
+        born = np.isin(counts, list(self.birth))
+        survive = np.isin(counts, list(self.survival))
+        if self.isLifeLike():
+            return np.concatenate((born, 2 * survive)).astype(np.uint8)
+
+        table = np.zeros((self.states, COUNTS), dtype=np.uint8)
+        table[0] = born
+        # An alive cell that does not survive starts dying
+        table[1] = np.where(survive, 1, 2 if self.states > 2 else 0)
+        # The dying cells fade until they are dead
+        for state in range(2, self.states):
+            table[state] = state + 1 if state + 1 < self.states else 0
+        return table.ravel()
+
+    def isLifeLike(self):
+        return self.states == 2
+
+    def isConway(self):
+        return self.isLifeLike() and self.birth == {3} and self.survival == {2, 3}
+
+    def hasBirthWithoutNeighbors(self):
+        """
+        True for the rules with B0, a dead cell with no alive neighbors is born
+        """
+        return 0 in self.birth
+
+    def toString(self):
+        """
+        Rulestring in B/S notation, with the number of states for the Generations rules
+        """
+        text = "B{}/S{}".format("".join(map(str, sorted(self.birth))), "".join(map(str, sorted(self.survival))))
+        return text if self.isLifeLike() else "{}/C{}".format(text, self.states)
+
+    def __str__(self):
+        return self.toString()
+
+    def __repr__(self):
+        return "Rule({})".format(self.toString())
+
+    def __eq__(self, other):
+        return isinstance(other, Rule) and (self.birth, self.survival, self.states) == (other.birth, other.survival, other.states)
+
+    def __hash__(self):
+        return hash((self.birth, self.survival, self.states))
+
+
+def parseRule(text):
+    """
+    Parse a rule: a preset name, B/S notation (B36/S23, S23/B36), classic notation (23/36)
+    and Generations rules with the number of states (B2/S/C3, /2/3)
+    """
+    if isinstance(text, Rule):
+        return text
+    text = text.strip()
+    rulestring = _PRESET_NAMES.get(text.lower(), text).replace(" ", "")
+
+    match = _BS.match(rulestring)
+    if match:
+        birth, survival, states = match.groups()
+    else:
+        match = _SB.match(rulestring) or _CLASSIC.match(rulestring)
+        if match is None:
+            raise ValueError("Invalid rule '{}', expected B/S notation like B3/S23".format(text))
+        survival, birth, states = match.groups()
+    rule = Rule((int(count) for count in birth), (int(count) for count in survival), int(states) if states else 2)
+    rule.name = _NAMES.get(rule.toString())
+    return rule
+
+
+def convertGrid(grid, previous, rule):
+    """
+    Cells of a grid of the previous rule for the given rule: when a Life-like rule
+    and a Generations rule are exchanged the alive cells restart from age (or state) 1
+    """
+    if previous.isLifeLike() == rule.isLifeLike() and (rule.isLifeLike() or previous.states <= rule.states):
+        return grid
+    alive = grid > 0 if previous.isLifeLike() else grid == 1
+    return alive.astype(np.uint8)
+
+
+def describeRule(rule):
+    """
+    Sentences that explain the rule
+    """
+    def counts(values):
+        values = sorted(values)
+        if not values:
+            return None
+        return ", ".join(map(str, values[:-1])) + " or " + str(values[-1]) if len(values) > 1 else str(values[0])
+
+    birth, survival = counts(rule.birth), counts(rule.survival)
+    sentences = [
+        "If a cell is OFF and has {} neighbors that are ON, it turns ON".format(birth) if birth
+        else "A cell that is OFF never turns ON",
+        "If a cell is ON and has {} neighbors that are ON, it remains ON".format(survival) if survival
+        else "A cell that is ON never remains ON",
+    ]
+    if rule.isLifeLike():
+        sentences.append("Otherwise the cell is (or turns) OFF")
+    else:
+        sentences.append("Otherwise a cell that is ON starts dying: it stays dying for {} generations, "
+                         "not counted as a neighbor, then it turns OFF".format(rule.states - 2))
+    return sentences
+
+
+# Rulestring of the presets by name (lower case) and name of the presets by rulestring
+_PRESET_NAMES = {name.lower(): rulestring for name, rulestring in PRESETS.items()}
+_NAMES = {rulestring: name for name, rulestring in PRESETS.items()}
+
+CONWAY = parseRule("B3/S23")
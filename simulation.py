@@ -0,0 +1,237 @@
+import json
+import time
+import numpy as np
+
+from engine import EXPAND, DenseEngine
+from patterns import fittingSize, loadPattern
+from snapshot import Snapshot, saveSnapshot
+from cycle import skipAhead
+from rules import convertGrid, parseRule
+
+# Default size of the grid, the same of the GolModel
+DEFAULT_GRID_SIZE = (50, 50)
+
+
+def parseSize(size_text):
+    """
+    Parse a grid size written as ROWSxCOLS, of any number of digits
+    """
+    try:
+        rows, cols = (int(side) for side in size_text.lower().split('x'))
+    except ValueError:
+        raise ValueError("Invalid grid size '{}', expected ROWSxCOLS".format(size_text))
+    if rows <= 0 or cols <= 0:
+        raise ValueError("Invalid grid size '{}', the sides must be positive".format(size_text))
+    return rows, cols
+
+
+class Simulation:
+    """
+        Headless simulation of Game of Life, without any dependency from PyQt5
+        Composed by:
+        - step engine with the state of the game and the rule of the evolution
+        - number of step of simulation
+        - population of every generation computed
+        - optional checkpointer for periodic checkpoints
+        - optional cycle detector and action when a cycle is detected
+        - optional stream of the census of every generation
+    """
+
+    def __init__(self, grid=None, gridSize=DEFAULT_GRID_SIZE, engine=None):
+        if grid is None:
+            grid = np.zeros((gridSize[0], gridSize[1]), dtype=np.uint8)
+        self._gridSize = (grid.shape[0], grid.shape[1])
+        self._engine = engine if engine is not None else DenseEngine()
+        self._engine.load(grid)
+        self._step = 0
+        self._startStep = 0
+        self._population = [self.getPopulation()]
+        self._checkpointer = None
+        self._detector = None
+        self._onCycle = "continue"
+        self._census = None
+
+    def loadPattern(self, pattern):
+        """
+        Restart the simulation from the pattern placed at the center of the grid,
+        the grid is enlarged if the pattern does not fit
+        """
+        self._gridSize = fittingSize(self._gridSize, [pattern])
+        loadPattern(self._engine, pattern, self._gridSize)
+        self._step = 0
+        self._startStep = 0
+        self._population = [self.getPopulation()]
+
+    def restore(self, snapshot: Snapshot):
+        """
+        Restart the simulation from a snapshot, with the rule of the snapshot
+        """
+        self._gridSize = (snapshot.grid.shape[0], snapshot.grid.shape[1])
+        self._engine.setRule(parseRule(snapshot.rule))
+        self._engine.load(snapshot.grid)
+        self._step = snapshot.step
+        self._startStep = snapshot.step
+        self._population = [self.getPopulation()]
+
+    def saveSnapshot(self, path, packed=False, compressed=False):
+        """
+        Save the current state of the simulation
+        """
+        saveSnapshot(path, self.getGrid(), self._step, self.getRule().toString(), packed=packed, compressed=compressed)
+
+    def setCheckpointer(self, checkpointer):
+        self._checkpointer = checkpointer
+
+    def _checkpoint(self):
+        if self._checkpointer is not None and self._checkpointer.isDue(self._step):
+            self._checkpointer.save(self._step, self.getGrid(), self.getRule().toString())
+
+    def setCycleDetector(self, detector, onCycle="stop"):
+        """
+        Detect still lifes and oscillators in the whole state of the engine.
+        When a cycle is detected run stops ("stop"), skips the whole periods
+        until the last generation requested ("skip") or goes on ("continue").
+        The periods are skipped on the grid, so only when the grid is the whole universe:
+        raise ValueError with the expand boundary
+        """
+        if onCycle == "skip" and self._engine.boundary == EXPAND:
+            raise ValueError("The cycles cannot be skipped with the {} boundary, the grid is not the whole universe".format(EXPAND))
+        self._detector = detector
+        self._onCycle = onCycle
+        detector.observeEngine(self._step, self._engine)
+
+    def setCensus(self, stream):
+        """
+        Publish the census (population, births, deaths, bounding box, age histogram) of every generation
+        on the stream, starting from the current one
+        """
+        self._census = stream
+        stream.observe(self._engine, self._step)
+
+    def _observeCensus(self):
+        if self._census is not None:
+            # The population of the generation is already counted
+            self._census.observe(self._engine, self._step, self._population[-1])
+
+    def getCycle(self):
+        return self._detector.getCycle() if self._detector is not None else None
+
+    def _skipCycle(self, cycle, target):
+        """
+        Skip analytically the whole periods of the cycle before the target generation
+        """
+        generations = (target - self._step) // cycle.period * cycle.period
+        if generations <= 0:
+            return
+        self._engine.load(skipAhead(self.getGrid(), cycle.period, generations, self.getRule().states))
+        self._step += generations
+        self._population.append(self.getPopulation())
+        self._checkpoint()
+        self._observeCensus()
+
+    def getRule(self):
+        return self._engine.rule
+
+    def setRule(self, rule):
+        """
+        Set the rule of the evolution, the cells are converted for the new kind of rule
+        """
+        previous = self._engine.rule
+        grid = self.getGrid()
+        self._engine.setRule(rule)
+        converted = convertGrid(grid, previous, rule)
+        if converted is not grid:
+            self._engine.load(converted)
+
+    # Getter method
+
+    def getGrid(self):
+        return self._engine.toGrid()
+
+    def getEngine(self):
+        return self._engine
+
+    def getStep(self):
+        return self._step
+
+    def getPopulation(self):
+        return self._engine.getPopulation()
+
+    def getPopulationHistory(self):
+        return self._population
+
+    def nextStep(self):
+        """
+        Do next step of the game
+        """
+        self._engine.step()
+        self._step += 1
+        self._population.append(self.getPopulation())
+        self._checkpoint()
+        self._observeCensus()
+        if self._detector is not None:
+            self._detector.observeEngine(self._step, self._engine)
+
+    def advance(self, generations):
+        """
+        Advance the given number of generations with a single call to the engine,
+        the population is recorded only at the end (HashLife jumps in 2^k steps)
+        """
+        self._engine.step(generations)
+        self._step += generations
+        self._population.append(self.getPopulation())
+        self._checkpoint()
+        self._observeCensus()
+
+    def run(self, generations):
+        """
+        Run the given number of generations as fast as possible.
+        Return the elapsed time in seconds
+        """
+        start = time.perf_counter()
+        target = self._step + generations
+        while self._step < target:
+            self.nextStep()
+            cycle = self.getCycle()
+            if cycle is not None and self._onCycle == "stop":
+                break
+            if cycle is not None and self._onCycle == "skip":
+                self._skipCycle(cycle, target)
+        return time.perf_counter() - start
+
+    def statistics(self, elapsed=None):
+        """
+        Population statistics of the simulation
+        """
+        population = np.array(self._population)
+        grid = self.getGrid()
+        stats = {
+            "engine": self._engine.name,
+            "rule": self.getRule().toString(),
+            "step": self._step,
+            "generations": self._step - self._startStep,
+            "rows": grid.shape[0],
+            "cols": grid.shape[1],
+            "initial_population": int(population[0]),
+            "final_population": int(population[-1]),
+            "min_population": int(population.min()),
+            "max_population": int(population.max()),
+            "mean_population": float(population.mean()),
+        }
+        cycle = self.getCycle()
+        if cycle is not None:
+            stats["cycle"] = {"period": cycle.period, "start": cycle.start, "detected": cycle.detected}
+        if hasattr(self._engine, "getStatistics"):
+            stats["engine_statistics"] = self._engine.getStatistics()
+        if elapsed is not None:
+            stats["elapsed_seconds"] = elapsed
+            stats["generations_per_second"] = (self._step - self._startStep) / elapsed if elapsed > 0 else None
+        return stats
+
+
+def writeStatistics(path, stats):
+    """
+    Write the statistics of the simulation as JSON
+    """
+    with open(path, 'w') as file:
+        json.dump(stats, file, indent=2)
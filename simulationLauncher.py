@@ -0,0 +1,118 @@
+import argparse
+import json
+import sys
+import time
+
+from engines import ENGINES, createEngine
+from engine import BOUNDARIES
+from patterns import readPattern, writeCells
+from checkpoint import Checkpointer, resume
+from cycle import CycleDetector, DEFAULT_HISTORY
+from census import CensusStream, CensusWriter, DEFAULT_HISTOGRAM_EVERY
+from rules import parseRule
+from snapshot import SNAPSHOT_EXTENSION, loadSnapshot
+from simulation import Simulation, writeStatistics, parseSize, DEFAULT_GRID_SIZE
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Run Game of Life simulations without graphical interface")
+    parser.add_argument("pattern", nargs="?", help="initial configuration (.cells or .rle file) or snapshot to resume (.gol), empty grid if omitted")
+    parser.add_argument("-n", "--generations", type=int, default=100, help="number of generations to run")
+    parser.add_argument("-s", "--size", type=parseSize, default=DEFAULT_GRID_SIZE, help="grid size as ROWSxCOLS")
+    parser.add_argument("-e", "--engine", choices=list(ENGINES), default="dense", help="step engine")
+    parser.add_argument("-r", "--rule", type=parseRule,
+                        help="rule in B/S notation (B36/S23, B2/S/C3) or preset name, the rule of the pattern or snapshot if omitted")
+    parser.add_argument("-b", "--boundary", choices=BOUNDARIES,
+                        help="boundary of the grid: dead border, torus or expanding grid, the default of the engine if omitted")
+    parser.add_argument("-w", "--workers", type=int, help="number of worker processes of the parallel engine")
+    parser.add_argument("-j", "--jump", action="store_true", help="advance all the generations with a single jump")
+    parser.add_argument("-o", "--output", help="file where write the final configuration (.cells)")
+    parser.add_argument("--snapshot", help="file where write the snapshot of the final state (.gol)")
+    parser.add_argument("--packed", action="store_true", help="bit-pack and compress the snapshot")
+    parser.add_argument("--checkpoint-dir", help="directory of the periodic checkpoints")
+    parser.add_argument("--checkpoint-every", type=int, help="generations between two checkpoints")
+    parser.add_argument("--checkpoint-seconds", type=float, help="seconds between two checkpoints")
+    parser.add_argument("--keep", type=int, default=3, help="number of checkpoints kept")
+    parser.add_argument("--resume", action="store_true", help="resume from the latest checkpoint of --checkpoint-dir")
+    parser.add_argument("--on-cycle", choices=["continue", "stop", "skip"],
+                        help="detect still lifes and oscillators and continue, stop or skip the whole periods")
+    parser.add_argument("--cycle-history", type=int, default=DEFAULT_HISTORY, help="generations remembered for the cycle detection")
+    parser.add_argument("--stats", help="file where write the population statistics (JSON), stdout if omitted")
+    parser.add_argument("--census", help="file where stream the census of every generation: population, births, deaths, "
+                                         "bounding box and age histogram (CSV if it ends with .csv, NDJSON otherwise)")
+    parser.add_argument("--histogram-every", type=int, default=DEFAULT_HISTOGRAM_EVERY,
+                        help="generations between two age histograms of the census, 0 for none")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+
+    args = parseArguments(sys.argv[1:])
+
+    # Load the initial configuration
+    options = {"workers": args.workers} if args.engine == "parallel" else {}
+    simulation = Simulation(None, args.size, createEngine(args.engine, **options))
+    if args.boundary:
+        simulation.getEngine().setBoundary(args.boundary)
+    if args.pattern and args.pattern.endswith(SNAPSHOT_EXTENSION):
+        simulation.restore(loadSnapshot(args.pattern))
+    elif args.pattern:
+        pattern = readPattern(args.pattern)
+        simulation.loadPattern(pattern)
+        if pattern.rule and args.rule is None:
+            simulation.setRule(parseRule(pattern.rule))
+
+    # Resume from the latest checkpoint
+    if args.checkpoint_dir and args.resume:
+        snapshot = resume(args.checkpoint_dir)
+        if snapshot is not None:
+            simulation.restore(snapshot)
+
+    # The rule requested replaces the rule of the pattern or of the snapshot
+    if args.rule is not None:
+        simulation.setRule(args.rule)
+
+    # Periodic checkpoints
+    checkpointer = None
+    if args.checkpoint_dir:
+        checkpointer = Checkpointer(args.checkpoint_dir, args.checkpoint_every, args.checkpoint_seconds,
+                                    args.keep, packed=args.packed, compressed=args.packed, startStep=simulation.getStep())
+        simulation.setCheckpointer(checkpointer)
+
+    if args.on_cycle:
+        try:
+            simulation.setCycleDetector(CycleDetector(args.cycle_history, simulation.getRule().states), args.on_cycle)
+        except ValueError as error:
+            sys.exit("simulationLauncher.py: error: {}".format(error))
+
+    # Census of every generation streamed on file
+    censusWriter = None
+    if args.census:
+        censusWriter = CensusWriter(args.census, simulation.getRule())
+        stream = CensusStream(args.histogram_every, history=1)
+        stream.addListener(censusWriter.write)
+        simulation.setCensus(stream)
+
+    # Run the simulation
+    if args.jump:
+        start = time.perf_counter()
+        simulation.advance(args.generations)
+        elapsed = time.perf_counter() - start
+    else:
+        elapsed = simulation.run(args.generations)
+    stats = simulation.statistics(elapsed)
+
+    if checkpointer is not None:
+        checkpointer.close()
+    if censusWriter is not None:
+        censusWriter.close()
+
+    # Write the results
+    if args.output:
+        writeCells(args.output, simulation.getGrid())
+    if args.snapshot:
+        simulation.saveSnapshot(args.snapshot, packed=args.packed, compressed=args.packed)
+    if args.stats:
+        writeStatistics(args.stats, stats)
+    else:
+        print(json.dumps(stats, indent=2))
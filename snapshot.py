@@ -0,0 +1,98 @@
+import struct
+import zlib
+import numpy as np
+
+# Extension of the snapshot files
+SNAPSHOT_EXTENSION = ".gol"
+
+MAGIC = b"GOLSNAP\0"
+VERSION = 1
+
+# Flags of the payload
+PACKED = 1
+COMPRESSED = 2
+
+# Fixed size header: magic, version, flags, rule length, rows, cols, step, payload size, rule.
+# The payload starts at HEADER_SIZE so that it can be memory-mapped
+_HEADER = struct.Struct("<8sHHHxxQQQQ")
+HEADER_SIZE = 128
+MAX_RULE = HEADER_SIZE - _HEADER.size
+
+DEFAULT_RULE = "B3/S23"
+
+
+class Snapshot:
+    """
+        State of a simulation saved on file
+        Composed by:
+        - age grid
+        - number of step of simulation
+        - rule of the simulation
+    """
+
+    def __init__(self, grid, step=0, rule=DEFAULT_RULE):
+        self.grid = grid
+        self.step = step
+        self.rule = rule
+
+
+def saveSnapshot(path, grid, step=0, rule=DEFAULT_RULE, packed=False, compressed=False):
+    """
+    Save the state of a simulation with a bulk write of the grid.
+    If packed the alive cells are stored as bits followed by the ages of the alive cells only,
+    if compressed the payload is compressed with zlib
+    """
+    grid = np.ascontiguousarray(grid, dtype=np.uint8)
+    ruleBytes = rule.encode("ascii")
+    if len(ruleBytes) > MAX_RULE:
+        raise ValueError("Rule '{}' is too long for the snapshot header".format(rule))
+
+    if packed:
+        alive = grid > 0
+        payload = np.packbits(alive, axis=None).tobytes() + grid[alive].tobytes()
+    else:
+        # Flat view, its length is the number of bytes
+        payload = grid.reshape(-1).data
+    if compressed:
+        payload = zlib.compress(payload, 1)
+
+    flags = (PACKED if packed else 0) | (COMPRESSED if compressed else 0)
+    header = _HEADER.pack(MAGIC, VERSION, flags, len(ruleBytes), grid.shape[0], grid.shape[1], step, len(payload))
+    header = (header + ruleBytes).ljust(HEADER_SIZE, b"\0")
+    with open(path, "wb") as file:
+        file.write(header)
+        file.write(payload)
+
+
+def loadSnapshot(path, mmap=True):
+    """
+    Load the state of a simulation. The grid of a plain snapshot is memory-mapped
+    copy-on-write (zero copy) if mmap is True
+    """
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or not header.startswith(MAGIC):
+            raise ValueError("File {} is not a snapshot".format(path))
+        magic, version, flags, ruleLength, rows, cols, step, size = _HEADER.unpack_from(header)
+        if version != VERSION:
+            raise ValueError("Unsupported snapshot version {}".format(version))
+        rule = header[_HEADER.size:_HEADER.size + ruleLength].decode("ascii")
+
+        if not flags and mmap:
+            grid = np.memmap(path, dtype=np.uint8, mode="c", offset=HEADER_SIZE, shape=(rows, cols))
+            return Snapshot(grid, step, rule)
+
+        # The size of the plain grid is known, also in the snapshots that stored the number of rows as size
+        payload = file.read(size if flags else rows * cols)
+
+    if flags & COMPRESSED:
+        payload = zlib.decompress(payload)
+    if flags & PACKED:
+        bits = (rows * cols + 7) // 8
+        alive = np.unpackbits(np.frombuffer(payload, dtype=np.uint8, count=bits), count=rows * cols).astype(bool)
+        grid = np.zeros(rows * cols, dtype=np.uint8)
+        grid[alive] = np.frombuffer(payload, dtype=np.uint8, offset=bits)
+        grid = grid.reshape(rows, cols)
+    else:
+        grid = np.frombuffer(payload, dtype=np.uint8).reshape(rows, cols).copy()
+    return Snapshot(grid, step, rule)
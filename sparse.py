@@ -0,0 +1,194 @@
+import numpy as np
+
+from engine import MAX_AGE, DEAD, TORUS, EXPAND, BOUNDARIES, checkBoundary
+from rules import CONWAY, COUNTS
+from cycle import arraysHash
+from census import ageHistogram
+
+# Coordinates are packed in a single positive int64 key: (row + OFFSET) << 32 | (col + OFFSET),
+# so rows and cols can range in [-2^30, 2^30)
+_OFFSET = 1 << 30
+_ROW = 1 << 32
+
+# Key offsets of the 8 neighbors of a cell
+_NEIGHBORS = np.array([dr * _ROW + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc], dtype=np.int64)
+
+
+def _encode(rows, cols):
+    return ((np.asarray(rows, dtype=np.int64) + _OFFSET) << 32) | (np.asarray(cols, dtype=np.int64) + _OFFSET)
+
+
+def _decode(keys):
+    return (keys >> 32) - _OFFSET, (keys & (_ROW - 1)) - _OFFSET
+
+
+class SparseEngine:
+    """
+        Step engine that stores only the live cells
+        Composed by:
+        - sorted keys of the live cells coordinates
+        - age of every live cell
+        - cells born in the last generation, counted in the step
+        - window (rows, cols) returned by toGrid
+        - rule of the evolution, Life-like without B0 (the dead cells far from
+          the live ones are never evaluated)
+        - boundary mode of the window
+
+        Only the live cells and their neighbors are evaluated at each generation,
+        so memory and step time scale with the population and not with the area.
+        With the expand boundary the universe is unbounded and the cells outside the
+        window keep evolving, with the dead boundary the window has a dead border like
+        the dense engine, with the torus boundary the coordinates wrap around the window.
+    """
+
+    name = "sparse"
+    boundaries = BOUNDARIES
+
+    def __init__(self, rule=CONWAY, boundary=EXPAND):
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._ages = np.zeros(0, dtype=np.uint8)
+        self._births = None
+        self._shape = (0, 0)
+        self.setRule(rule)
+        self.setBoundary(boundary)
+
+    def setRule(self, rule):
+        if not rule.isLifeLike() or rule.hasBirthWithoutNeighbors():
+            raise ValueError("The {} engine supports only Life-like rules without B0, not {}".format(self.name, rule))
+        self.rule = rule
+
+    def setBoundary(self, boundary):
+        checkBoundary(self, boundary, self.rule)
+        self.boundary = boundary
+
+    def load(self, grid):
+        """
+        Load the live cells from an age grid, the grid shape becomes the window
+        """
+        grid = np.asarray(grid)
+        rows, cols = np.nonzero(grid)
+        self._shape = grid.shape
+        self._keys = _encode(rows, cols)
+        self._ages = grid[rows, cols].astype(np.uint8)
+        self._births = None
+
+    def setCells(self, rows, cols, ages=None, shape=None):
+        """
+        Load the live cells from their coordinates
+        """
+        keys = _encode(rows, cols)
+        ages = np.ones(keys.size, dtype=np.uint8) if ages is None else np.asarray(ages, dtype=np.uint8)
+        order = np.argsort(keys, kind='stable')
+        self._keys, first = np.unique(keys[order], return_index=True)
+        self._ages = ages[order][first]
+        self._births = None
+        if shape is not None:
+            self._shape = tuple(shape)
+
+    def getCells(self):
+        """
+        Return rows, cols and ages of the live cells
+        """
+        rows, cols = _decode(self._keys)
+        return rows, cols, self._ages
+
+    def step(self, generations=1):
+        """
+        Advance the given number of generations
+        """
+        for _ in range(generations):
+            if self._keys.size == 0:
+                self._births = 0
+                break
+            self._nextGeneration()
+
+    def _nextGeneration(self):
+        keys = self._keys
+
+        # Every neighbor of a live cell is a candidate, counted once per live neighbor
+        candidates = (keys[None, :] + _NEIGHBORS[:, None]).ravel()
+        isolated = 0 in self.rule.survival
+        if isolated:
+            # The live cells without live neighbors are candidates too
+            candidates = np.concatenate((candidates, keys))
+        if self.boundary == DEAD:
+            rows, cols = _decode(candidates)
+            inside = (rows >= 0) & (rows < self._shape[0]) & (cols >= 0) & (cols < self._shape[1])
+            candidates = candidates[inside]
+        elif self.boundary == TORUS:
+            rows, cols = _decode(candidates)
+            candidates = _encode(rows % self._shape[0], cols % self._shape[1])
+        candidates, count = np.unique(candidates, return_counts=True)
+
+        # Find the candidates that are alive
+        index = np.searchsorted(keys, candidates)
+        index[index == keys.size] = 0
+        alive = keys[index] == candidates
+        if isolated:
+            count -= alive
+
+        # 0 dead, 1 born, 2 survived
+        code = self.rule.table.take(alive * COUNTS + count)
+        keep = code > 0
+
+        # The age of the survivors is incremented until the saturation
+        ages = self._ages[index[keep]]
+        ages = np.where(code[keep] == 2, ages + (ages < MAX_AGE), 1).astype(np.uint8)
+
+        self._keys = candidates[keep]
+        self._ages = ages
+        self._births = int(np.count_nonzero(code == 1))
+
+    def toGrid(self):
+        """
+        Return the age grid of the window
+        """
+        return self.getWindow(0, 0, self._shape[0], self._shape[1])
+
+    def getWindow(self, top, left, bottom, right):
+        """
+        Return the age grid of the cells in the rows [top, bottom) and the columns [left, right),
+        only the keys of the rows of the window are decoded
+        """
+        grid = np.zeros((bottom - top, right - left), dtype=np.uint8)
+        # The keys are sorted by row
+        first, last = np.searchsorted(self._keys, _encode([top, bottom], [-_OFFSET, -_OFFSET]))
+        rows, cols = _decode(self._keys[first:last])
+        inside = (cols >= left) & (cols < right)
+        grid[rows[inside] - top, cols[inside] - left] = self._ages[first:last][inside]
+        return grid
+
+    def getShape(self):
+        return self._shape
+
+    def getPopulation(self):
+        return int(self._keys.size)
+
+    def getBirths(self):
+        """
+        Number of cells born in the last generation in the whole universe, None before the first one
+        """
+        return self._births
+
+    def getBoundingBox(self):
+        """
+        Box (top, left, bottom, right) of all the live cells, also the ones outside the window, None if empty.
+        The keys are sorted by row, only the columns are decoded
+        """
+        if self._keys.size == 0:
+            return None
+        cols = (self._keys & (_ROW - 1)) - _OFFSET
+        top, bottom = (self._keys[[0, -1]] >> 32) - _OFFSET
+        return int(top), int(cols.min()), int(bottom) + 1, int(cols.max()) + 1
+
+    def getAgeHistogram(self):
+        """
+        Histogram of the ages of all the live cells, read from the ages of the keys
+        """
+        return ageHistogram(self._ages, self.rule, int(self._keys.size))
+
+    def getStateHash(self):
+        """
+        Hash of the sorted keys of all the live cells, also the ones outside the window
+        """
+        return arraysHash(self._keys)
@@ -0,0 +1,43 @@
+import numpy as np
+from engine import MAX_AGE, TORUS
+
+# Offsets of the eight neighbors of a cell
+NEIGHBORS = [(rows, cols) for rows in (-1, 0, 1) for cols in (-1, 0, 1) if (rows, cols) != (0, 0)]
+
+
+def randomGrid(rows, cols, density=0.35, seed=0):
+    return (np.random.default_rng(seed).random((rows, cols)) < density).astype(np.uint8)
+
+
+def referenceStep(grid, rule, boundary):
+    """
+    Next generation computed cell by cell, as written in the rule: the ages of the Life-like rules,
+    the states of the Generations rules. Only the torus wraps, the cells outside the grid are dead
+    """
+    rows, cols = grid.shape
+    result = np.zeros_like(grid)
+    for row in range(rows):
+        for col in range(cols):
+            count = 0
+            for rowOffset, colOffset in NEIGHBORS:
+                neighborRow, neighborCol = row + rowOffset, col + colOffset
+                if boundary == TORUS:
+                    neighborRow, neighborCol = neighborRow % rows, neighborCol % cols
+                elif not (0 <= neighborRow < rows and 0 <= neighborCol < cols):
+                    continue
+                state = grid[neighborRow, neighborCol]
+                count += state == 1 if not rule.isLifeLike() else state > 0
+            result[row, col] = _nextState(int(grid[row, col]), count, rule)
+    return result
+
+
+def _nextState(state, count, rule):
+    if rule.isLifeLike():
+        if state > 0:
+            return min(state + 1, MAX_AGE) if count in rule.survival else 0
+        return 1 if count in rule.birth else 0
+    if state == 0:
+        return 1 if count in rule.birth else 0
+    if state == 1:
+        return 1 if count in rule.survival else (2 if rule.states > 2 else 0)
+    return state + 1 if state + 1 < rule.states else 0
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from census import CensusStream
+from engine import EXPAND
+from engines import createEngine
+from reference import randomGrid
+
+
+def censuses(engine, grid, generations=12):
+    stream = CensusStream(histogramEvery=1)
+    engine.load(grid)
+    result = [stream.observe(engine, 0)]
+    for generation in range(1, generations + 1):
+        engine.step()
+        result.append(stream.observe(engine, generation))
+    return result
+
+
+def summary(census):
+    return census.population, census.births, census.deaths, census.box, census.histogram
+
+
+@pytest.mark.parametrize("name", ["sparse", "bitpacked", "parallel", "tiled"])
+def test_counts_of_the_engine_match_dense(name):
+    # The engines that count births, box and histogram themselves, with a dead border like the dense engine
+    grid = randomGrid(20, 24, seed=6)
+    engine = createEngine(name, **({"workers": 2, "tiles": 3} if name == "parallel" else {}))
+    try:
+        engine.setBoundary("dead")
+        expected = [summary(census) for census in censuses(createEngine("dense"), grid)]
+        assert [summary(census) for census in censuses(engine, grid)] == expected
+    finally:
+        if hasattr(engine, "close"):
+            engine.close()
+
+
+@pytest.mark.parametrize("name", ["sparse", "hashlife"])
+def test_cells_outside_the_window_are_counted(name):
+    # A glider crosses the window, the counts are the ones of the whole universe or unknown
+    grid = np.zeros((10, 10), dtype=np.uint8)
+    grid[0, 1] = grid[1, 2] = grid[2, 0] = grid[2, 1] = grid[2, 2] = 1
+    dense = createEngine("dense")
+    dense.setBoundary(EXPAND)
+    for census, expected in zip(censuses(createEngine(name), grid, 60), censuses(dense, grid, 60)):
+        assert census.population == expected.population == 5
+        assert census.box == expected.box
+        if census.births is not None:
+            assert (census.births, census.deaths) == (expected.births, expected.deaths)
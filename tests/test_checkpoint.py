@@ -0,0 +1,67 @@
+import os
+import time
+import numpy as np
+from checkpoint import Checkpointer, checkpointPaths, resume
+from reference import randomGrid
+
+
+def waitWritten(checkpointer, written, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while checkpointer.getWritten() < written and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return checkpointer.getWritten() >= written
+
+
+def test_checkpoints_due_every_generations(tmp_path):
+    checkpointer = Checkpointer(str(tmp_path), everyGenerations=10)
+    try:
+        assert not checkpointer.isDue(9)
+        assert checkpointer.isDue(10)
+        checkpointer.save(10, randomGrid(4, 4))
+        assert not checkpointer.isDue(19)
+        # Restarted from a previous step, the period starts again
+        assert not checkpointer.isDue(3)
+        assert checkpointer.isDue(13)
+    finally:
+        checkpointer.close()
+
+
+def test_resume_latest_checkpoint(tmp_path):
+    checkpointer = Checkpointer(str(tmp_path), everyGenerations=1, keep=2, packed=True, compressed=True)
+    grids = {step: randomGrid(6, 7, seed=step) for step in (1, 2, 3)}
+    for written, step in enumerate(grids, 1):
+        checkpointer.save(step, grids[step], "B36/S23")
+        assert waitWritten(checkpointer, written)
+    checkpointer.close()
+    assert len(checkpointPaths(str(tmp_path))) == 2
+    snapshot = resume(str(tmp_path))
+    assert (snapshot.step, snapshot.rule) == (3, "B36/S23")
+    assert np.array_equal(np.asarray(snapshot.grid), grids[3])
+
+
+def test_checkpoint_after_restart_is_kept(tmp_path):
+    checkpointer = Checkpointer(str(tmp_path), keep=1)
+    checkpointer.save(100, randomGrid(4, 4))
+    assert waitWritten(checkpointer, 1)
+    # The modification times of the files differ even on coarse clocks
+    time.sleep(0.05)
+    checkpointer.save(20, randomGrid(4, 4, seed=1))
+    assert waitWritten(checkpointer, 2)
+    checkpointer.close()
+    assert [os.path.basename(path) for path in checkpointPaths(str(tmp_path))] == ["checkpoint-000000000020.gol"]
+    assert resume(str(tmp_path)).step == 20
+
+
+def test_failed_checkpoint_does_not_stop_the_next_ones(tmp_path):
+    checkpointer = Checkpointer(str(tmp_path))
+    # The rule does not fit in the header of the snapshot
+    checkpointer.save(1, randomGrid(4, 4), "B" * 200)
+    # Taken by the thread before the next one, that would replace it
+    time.sleep(0.1)
+    checkpointer.save(2, randomGrid(4, 4))
+    assert waitWritten(checkpointer, 1)
+    start = time.monotonic()
+    checkpointer.close()
+    assert time.monotonic() - start < 5
+    assert resume(str(tmp_path)).step == 2
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".tmp")]
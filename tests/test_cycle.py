@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from cycle import CycleDetector, stateHash
+from engine import DenseEngine, EXPAND, TORUS, nextGeneration
+from engines import createEngine
+from simulation import Simulation
+from sparse import SparseEngine
+
+
+def blinkerAndBlock():
+    grid = np.zeros((12, 12), dtype=np.uint8)
+    grid[2, 1:4] = 1
+    grid[7:9, 7:9] = 1
+    return grid
+
+
+def test_oscillator_period():
+    detector = CycleDetector()
+    grid = blinkerAndBlock()
+    cycle = None
+    for generation in range(5):
+        cycle = detector.observe(generation, grid) or cycle
+        grid = nextGeneration(grid)
+    assert (cycle.period, cycle.start, cycle.detected) == (2, 0, 2)
+
+
+def test_ages_are_not_part_of_the_state():
+    grid = blinkerAndBlock()
+    assert stateHash(grid) == stateHash(grid * 7)
+    assert stateHash(grid) != stateHash(nextGeneration(grid))
+
+
+def test_glider_on_torus_repeats():
+    # A glider is back in its cells after crossing the whole torus
+    engine = DenseEngine(boundary=TORUS)
+    grid = np.zeros((8, 8), dtype=np.uint8)
+    grid[0, 1] = grid[1, 2] = grid[2, 0] = grid[2, 1] = grid[2, 2] = 1
+    engine.load(grid)
+    detector = CycleDetector()
+    detector.observe(0, engine.toGrid())
+    cycle = None
+    for generation in range(1, 40):
+        engine.step()
+        cycle = detector.observe(generation, engine.toGrid())
+        if cycle is not None:
+            break
+    assert (cycle.period, cycle.start) == (32, 0)
+
+
+@pytest.mark.parametrize("name", ["dense", "sparse", "hashlife", "bitpacked", "parallel", "tiled"])
+def test_engine_state_period(name):
+    engine = createEngine(name, **({"workers": 2} if name == "parallel" else {}))
+    try:
+        engine.load(blinkerAndBlock())
+        detector = CycleDetector()
+        detector.observeEngine(0, engine)
+        cycle = None
+        for generation in range(1, 5):
+            engine.step()
+            cycle = detector.observeEngine(generation, engine) or cycle
+        assert (cycle.period, cycle.start, cycle.detected) == (2, 0, 2)
+    finally:
+        if hasattr(engine, "close"):
+            engine.close()
+
+
+@pytest.mark.parametrize("name", ["sparse", "hashlife"])
+def test_glider_leaving_the_window_is_no_cycle(name):
+    # The window is empty after the glider left it, the cells outside it are part of the state
+    grid = np.zeros((10, 10), dtype=np.uint8)
+    grid[0, 1] = grid[1, 2] = grid[2, 0] = grid[2, 1] = grid[2, 2] = 1
+    simulation = Simulation(grid, engine=createEngine(name))
+    simulation.setCycleDetector(CycleDetector(), onCycle="stop")
+    simulation.run(100)
+    assert simulation.getStep() == 100
+    assert simulation.getCycle() is None
+    assert simulation.getPopulation() == 5
+
+
+def test_run_stops_on_cycle():
+    simulation = Simulation(blinkerAndBlock())
+    simulation.setCycleDetector(CycleDetector(), onCycle="stop")
+    simulation.run(100)
+    assert simulation.getStep() == 2
+    assert simulation.getCycle().period == 2
+
+
+@pytest.mark.parametrize("generations", [7, 1001])
+def test_skip_matches_every_generation(generations):
+    # Ages included, the oldest cells reach the maximum age before the last generation
+    skipping = Simulation(blinkerAndBlock())
+    skipping.setCycleDetector(CycleDetector(), onCycle="skip")
+    skipping.run(generations)
+    stepping = Simulation(blinkerAndBlock())
+    stepping.run(generations)
+    assert skipping.getStep() == stepping.getStep() == generations
+    assert np.array_equal(skipping.getGrid(), stepping.getGrid())
+    assert skipping.getPopulation() == stepping.getPopulation()
+
+
+def test_skip_refused_when_the_grid_is_a_window():
+    simulation = Simulation(blinkerAndBlock(), engine=SparseEngine(boundary=EXPAND))
+    with pytest.raises(ValueError):
+        simulation.setCycleDetector(CycleDetector(), onCycle="skip")
@@ -0,0 +1,220 @@
+import numpy as np
+import pytest
+from engine import DEAD, EXPAND, TORUS, engineOrigin, engineShape, engineWindow
+from engines import createEngine
+from rules import CONWAY, parseRule
+from reference import randomGrid, referenceStep
+
+# Generations compared with the reference, the expanding grids never reach the margin of the reference
+GENERATIONS = 12
+MARGIN = GENERATIONS + 1
+
+# Step engines and the boundary modes checked against the reference
+CASES = [
+    ("dense", DEAD),
+    ("dense", TORUS),
+    ("dense", EXPAND),
+    ("sparse", DEAD),
+    ("sparse", TORUS),
+    ("sparse", EXPAND),
+    ("hashlife", EXPAND),
+    ("bitpacked", DEAD),
+    ("bitpacked", TORUS),
+    ("parallel", DEAD),
+    ("parallel", TORUS),
+    ("tiled", DEAD),
+    ("tiled", EXPAND),
+]
+
+# Options of the engines, the seams of the tiles of the parallel and tiled engines are crossed by the cells
+OPTIONS = {"parallel": {"workers": 2, "tiles": 3}, "tiled": {"tileSize": 8}}
+
+
+# Rules checked against the reference in the engines that support them, with their default boundary
+LIFE_LIKE_RULES = ["B36/S23", "B3678/S34678"]
+GENERATIONS_RULES = ["B2/S/C3", "B2/S345/C4"]
+RULE_CASES = ([("dense", rule) for rule in LIFE_LIKE_RULES + GENERATIONS_RULES + ["B03/S23"]]
+              + [("sparse", rule) for rule in LIFE_LIKE_RULES]
+              + [("hashlife", rule) for rule in LIFE_LIKE_RULES]
+              + [("bitpacked", rule) for rule in LIFE_LIKE_RULES + ["B03/S23"]]
+              + [("parallel", rule) for rule in LIFE_LIKE_RULES + GENERATIONS_RULES + ["B03/S23"]]
+              + [("tiled", rule) for rule in LIFE_LIKE_RULES + GENERATIONS_RULES])
+
+
+@pytest.fixture(params=CASES, ids=["-".join(case) for case in CASES])
+def engine(request):
+    name, boundary = request.param
+    engine = createEngine(name, **OPTIONS.get(name, {}))
+    engine.setBoundary(boundary)
+    yield engine
+    if hasattr(engine, "close"):
+        engine.close()
+
+
+def referenceGrid(grid, boundary):
+    """
+    Grid of the reference for the grid loaded, with a dead margin around it for the expanding grids
+    """
+    return np.pad(grid, MARGIN) if boundary == EXPAND else grid.copy()
+
+
+def expectedGrid(reference, engine):
+    """
+    Cells of the reference at the positions of the grid of the engine, that can be moved by the origin
+    or be a window of a larger universe
+    """
+    grid = np.asarray(engine.toGrid())
+    if engine.boundary != EXPAND:
+        return reference
+    row, col = engineOrigin(engine)
+    top, left = row - MARGIN, col - MARGIN
+    expected = np.zeros_like(grid)
+    rows = slice(max(top, 0), min(top + reference.shape[0], grid.shape[0]))
+    cols = slice(max(left, 0), min(left + reference.shape[1], grid.shape[1]))
+    expected[rows, cols] = reference[rows.start - top:rows.stop - top, cols.start - left:cols.stop - left]
+    return expected
+
+
+def referenceBoundary(boundary):
+    # The margin of the reference is dead, the cells never reach its border
+    return DEAD if boundary == EXPAND else boundary
+
+
+def test_generations_match_reference(engine):
+    grid = randomGrid(20, 24)
+    engine.load(grid)
+    reference = referenceGrid(grid, engine.boundary)
+    for generation in range(1, GENERATIONS + 1):
+        engine.step()
+        reference = referenceStep(reference, CONWAY, referenceBoundary(engine.boundary))
+        assert np.array_equal(np.asarray(engine.toGrid()), expectedGrid(reference, engine)), generation
+        assert engine.getPopulation() == np.count_nonzero(reference), generation
+
+
+def test_generations_at_once_match_reference(engine):
+    grid = randomGrid(20, 24, seed=1)
+    engine.load(grid)
+    engine.step(GENERATIONS)
+    reference = referenceGrid(grid, engine.boundary)
+    for _ in range(GENERATIONS):
+        reference = referenceStep(reference, CONWAY, referenceBoundary(engine.boundary))
+    assert np.array_equal(np.asarray(engine.toGrid()) > 0, expectedGrid(reference, engine) > 0)
+    assert engine.getPopulation() == np.count_nonzero(reference)
+
+
+def test_window_matches_grid(engine):
+    # The part of the grid read for the viewport, without building the whole grid in the engines that can
+    engine.load(randomGrid(20, 24, seed=5))
+    for _ in range(4):
+        engine.step()
+        grid = np.asarray(engine.toGrid())
+        assert engineShape(engine) == grid.shape
+        rows, cols = grid.shape
+        for top, left, bottom, right in [(0, 0, rows, cols), (3, 5, 11, 17), (rows - 2, 0, rows, cols)]:
+            window = np.asarray(engineWindow(engine, top, left, bottom, right))
+            assert np.array_equal(window, grid[top:bottom, left:right]), (top, left, bottom, right)
+
+
+def test_empty_grid_stays_empty(engine):
+    engine.load(np.zeros((8, 8), dtype=np.uint8))
+    engine.step(3)
+    assert engine.getPopulation() == 0
+    assert not np.asarray(engine.toGrid()).any()
+
+
+def test_cells_outside_the_window_are_kept():
+    # A glider leaves the window of the sparse engine and is still counted in the population
+    engine = createEngine("sparse")
+    glider = np.zeros((8, 8), dtype=np.uint8)
+    glider[0, 1] = glider[1, 2] = glider[2, 0] = glider[2, 1] = glider[2, 2] = 1
+    engine.load(glider)
+    engine.step(40)
+    assert not np.asarray(engine.toGrid()).any()
+    assert engine.getPopulation() == 5
+
+
+def test_hashlife_jump_matches_single_steps():
+    # A jump of many generations (in steps of 2^k) ends in the same cells of the generations one at a time
+    grid = randomGrid(16, 16, seed=2)
+    jumping, stepping = createEngine("hashlife"), createEngine("hashlife")
+    jumping.load(grid)
+    stepping.load(grid)
+    jumping.step(100)
+    for _ in range(100):
+        stepping.step()
+    assert jumping.getPopulation() == stepping.getPopulation()
+    assert np.array_equal(np.asarray(jumping.toGrid()) > 0, np.asarray(stepping.toGrid()) > 0)
+
+
+def test_bitpacked_rows_of_many_words():
+    # The neighbors cross the 64 bit words of the rows
+    engine = createEngine("bitpacked")
+    grid = randomGrid(10, 130, seed=3)
+    engine.load(grid)
+    reference = grid.copy()
+    for generation in range(1, 5):
+        engine.step()
+        reference = referenceStep(reference, CONWAY, DEAD)
+        assert np.array_equal(np.asarray(engine.toGrid()), reference), generation
+
+
+@pytest.mark.parametrize("name, text", RULE_CASES, ids=["-".join(case) for case in RULE_CASES])
+def test_rules_match_reference(name, text):
+    rule = parseRule(text)
+    engine = createEngine(name, **OPTIONS.get(name, {}))
+    try:
+        engine.setRule(rule)
+        # The Generations rules start from alive cells, the dying states come from the evolution
+        grid = randomGrid(16, 18, seed=4)
+        engine.load(grid)
+        reference = referenceGrid(grid, engine.boundary)
+        for generation in range(1, GENERATIONS + 1):
+            engine.step()
+            reference = referenceStep(reference, rule, referenceBoundary(engine.boundary))
+            assert np.array_equal(np.asarray(engine.toGrid()), expectedGrid(reference, engine)), generation
+    finally:
+        if hasattr(engine, "close"):
+            engine.close()
+
+
+def test_rule_rejected_by_the_engine():
+    engine = createEngine("bitpacked")
+    with pytest.raises(ValueError):
+        engine.setRule(parseRule("B2/S/C3"))
+    assert engine.rule == CONWAY
+
+
+@pytest.mark.parametrize("name", ["dense", "tiled"])
+def test_expanding_grid_keeps_every_cell(name):
+    # A glider moving to the top left grows the grid, the origin follows the cells loaded
+    engine = createEngine(name, **OPTIONS.get(name, {}))
+    engine.setBoundary(EXPAND)
+    glider = np.zeros((6, 6), dtype=np.uint8)
+    glider[1, 1:4] = 1
+    glider[2, 1] = glider[3, 2] = 1
+    engine.load(glider)
+    engine.step(60)
+    grid = np.asarray(engine.toGrid())
+    row, col = engineOrigin(engine)
+    assert np.count_nonzero(grid) == engine.getPopulation() == 5
+    assert row > 0 and col > 0
+    # The glider moved of a cell every 4 generations
+    cells = np.argwhere(grid > 0) - (row, col)
+    assert cells.min(axis=0).tolist() == [1 - 15, 1 - 15]
+
+
+@pytest.mark.parametrize("name, boundary", [("bitpacked", EXPAND), ("hashlife", DEAD), ("hashlife", TORUS),
+                                            ("tiled", TORUS)])
+def test_boundary_rejected_by_the_engine(name, boundary):
+    engine = createEngine(name)
+    previous = engine.boundary
+    with pytest.raises(ValueError):
+        engine.setBoundary(boundary)
+    assert engine.boundary == previous
+
+
+def test_birth_without_neighbors_cannot_expand():
+    engine = createEngine("dense")
+    engine.setRule(parseRule("B03/S23"))
+    with pytest.raises(ValueError):
+        engine.setBoundary(EXPAND)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from engine import EXPAND
+from engines import createEngine
+from model import GolModel
+
+
+def glider(shape):
+    grid = np.zeros(shape, dtype=np.uint8)
+    grid[0, 1] = grid[1, 2] = grid[2, 0] = grid[2, 1] = grid[2, 2] = 1
+    return grid
+
+
+@pytest.fixture(params=["sparse", "hashlife"])
+def model(request):
+    # A glider that left the grid, the engine keeps it outside the window
+    model = GolModel()
+    model.setEngine(createEngine(request.param))
+    model.setBoundary(EXPAND)
+    model.setGrid(glider((10, 10)))
+    model.advance(40)
+    assert model.getPopulation() == 5
+    assert not model.getGrid().any()
+    return model
+
+
+def test_changed_cell_keeps_cells_outside(model):
+    model.changeStateCell(0, 0)
+    model.advance()
+    # The single cell dies, the glider goes on outside the grid
+    assert model.getPopulation() == 5
+
+
+def test_resized_grid_keeps_cells_outside(model):
+    model.resizeGrid(40, 40)
+    # The glider enters the larger grid at the center
+    assert model.getPopulation() == np.count_nonzero(model.getGrid()) == 5
+    model.advance(4)
+    assert model.getPopulation() == 5
+
+
+def test_cleared_grid_drops_cells_outside(model):
+    model.clearGrid()
+    model.advance()
+    assert model.getPopulation() == 0
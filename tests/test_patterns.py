@@ -0,0 +1,48 @@
+import numpy as np
+import patterns
+from patterns import gridFromPattern, readPattern, writeCells, writeRle
+from reference import randomGrid
+
+
+def test_cells_round_trip(tmp_path):
+    grid = randomGrid(17, 23)
+    path = tmp_path / "soup.cells"
+    writeCells(path, grid, name="soup")
+    pattern = readPattern(path)
+    assert (pattern.height, pattern.width, pattern.name) == (17, 23, "soup")
+    assert np.array_equal(gridFromPattern(pattern, grid.shape), grid)
+
+
+def test_rle_round_trip(tmp_path):
+    grid = randomGrid(17, 23, seed=1)
+    path = tmp_path / "soup.rle"
+    writeRle(path, grid, name="soup", rule="B36/S23")
+    pattern = readPattern(path)
+    assert (pattern.height, pattern.width, pattern.name, pattern.rule) == (17, 23, "soup", "B36/S23")
+    assert np.array_equal(gridFromPattern(pattern, grid.shape), grid)
+
+
+def test_rle_round_trip_in_small_chunks(tmp_path, monkeypatch):
+    # The run counts and the lines are split between the chunks decoded
+    monkeypatch.setattr(patterns, "CHUNK_SIZE", 3)
+    grid = np.zeros((5, 40), dtype=np.uint8)
+    grid[0, 2:37] = grid[2, :] = grid[4, 13] = 1
+    path = tmp_path / "lines.rle"
+    writeRle(path, grid)
+    assert np.array_equal(gridFromPattern(readPattern(path), grid.shape), grid)
+
+
+def test_rle_glider(tmp_path):
+    path = tmp_path / "glider.rle"
+    path.write_text("#N Glider\n#C comment\nx = 3, y = 3, rule = B3/S23\nbob$2bo$3o!\n")
+    pattern = readPattern(path)
+    assert (pattern.height, pattern.width, pattern.name, pattern.rule) == (3, 3, "Glider", "B3/S23")
+    assert sorted(zip(pattern.rows.tolist(), pattern.cols.tolist())) == [(0, 1), (1, 2), (2, 0), (2, 1), (2, 2)]
+
+
+def test_cells_glider(tmp_path):
+    path = tmp_path / "glider.cells"
+    path.write_text("!Name: Glider\n!\n.O\n..O\nOOO\n")
+    pattern = readPattern(path)
+    assert (pattern.height, pattern.width, pattern.name) == (3, 3, "Glider")
+    assert sorted(zip(pattern.rows.tolist(), pattern.cols.tolist())) == [(0, 1), (1, 2), (2, 0), (2, 1), (2, 2)]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from snapshot import loadSnapshot, saveSnapshot
+from reference import randomGrid
+
+
+def agedGrid(rows, cols, seed=0):
+    # Alive cells of every age, up to the oldest
+    grid = randomGrid(rows, cols, seed=seed)
+    ages = np.random.default_rng(seed).integers(1, 256, size=grid.shape)
+    return (grid * ages).astype(np.uint8)
+
+
+@pytest.mark.parametrize("packed", [False, True], ids=["plain", "packed"])
+@pytest.mark.parametrize("compressed", [False, True], ids=["raw", "compressed"])
+def test_snapshot_round_trip(tmp_path, packed, compressed):
+    # 13 columns: the bits of the packed grid do not end with a whole byte
+    grid = agedGrid(11, 13)
+    path = tmp_path / "state.gol"
+    saveSnapshot(path, grid, step=123456789, rule="B2/S/C3", packed=packed, compressed=compressed)
+    snapshot = loadSnapshot(path)
+    assert (snapshot.step, snapshot.rule) == (123456789, "B2/S/C3")
+    assert snapshot.grid.shape == grid.shape
+    assert np.array_equal(np.asarray(snapshot.grid), grid)
+
+
+def test_plain_snapshot_is_memory_mapped_copy_on_write(tmp_path):
+    grid = agedGrid(8, 8)
+    path = tmp_path / "state.gol"
+    saveSnapshot(path, grid)
+    snapshot = loadSnapshot(path)
+    assert isinstance(snapshot.grid, np.memmap)
+    snapshot.grid[:] = 0
+    assert np.array_equal(np.asarray(loadSnapshot(path, mmap=False).grid), grid)
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "grid.cells"
+    path.write_text("!Name: empty\n")
+    with pytest.raises(ValueError):
+        loadSnapshot(path)
+
+
+def test_rule_too_long(tmp_path):
+    with pytest.raises(ValueError):
+        saveSnapshot(tmp_path / "state.gol", np.zeros((2, 2), dtype=np.uint8), rule="B" * 200)
@@ -0,0 +1,28 @@
+import time
+import numpy as np
+import pytest
+from census import CensusStream
+from cycle import CycleDetector
+from engines import createEngine
+from reference import randomGrid
+from worker import SimulationWorker
+
+
+@pytest.mark.parametrize("name", ["sparse", "hashlife"])
+def test_loop_reads_only_the_window(name):
+    # The census and the cycle detector take their counts from the engine, the grid is never built
+    engine = createEngine(name)
+    grid = np.zeros((400, 400), dtype=np.uint8)
+    grid[180:220, 180:220] = randomGrid(40, 40, seed=7)
+    engine.load(grid)
+    engine.toGrid = None
+    census = CensusStream(histogramEvery=1)
+    worker = SimulationWorker(engine, detector=CycleDetector(), census=census)
+    worker.setWindow(190, 190, 210, 210)
+    worker.start()
+    deadline = time.perf_counter() + 10
+    while worker.getGeneration() < 5 and worker.isRunning() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    worker.stop()
+    assert worker.getGeneration() >= 5
+    assert census.getLatest().population == engine.getPopulation()
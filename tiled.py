@@ -0,0 +1,337 @@
+import numpy as np
+
+from engine import DEAD, EXPAND, MAX_AGE, checkBoundary, countBirths, nextGeneration
+from rules import CONWAY
+from census import ageHistogram
+from cycle import arraysHash
+
+# Side in cells of the square tiles of the universe
+TILE_SIZE = 64
+
+# Offsets (rows, cols) of the 8 neighbor tiles
+_DIRECTIONS = tuple((dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc)
+
+
+def _side(delta, border=False):
+    """
+    Index of the row (or column) of a tile facing a neighbor at the given offset:
+    the first, the last or all of them (without the corners for the border of a padded tile)
+    """
+    if delta < 0:
+        return 0
+    if delta > 0:
+        return -1
+    return slice(1, -1) if border else slice(None)
+
+
+class TiledEngine:
+    """
+        Step engine over a universe of square tiles, only the tiles with activity are stepped
+        Composed by:
+        - pool of tiles of TILE_SIZE x TILE_SIZE cells, the slot 0 is an empty tile
+        - slot of every tile allocated in a dictionary keyed by the tile coordinates, and free slots
+        - generation of the last update of every slot
+        - tiles to step at the next generation: the tiles changed and the neighbors
+          of their changed edges
+        - window (rows, cols) of the grid loaded, grown by toGrid to contain all the tiles with the expand boundary
+        - tiles stepped in the last generation before and after the step, for counting the births
+        - rule of the evolution (without B0) and boundary mode, dead or expand
+
+        A tile that did not change in the last generation is sleeping and is not stepped
+        until a neighbor changes near its border: the alive cells of a sleeping tile only
+        get older, their ages are brought up to date when the tile is read.
+        The tiles without alive cells are freed.
+        The tiles to step are stacked with a border gathered from their neighbors and stepped
+        with a single vectorized call.
+    """
+
+    name = "tiled"
+    boundaries = (DEAD, EXPAND)
+
+    def __init__(self, rule=CONWAY, boundary=DEAD, tileSize=TILE_SIZE):
+        self._size = tileSize
+        self._shape = (0, 0)
+        self._stepped = 0
+        self._clear()
+        self.rule = rule
+        self.boundary = boundary
+        self.setRule(rule)
+        self.setBoundary(boundary)
+
+    def _clear(self):
+        self._pool = np.zeros((1, self._size, self._size), dtype=np.uint8)
+        self._updated = np.zeros(1, dtype=np.int64)
+        self._slots = {}
+        self._free = []
+        self._active = set()
+        self._generation = 0
+        self._lastStep = None
+
+    def setRule(self, rule):
+        if rule.hasBirthWithoutNeighbors():
+            raise ValueError("The {} engine supports only rules without B0, not {}".format(self.name, rule))
+        checkBoundary(self, self.boundary, rule)
+        self.rule = rule
+        # Every tile is stepped with the new rule
+        for key, slot in self._slots.items():
+            self._activate(key, self._pool[slot] > 0)
+
+    def setBoundary(self, boundary):
+        checkBoundary(self, boundary, self.rule)
+        self.boundary = boundary
+
+    def load(self, grid):
+        """
+        Load the universe from an age grid, the grid shape becomes the window
+        """
+        grid = np.asarray(grid, dtype=np.uint8)
+        size = self._size
+        self._clear()
+        self._shape = grid.shape
+        for tileRow in range(-(-grid.shape[0] // size)):
+            for tileCol in range(-(-grid.shape[1] // size)):
+                cells = grid[tileRow * size:(tileRow + 1) * size, tileCol * size:(tileCol + 1) * size]
+                if cells.any():
+                    slot = self._allocate((tileRow, tileCol))
+                    self._pool[slot, :cells.shape[0], :cells.shape[1]] = cells
+                    self._activate((tileRow, tileCol), self._pool[slot] > 0)
+
+    def _allocate(self, key):
+        """
+        Slot of a new tile, the pool doubles when full
+        """
+        if not self._free:
+            capacity = self._pool.shape[0]
+            self._pool = np.concatenate((self._pool, np.zeros_like(self._pool)))
+            self._updated = np.concatenate((self._updated, np.zeros_like(self._updated)))
+            self._free = list(range(2 * capacity - 1, capacity - 1, -1))
+        slot = self._free.pop()
+        self._slots[key] = slot
+        self._updated[slot] = self._generation
+        return slot
+
+    def _release(self, key):
+        slot = self._slots.pop(key)
+        self._pool[slot] = 0
+        self._free.append(slot)
+
+    def _activate(self, key, changed):
+        """
+        Step at the next generation the tile and the neighbors facing its changed cells
+        """
+        self._active.add(key)
+        for dr, dc in _DIRECTIONS:
+            if changed[_side(dr), _side(dc)].any():
+                self._active.add((key[0] + dr, key[1] + dc))
+
+    def _activateAll(self, keys, changed):
+        """
+        Same as _activate for a stack of tiles, the changed edges are found with one reduction per direction
+        """
+        self._active.update(keys)
+        for dr, dc in _DIRECTIONS:
+            edge = changed[:, _side(dr), _side(dc)]
+            facing = edge.any(axis=tuple(range(1, edge.ndim)))
+            self._active.update((keys[index][0] + dr, keys[index][1] + dc) for index in np.flatnonzero(facing))
+
+    def _catchUp(self, slots):
+        """
+        Bring the ages of the tiles up to the current generation
+        """
+        if not self.rule.isLifeLike():
+            return
+        for slot in slots[self._updated[slots] < self._generation]:
+            # Every alive cell of a sleeping tile survived all the generations
+            tile = self._pool[slot]
+            alive = tile > 0
+            tile[alive] = np.minimum(tile[alive].astype(np.int64) + self._generation - self._updated[slot], MAX_AGE)
+        self._updated[slots] = self._generation
+
+    def step(self, generations=1):
+        """
+        Advance the given number of generations
+        """
+        for _ in range(generations):
+            if not self._active:
+                # The universe is still, the ages are updated when the tiles are read
+                self._generation += 1
+                self._lastStep = ()
+                continue
+            self._nextGeneration()
+
+    def _nextGeneration(self):
+        size = self._size
+        keys = sorted(self._active)
+        if self.boundary == DEAD:
+            limit = (-(-self._shape[0] // size), -(-self._shape[1] // size))
+            keys = [key for key in keys if 0 <= key[0] < limit[0] and 0 <= key[1] < limit[1]]
+        slots = np.array([self._slots.get(key, 0) for key in keys], dtype=np.int64)
+        self._catchUp(slots[slots > 0])
+
+        # Stack of the tiles with a border of one cell gathered from the neighbor tiles,
+        # the border is only counted so the ages of the neighbors do not need to be current
+        padded = np.zeros((len(keys), size + 2, size + 2), dtype=np.uint8)
+        padded[:, 1:-1, 1:-1] = self._pool[slots]
+        for dr, dc in _DIRECTIONS:
+            neighbors = np.array([self._slots.get((tileRow + dr, tileCol + dc), 0) for tileRow, tileCol in keys],
+                                 dtype=np.int64)
+            if neighbors.any():
+                padded[:, _side(dr, True), _side(dc, True)] = self._pool[neighbors, _side(-dr), _side(-dc)]
+        nextTiles = nextGeneration(padded, self.rule)[:, 1:-1, 1:-1]
+        if self.boundary == DEAD:
+            self._clip(keys, nextTiles)
+
+        # Cells changed: the alive cells for Life-like rules (the ages do not wake up a tile), the states otherwise
+        previousTiles = self._pool[slots]
+        if self.rule.isLifeLike():
+            changed = (previousTiles > 0) != (nextTiles > 0)
+        else:
+            changed = previousTiles != nextTiles
+        self._lastStep = (previousTiles, nextTiles)
+        isChanged = changed.any(axis=(1, 2))
+        isAlive = nextTiles.any(axis=(1, 2))
+
+        self._generation += 1
+        self._stepped = len(keys)
+        self._active = set()
+        self._activateAll([keys[index] for index in np.flatnonzero(isChanged)], changed[isChanged])
+
+        # The existing tiles are stored with a single copy, the new ones are allocated and the empty ones freed
+        kept = (slots > 0) & isAlive
+        self._pool[slots[kept]] = nextTiles[kept]
+        self._updated[slots[kept]] = self._generation
+        for index in np.flatnonzero((slots == 0) & isAlive):
+            slot = self._allocate(keys[index])
+            self._pool[slot] = nextTiles[index]
+        for index in np.flatnonzero((slots > 0) & ~isAlive):
+            self._release(keys[index])
+
+    def _clip(self, keys, tiles):
+        """
+        Kill the cells of the tiles outside the window, for the dead boundary
+        """
+        size = self._size
+        for key, tile in zip(keys, tiles):
+            bottom, right = self._shape[0] - key[0] * size, self._shape[1] - key[1] * size
+            if bottom < size:
+                tile[bottom:] = 0
+            if right < size:
+                tile[:, right:] = 0
+
+    def getWindow(self, top, left, bottom, right):
+        """
+        Return the age grid of the cells in the rows [top, bottom) and the columns [left, right)
+        of the universe, only the tiles in the window are read
+        """
+        size = self._size
+        grid = np.zeros((bottom - top, right - left), dtype=np.uint8)
+        tileRows = range(top // size, -(-bottom // size))
+        tileCols = range(left // size, -(-right // size))
+        if len(tileRows) * len(tileCols) > len(self._slots):
+            # Fewer tiles allocated than tiles in the window
+            keys = [key for key in self._slots if key[0] in tileRows and key[1] in tileCols]
+        else:
+            keys = [(tileRow, tileCol) for tileRow in tileRows for tileCol in tileCols if (tileRow, tileCol) in self._slots]
+        self._catchUp(np.array([self._slots[key] for key in keys], dtype=np.int64))
+
+        for tileRow, tileCol in keys:
+            tile = self._pool[self._slots[(tileRow, tileCol)]]
+            rowStart, colStart = tileRow * size, tileCol * size
+            rows = slice(max(top, rowStart), min(bottom, rowStart + size))
+            cols = slice(max(left, colStart), min(right, colStart + size))
+            grid[rows.start - top:rows.stop - top, cols.start - left:cols.stop - left] = \
+                tile[rows.start - rowStart:rows.stop - rowStart, cols.start - colStart:cols.stop - colStart]
+        return grid
+
+    def _bounds(self):
+        """
+        Part (top, left, bottom, right) of the universe in the grid of toGrid: the window,
+        grown to contain all the tiles with the expand boundary
+        """
+        top, left = 0, 0
+        bottom, right = self._shape
+        if self.boundary == EXPAND and self._slots:
+            size = self._size
+            tileRows = [key[0] for key in self._slots]
+            tileCols = [key[1] for key in self._slots]
+            top, left = min(top, min(tileRows) * size), min(left, min(tileCols) * size)
+            bottom, right = max(bottom, (max(tileRows) + 1) * size), max(right, (max(tileCols) + 1) * size)
+        return top, left, bottom, right
+
+    def toGrid(self):
+        """
+        Return the age grid of the window. With the expand boundary the window grows
+        to contain all the tiles, the grid loaded moves to the origin
+        """
+        return self.getWindow(*self._bounds())
+
+    def getShape(self):
+        top, left, bottom, right = self._bounds()
+        return bottom - top, right - left
+
+    def getOrigin(self):
+        """
+        Row and column in the grid of toGrid of the first cell of the grid loaded
+        """
+        top, left, _, _ = self._bounds()
+        return -top, -left
+
+    def getPopulation(self):
+        return int(np.count_nonzero(self._pool))
+
+    def getBirths(self):
+        """
+        Number of cells born in the last generation, counted only in the tiles stepped. None before the first one
+        """
+        if self._lastStep is None:
+            return None
+        if not self._lastStep:
+            return 0
+        previousTiles, nextTiles = self._lastStep
+        # The newborn cells of Life-like rules have age 1
+        return int(np.count_nonzero(nextTiles == 1)) if self.rule.isLifeLike() else countBirths(previousTiles, nextTiles)
+
+    def getBoundingBox(self):
+        """
+        Box (top, left, bottom, right) of the cells not dead in the universe, None if empty.
+        Only the tiles on the sides of the tiles allocated are read
+        """
+        if not self._slots:
+            return None
+        size = self._size
+        keys = np.array(list(self._slots), dtype=np.int64)
+        slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+        box = []
+        for axis, last in ((0, False), (1, False), (0, True), (1, True)):
+            tile = keys[:, axis].max() if last else keys[:, axis].min()
+            # Rows (or columns) with cells not dead of the tiles on the side
+            lines = np.flatnonzero(self._pool[slots[keys[:, axis] == tile]].any(axis=(0, 2 - axis)))
+            box.append(tile * size + (lines[-1] + 1 if last else lines[0]))
+        return tuple(int(side) for side in box)
+
+    def getAgeHistogram(self):
+        """
+        Histogram of the ages (of the states) of the cells, read only from the tiles allocated
+        """
+        slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+        self._catchUp(slots)
+        return ageHistogram(self._pool[slots], self.rule)
+
+    def getStateHash(self):
+        """
+        Hash of the keys of the tiles allocated and of their alive cells (their states for the Generations rules).
+        The ages of the sleeping tiles are not needed
+        """
+        keys = sorted(self._slots)
+        tiles = self._pool[[self._slots[key] for key in keys]]
+        cells = np.packbits(tiles > 0) if self.rule.isLifeLike() else tiles
+        return arraysHash(np.array(keys, dtype=np.int64).reshape(-1, 2), cells)
+
+    def getStatistics(self):
+        return {
+            "tile_size": self._size,
+            "tiles": len(self._slots),
+            "active_tiles": len(self._active),
+            "stepped_tiles": self._stepped,
+            "sleeping_tiles": len(self._slots) - len(self._active.intersection(self._slots)),
+        }
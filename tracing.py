@@ -0,0 +1,132 @@
+import logging
+import sys
+
+# Levels of the events of every generation (sampled) and of every cell, below DEBUG
+GENERATION = 7
+CELL = 5
+logging.addLevelName(GENERATION, "GENERATION")
+logging.addLevelName(CELL, "CELL")
+
+LEVELS = {"CELL": CELL, "GENERATION": GENERATION, "DEBUG": logging.DEBUG, "INFO": logging.INFO,
+          "WARNING": logging.WARNING, "ERROR": logging.ERROR}
+
+# Logger of the application, parent of the loggers of the components
+ROOT = "gol"
+
+# Default level (quiet) and default sampling of the generation events
+DEFAULT_LEVEL = logging.WARNING
+DEFAULT_SAMPLING = 100
+
+TRACE_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+_tracers = {}
+_handler = None
+_sampling = DEFAULT_SAMPLING
+
+
+class Tracer:
+    """
+        Level-gated trace of a component
+        Composed by:
+        - logger of the component
+        - flags of the generation and cell levels, updated by configure
+        - counter of the generation events, only one every sampling is written
+
+        The hot paths check the flags (a single attribute read) before building
+        the messages, so the disabled levels cost nothing.
+    """
+
+    __slots__ = ("_logger", "generations", "cells", "_count")
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(ROOT + "." + name)
+        self._count = 0
+        self._update()
+
+    def _update(self):
+        self.generations = self._logger.isEnabledFor(GENERATION)
+        self.cells = self._logger.isEnabledFor(CELL)
+
+    def info(self, message, *args):
+        self._logger.info(message, *args)
+
+    def debug(self, message, *args):
+        self._logger.debug(message, *args)
+
+    def warning(self, message, *args):
+        self._logger.warning(message, *args)
+
+    def exception(self, message, *args):
+        """
+        Error with the traceback of the exception being handled
+        """
+        self._logger.exception(message, *args)
+
+    def generation(self, message, *args):
+        """
+        Event of every generation or frame, written once every sampling events
+        """
+        if self.generations:
+            self._count += 1
+            if self._count >= _sampling:
+                self._count = 0
+                self._logger.log(GENERATION, message, *args)
+
+    def cell(self, message, *args):
+        """
+        Event of a single cell, check the cells flag before the loops over the cells
+        """
+        if self.cells:
+            self._logger.log(CELL, message, *args)
+
+
+def getTracer(name):
+    """
+    Tracer of the component with the given name
+    """
+    tracer = _tracers.get(name)
+    if tracer is None:
+        tracer = _tracers[name] = Tracer(name)
+    return tracer
+
+
+def parseLevel(level):
+    """
+    Level from its name (case insensitive) or number
+    """
+    if isinstance(level, int):
+        return level
+    if level.upper() not in LEVELS:
+        raise ValueError("Unknown trace level '{}', available: {}".format(level, ", ".join(LEVELS)))
+    return LEVELS[level.upper()]
+
+
+def configure(level=DEFAULT_LEVEL, sampling=None, path=None):
+    """
+    Set the trace level, also at runtime, and the sampling of the generation events.
+    The trace is written on the given file or on the standard error
+    """
+    global _handler, _sampling
+    logger = logging.getLogger(ROOT)
+    logger.setLevel(parseLevel(level))
+    if sampling is not None:
+        _sampling = max(int(sampling), 1)
+
+    if _handler is None or path is not None:
+        if _handler is not None:
+            logger.removeHandler(_handler)
+            _handler.close()
+        _handler = logging.FileHandler(path) if path is not None else logging.StreamHandler(sys.stderr)
+        _handler.setFormatter(logging.Formatter(TRACE_FORMAT))
+        logger.addHandler(_handler)
+        logger.propagate = False
+
+    for tracer in _tracers.values():
+        tracer._update()
+
+
+def getLevel():
+    return logging.getLogger(ROOT).getEffectiveLevel()
+
+
+logging.getLogger(ROOT).setLevel(DEFAULT_LEVEL)
@@ -1,14 +1,29 @@
 import os
-import numpy as np
-from PyQt5.QtWidgets import QApplication, QDialog, QMainWindow, QMessageBox, QFileDialog
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QApplication, QDialog, QDockWidget, QMainWindow, QMessageBox, QFileDialog, QLabel
 
 from main_window_ui import Ui_MainWindow
 
 from model import GolModel
 from grid import GolGrid
+from plot import CensusPlot
+from patterns import readPattern, gridFromPattern, writeCells
+from snapshot import SNAPSHOT_EXTENSION, loadSnapshot, saveSnapshot
+from rules import PRESETS, describeRule, parseRule
+from engine import BOUNDARIES
+from profiler import PROFILER
+from tracing import getTracer, configure, DEFAULT_LEVEL
 
 CURRENT_DIR = os.path.dirname(os.path.abspath('__file__'))
 
+_trace = getTracer("view")
+
+# Interval in milliseconds between two updates of the performance readout
+HUD_INTERVAL = 500
+
+# Phases shown in the performance readout, with their labels
+HUD_PHASES = (("step", "step"), ("census", "census"), ("notify", "notify"), ("update_grid", "grid"), ("paint", "paint"))
+
 class GolView(QMainWindow, Ui_MainWindow):
     """
         View class for Game of Life
@@ -26,10 +41,41 @@ class GolView(QMainWindow, Ui_MainWindow):
 
         # Observe the Game of Life Model
         self._model = model
-        self._model.register(self._updateView)
+        self._model.register(self._updateView, "step_changed")
+        self._model.register(self._updateView, "fps_changed")
+        self._model.register(self._updateView, "running_changed")
+        self._model.register(self._updateRate, "rate_changed")
+        self._model.register(self._updateCycle, "cycle_changed")
+        self._model.register(self.showRule, "rule_changed")
+        self._model.register(self.showBoundary, "boundary_changed")
+
+        # Preset rules, any rule can be written in the combo box
+        self.ruleComboBox.addItems(list(PRESETS))
+        self.showRule(self._model.getRule())
+        self.boundaryComboBox.addItems(list(BOUNDARIES))
+        self.showBoundary(self._model.getBoundary())
 
         self.grid = GolGrid(self, self._model, self.getLayoutGrid())
 
+        # Performance readout in the status bar, hidden by default
+        self.hudLabel = QLabel()
+        self.hudLabel.hide()
+        self.statusbar.addPermanentWidget(self.hudLabel)
+        self._hudTimer = QTimer(self)
+        self._hudTimer.timeout.connect(self._updateHud)
+
+        # Plot of the census of the generations at the bottom, hidden by default
+        self.censusPlot = CensusPlot(self, self._model.getCensus())
+        self.statisticsDock = QDockWidget("Statistics", self)
+        self.statisticsDock.setFeatures(QDockWidget.DockWidgetMovable | QDockWidget.DockWidgetFloatable)
+        self.statisticsDock.setWidget(self.censusPlot)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.statisticsDock)
+        self.statisticsDock.hide()
+        self._plotTimer = QTimer(self)
+        self._plotTimer.timeout.connect(self.censusPlot.update)
+
+        # Level of the trace enabled by the trace action
+        self._traceLevel = "DEBUG"
 
     def getGrid(self):
         return self.grid
@@ -46,6 +92,10 @@ class GolView(QMainWindow, Ui_MainWindow):
 
         self.action_Rules.triggered.connect(self.rules)
         self.action_How_to_play.triggered.connect(self.how_to_play)
+        self.action_Performance.toggled.connect(self.showPerformance)
+        self.action_Trace.toggled.connect(self.enableTrace)
+        self.action_Density.toggled.connect(self.showDensity)
+        self.action_Statistics.toggled.connect(self.showStatistics)
 
     def _open(self):
         """
@@ -53,25 +103,32 @@ class GolView(QMainWindow, Ui_MainWindow):
         Load a grid configuration from file
         """
         if(not self._model.isRunning()):
-            print('Open pattern')
+            _trace.info("open")
             try:
                 path = QFileDialog.getOpenFileName(directory=CURRENT_DIR)
                 if path[0] != '':
-                    print("Path file : " , path)
-
-                    grid, originalRows, originalCols = self._gridFromFile(path[0])
-
-                    self._model.setGrid(grid)
-
-                    size_text = '{}x{}'.format(originalRows, originalCols)
-
-                    self.gridComboBox.setCurrentIndex(4)
-
-
-
+                    _trace.info("open path=%s", path[0])
+
+                    if path[0].endswith(SNAPSHOT_EXTENSION):
+                        # Restore the state of a simulation
+                        snapshot = loadSnapshot(path[0])
+                        with self._model.batch():
+                            self._model.setRule(parseRule(snapshot.rule))
+                            self._model.setGrid(snapshot.grid)
+                            self._model.setStep(snapshot.step)
+                            self._showWholeGrid()
+                        return
+
+                    grid, originalRows, originalCols, rule = self._gridFromFile(path[0])
+
+                    with self._model.batch():
+                        if rule is not None:
+                            self._model.setRule(rule)
+                        self._model.setGrid(grid)
+                        self._showWholeGrid()
 
             except Exception:
-                print('File opening failed')
+                _trace.exception("open failed")
                 QMessageBox.about(self, "Load Error", "File selected is not valid!")
 
         else:
@@ -79,52 +136,36 @@ class GolView(QMainWindow, Ui_MainWindow):
             QMessageBox.about(self, "Load Error", "Stop the simulation for load a configuration!")
 
 
-    def _gridFromFile(self,path):
+    def _showWholeGrid(self):
         """
-        Read a configuration from file selected and create a grid
+        Select the size of the whole grid and show it in the combo box
         """
-        print("Grid From File")
-        config = []
-        with open(path, 'r') as file:
-            lines = file.readlines()
-            rows = 0
-            cols = 0
-            for line in lines:
-                #print("Line : ",line)
-
-                if not line.startswith('!') and line != "":
-                    rows += 1
-
-                    if cols <= len(line)-1:
-                        cols = len(line)-1
-                    row = []
-
-                    for symbol in reversed(line):
-                        #print("symbol : ", symbol)
-                        if symbol == '.':
-                            row.append(0)
-                        if symbol == 'O':
-                            row.append(1)
-
-                    config.append(row)
-
-            for row in config:
-                for i in range(cols-len(row)):
-                    row.insert(0,0)
-
-        grid = np.zeros((self._model.getGridSize()[0], self._model.getGridSize()[1]), dtype=np.uint8)
-
-        # print(rows)
-        # print((self._model.getGridSize()[0] - rows))
-        # print((self._model.getGridSize()[0] - rows) // 2)
-
-        for i in range(rows):
-            for j in range(cols):
-                print(i + (self._model.getGridSize()[0] - rows) // 2 , " - " , j + (self._model.getGridSize()[1] - cols)//2)
-                grid[i + (self._model.getGridSize()[0] - rows)//2][j + (self._model.getGridSize()[1] - cols)//2] = config[i][j]
+        rows, cols = self._model.getGridSize()
+        self.gridComboBox.blockSignals(True)
+        self.gridComboBox.setEditText('{}x{}'.format(rows, cols))
+        self.gridComboBox.blockSignals(False)
+        self._model.setGridSizeSelected((rows, cols))
 
-
-        return grid, rows, cols
+    def _gridFromFile(self,path):
+        """
+        Read a configuration from file selected (.cells or .rle) and create a grid,
+        bigger than the current grid if the pattern does not fit.
+        Return also the rule written in the file, None if missing or not supported
+        """
+        pattern = readPattern(path)
+        _trace.debug("pattern loaded path=%s cells=%d height=%d width=%d", path, pattern.getPopulation(), pattern.height, pattern.width)
+        if _trace.cells:
+            for row, col in zip(pattern.rows, pattern.cols):
+                _trace.cell("pattern cell row=%d col=%d", row, col)
+        rows, cols = self._model.getGridSize()
+        grid = gridFromPattern(pattern, (max(rows, pattern.height), max(cols, pattern.width)))
+        rule = None
+        if pattern.rule:
+            try:
+                rule = parseRule(pattern.rule)
+            except ValueError:
+                _trace.warning("rule of the pattern not supported rule=%s", pattern.rule)
+        return grid, pattern.height, pattern.width, rule
 
     def _save(self):
         """
@@ -132,15 +173,15 @@ class GolView(QMainWindow, Ui_MainWindow):
         Save the grid configuration on file
         """
         if (not self._model.isRunning()):
-            print('save pattern')
+            _trace.info("save")
             try:
                 path = QFileDialog.getSaveFileName(directory=CURRENT_DIR)
                 if path[0] != '':
-                    print(path)
+                    _trace.info("save path=%s", path[0])
                     self._gridOnFile(path,self._model.getGrid())
 
             except Exception:
-                print('File saving failed')
+                _trace.exception("save failed")
                 QMessageBox.about(self, "Save Error", "Error while saving the file!")
 
         else:
@@ -149,29 +190,33 @@ class GolView(QMainWindow, Ui_MainWindow):
 
     def _gridOnFile(self, path, grid):
         """
-        Write the current configuration on file
+        Write the current configuration on file, a snapshot of the simulation
+        if the file has the snapshot extension
         """
-        with open(path[0], 'w') as file:
-            file.write("!Name: "+ path[0] + "\n")
-            for row in grid:
-                for element in row:
-                    file.write("0" if element == 1 else ".")
-                file.write("\n")
+        if path[0].endswith(SNAPSHOT_EXTENSION):
+            saveSnapshot(path[0], grid, self._model.getStep(), self._model.getRule().toString())
+        else:
+            writeCells(path[0], grid)
 
     def rules(self):
         """
-        QMessageBox with rules of the game
+        QMessageBox with rules of the game, for the rule selected
         """
+        rule = self._model.getRule()
+        title = f"{rule.name} ({rule.toString()})" if rule.name else rule.toString()
         QMessageBox.about(
             self,
             "Rules",
-            "<p><b>GAME OF LIFE RULES :</b></p>"
-            "<p>1) If a cell is ON and has fewer than two neighbors that are ON, it turns OFF </p>"
-            "<p>2) If a cell is ON and has either two or three neighbors that are ON, it remains ON </p>"
-            "<p>3) If a cell is ON and has more than three neighbors that are ON, it turns OFF </p>"
-            "<p>4) If a cell is OFF and has exactly three neighbors that are ON, it turns ON </p>"
+            f"<p><b>GAME OF LIFE RULES : {title}</b></p>"
+            + "".join(f"<p>{number}) {sentence} </p>" for number, sentence in enumerate(describeRule(rule), 1))
         )
 
+    def showError(self, title, message):
+        """
+        QMessageBox with an error
+        """
+        QMessageBox.about(self, title, message)
+
     def how_to_play(self):
         """
             QMessageBox with instructions on how to use the program
@@ -182,6 +227,7 @@ class GolView(QMainWindow, Ui_MainWindow):
             "<p><b>HOW TO PLAY :</b></p>"
             "<p> - Load default configuration or create a custom one by clicking on the grid to make a cell dead or alive. </p>"
             "<p> - Save the grid configuration with the action in the menù file. </p>"
+            "<p> - Save with the .gol extension for a snapshot of the simulation (grid, ages, step and rule). </p>"
             "<p><b>CONTROLS :</b></p>"
             "<p> - Click play button to start the simulation of the game. </p>"
             "<p> - Click next step button to do a single iteration of game. </p>"
@@ -189,26 +235,137 @@ class GolView(QMainWindow, Ui_MainWindow):
             "<p> - Click clear button for clear the grid (all cell are dead). </p>"
             "<p><b>SETTINGS :</b></p>"
             "<p> - Move speed slider for set the speed of the simulation. </p>"
-            "<p> - Change the size of grid by selecting it in the combo box. </p>",
+            "<p> - Check turbo for run the simulation as fast as possible. </p>"
+            "<p> - Check pause on cycle for stop the simulation when a still life or an oscillator is detected. </p>"
+            "<p> - Change the size of grid by selecting it in the combo box, or write any size as ROWSxCOLS and press enter. </p>"
+            "<p> - Zoom the grid with the mouse wheel and move it by dragging with the mouse. </p>"
+            "<p> - Change the boundary of the grid: dead cells outside, edges wrapped around (torus) or a grid that grows with the cells (expand). </p>"
+            "<p> - Change the rule by selecting a preset in the combo box, or write any rule as B3/S23 (B2/S/C3 for Generations) and press enter. </p>"
+            "<p> - Show the performance of the simulation in the status bar with the action in the menù view. </p>"
+            "<p> - Show the density of the alive cells when zoomed out with the density action in the menù view. </p>"
+            "<p> - Plot the population, births, deaths and ages of the cells with the statistics action in the menù view. </p>",
         )
 
-    def _updateView(self):
+    def _updateView(self, value=None):
         """
         Update the buttons, the speed label and the step label if the simulation is running
         """
-        print("Update View")
+        _trace.generation("update view step=%d running=%s", self._model.getStep(), self._model.isRunning())
         self.speedLabel.setText(f"Fps : {self._model.getFps()} ")
-        self.stepLabel.setText(f"Step : {self._model.getStep()} ")
+        self._updateStepLabel()
         if self._model.isRunning():
             self.playButton.setDisabled(True)
             self.stepButton.setDisabled(True)
             self.pauseButton.setDisabled(False)
             self.speedSlider.setDisabled(True)
+            self.ruleComboBox.setDisabled(True)
+            self.boundaryComboBox.setDisabled(True)
         else:
             self.playButton.setDisabled(False)
             self.stepButton.setDisabled(False)
             self.pauseButton.setDisabled(True)
             self.speedSlider.setDisabled(False)
+            self.ruleComboBox.setDisabled(False)
+            self.boundaryComboBox.setDisabled(False)
+
+    def _updateRate(self, rate):
+        """
+        Show the generations per second achieved by the simulation in the step label
+        """
+        self._updateStepLabel()
+
+    def _updateCycle(self, cycle):
+        """
+        Show the cycle detected in the status bar
+        """
+        if cycle is None:
+            self.statusbar.clearMessage()
+        elif cycle.period == 1:
+            self.statusbar.showMessage(f"Still life from generation {cycle.start}")
+        else:
+            self.statusbar.showMessage(f"Cycle of period {cycle.period} from generation {cycle.start}")
+
+    def showRule(self, rule):
+        """
+        Show the rule in the combo box, by name if it is a preset
+        """
+        self.ruleComboBox.blockSignals(True)
+        self.ruleComboBox.setEditText(rule.name or rule.toString())
+        self.ruleComboBox.blockSignals(False)
+
+    def showBoundary(self, boundary):
+        """
+        Show the boundary mode in the combo box
+        """
+        self.boundaryComboBox.blockSignals(True)
+        self.boundaryComboBox.setCurrentText(boundary)
+        self.boundaryComboBox.blockSignals(False)
+
+    def showPerformance(self, show):
+        """
+        Show or hide the performance readout in the status bar
+        """
+        self.action_Performance.setChecked(show)
+        self.hudLabel.setVisible(show)
+        if show:
+            self._updateHud()
+            self._hudTimer.start(HUD_INTERVAL)
+        else:
+            self._hudTimer.stop()
+
+    def showDensity(self, density):
+        """
+        Show the density of the alive cells of every pixel when the grid is zoomed out
+        """
+        self.action_Density.setChecked(density)
+        self.grid.setDensity(density)
+
+    def showStatistics(self, show):
+        """
+        Show or hide the plot of the population, births, deaths and ages of the cells
+        """
+        self.action_Statistics.setChecked(show)
+        self.statisticsDock.setVisible(show)
+        if show:
+            self._plotTimer.start(HUD_INTERVAL)
+        else:
+            self._plotTimer.stop()
+
+    def setTraceLevel(self, level):
+        """
+        Level of the trace enabled at runtime by the trace action
+        """
+        self._traceLevel = level
+
+    def enableTrace(self, enabled):
+        """
+        Turn the trace on or off while the game runs
+        """
+        self.action_Trace.setChecked(enabled)
+        configure(self._traceLevel if enabled else DEFAULT_LEVEL)
+
+    def _updateHud(self):
+        """
+        Show the mean and 95th percentile time of the phases, the population,
+        the generations per second and the fps achieved against the requested ones
+        """
+        fields = []
+        for phase, label in HUD_PHASES:
+            statistics = PROFILER.getPhase(phase)
+            if statistics is not None:
+                fields.append(f"{label} {statistics['mean_ms']:.2f} ms (p95 {statistics['p95_ms']:.2f})")
+        requested = "max" if self._model.isTurbo() else self._model.getFps()
+        fields.append(f"pop {self._model.getPopulation()}")
+        fields.append(f"{self._model.getGenerationsPerSecond():.0f} gen/s")
+        fields.append(f"{PROFILER.getRate('frame'):.1f}/{requested} fps")
+        self.hudLabel.setText(" | ".join(fields))
+
+    def _updateStepLabel(self):
+        rate = self._model.getGenerationsPerSecond()
+        if self._model.isRunning() and rate > 0:
+            self.stepLabel.setText(f"Step : {self._model.getStep()} ({rate:.0f} gen/s)")
+        else:
+            self.stepLabel.setText(f"Step : {self._model.getStep()} ")
 
     def buttonPlay(self, slot):
         """
@@ -240,15 +397,32 @@ class GolView(QMainWindow, Ui_MainWindow):
         """
         self.speedSlider.valueChanged.connect(slot)
 
-    def comboSizeGridText(self, slot):
+    def checkTurbo(self, slot):
         """
-        Slot of grid size comboBox
+        Slot of turbo checkbox
         """
-        self.gridComboBox.currentTextChanged.connect(slot)
-
-
-
+        self.turboCheckBox.toggled.connect(slot)
 
+    def checkPauseOnCycle(self, slot):
+        """
+        Slot of pause on cycle checkbox
+        """
+        self.cycleCheckBox.toggled.connect(slot)
 
+    def comboSizeGridText(self, slot):
+        """
+        Slot of grid size comboBox, called when a size is selected or written (ROWSxCOLS) and confirmed
+        """
+        self.gridComboBox.activated[str].connect(slot)
 
+    def comboRule(self, slot):
+        """
+        Slot of rule comboBox, called when a rule is selected or written and confirmed
+        """
+        self.ruleComboBox.activated[str].connect(slot)
 
+    def comboBoundary(self, slot):
+        """
+        Slot of boundary comboBox
+        """
+        self.boundaryComboBox.activated[str].connect(slot)
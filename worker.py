@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+from PyQt5.QtCore import QThread
+from engine import engineOrigin, engineShape, engineWindow
+from profiler import PROFILER
+
+# Number of generations used to measure the generations per second
+RATE_WINDOW = 64
+
+
+class SimulationWorker(QThread):
+    """
+        Worker thread that steps the engine out of the Qt event loop
+        Composed by:
+        - step engine, owned by the thread while it runs
+        - slot with the latest generation completed, taken by the GUI
+        - part of the grid read after every generation, the one shown by the GUI
+        - interval between two generations (0 for no throttling)
+        - optional cycle detector of the whole state of the engine, used by the thread while it runs
+        - optional stream of the census of every generation, observed by the thread
+        - optional checkpointer, the whole grid is read only when a checkpoint is due
+
+        The GUI only picks up the latest generation: the generations completed
+        between two pick ups are dropped and never queued. The census and the cycle
+        detector take their counts and state hash from the engine, the loop reads the
+        whole grid only for the checkpoints.
+    """
+
+    def __init__(self, engine, interval=0.0, generation=0, detector=None, census=None, checkpointer=None):
+        super().__init__()
+        self._engine = engine
+        self._interval = interval
+        self._detector = detector
+        self._census = census
+        self._checkpointer = checkpointer
+        self._cycle = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+        # Latest generation completed, and part (top, left, bottom, right) of the grid loaded read after a generation
+        self._latest = None
+        self._window = None
+
+        # Number of the generation of the engine
+        self._generation = generation
+        self._times = deque(maxlen=RATE_WINDOW)
+
+    def setInterval(self, interval):
+        """
+        Seconds between two generations, 0 for running as fast as possible
+        """
+        self._interval = interval
+        self._wake.set()
+
+    def setWindow(self, top, left, bottom, right):
+        """
+        Part of the grid read after the next generations, in the coordinates of the grid loaded.
+        The whole grid if never set
+        """
+        with self._lock:
+            self._window = (top, left, bottom, right)
+
+    def takeLatest(self):
+        """
+        Return the cells, the part (top, left, bottom, right) of the grid of the engine read, the shape and
+        the origin of the grid of the engine and the number of the latest generation completed,
+        None if no generation was completed after the previous call
+        """
+        with self._lock:
+            latest, self._latest = self._latest, None
+            return latest
+
+    def getGeneration(self):
+        return self._generation
+
+    def getCycle(self):
+        """
+        Cycle detected in the generations computed, None if not detected
+        """
+        return self._cycle
+
+    def getGenerationsPerSecond(self):
+        """
+        Generations per second achieved in the last generations
+        """
+        with self._lock:
+            if len(self._times) < 2 or self._times[-1] == self._times[0]:
+                return 0.0
+            return (len(self._times) - 1) / (self._times[-1] - self._times[0])
+
+    def stop(self):
+        """
+        Stop the thread and wait the end of the generation in progress
+        """
+        self.requestInterruption()
+        self._wake.set()
+        self.wait()
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            start = time.perf_counter()
+
+            with PROFILER.measure("step"):
+                self._engine.step()
+                cells, window, shape, origin = self._readWindow()
+
+            with self._lock:
+                self._generation += 1
+                self._times.append(time.perf_counter())
+                self._latest = (cells, window, shape, origin, self._generation)
+
+            if self._census is not None:
+                with PROFILER.measure("census"):
+                    self._census.observe(self._engine, self._generation)
+
+            if self._detector is not None:
+                self._cycle = self._detector.observeEngine(self._generation, self._engine)
+
+            if self._checkpointer is not None and self._checkpointer.isDue(self._generation):
+                self._checkpointer.save(self._generation, self._engine.toGrid(), self._engine.rule.toString())
+
+            # Throttle to the requested speed
+            remaining = self._interval - (time.perf_counter() - start)
+            if remaining > 0:
+                self._wake.wait(remaining)
+                self._wake.clear()
+
+    def _readWindow(self):
+        """
+        Read the part of the grid requested, moved with the origin of the grid of the engine and kept inside it
+        """
+        shape, origin = engineShape(self._engine), engineOrigin(self._engine)
+        with self._lock:
+            window = self._window
+        if window is None:
+            window = (0, 0) + tuple(shape)
+        else:
+            top, left, bottom, right = window
+            rows, cols = min(bottom - top, shape[0]), min(right - left, shape[1])
+            top = min(max(top + origin[0], 0), shape[0] - rows)
+            left = min(max(left + origin[1], 0), shape[1] - cols)
+            window = (top, left, top + rows, left + cols)
+        return engineWindow(self._engine, *window), window, shape, origin